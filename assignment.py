@@ -1,7 +1,10 @@
 import json
-import os
 from datetime import datetime
 from tabulate import tabulate
+from deadlines import Deadlines
+from references import References
+from storage import RecordNotFound, Storage
+from submissionqueue import SubmissionQueue
 
 class Assignment:
     
@@ -22,13 +25,9 @@ class Assignment:
     #Check if an assignment with the given code exists
     @staticmethod
     def assignment_exists(assignment_code):
-        assignment_path = os.path.join(Assignment._assignments_directory, f"{assignment_code}_assignment.json")
-        return os.path.exists(assignment_path)
+        return Storage.repo().exists('assignment', assignment_code)
     
     def create_assignment(self):
-        # Ensure the 'assignments' directory inside 'data' exists
-        os.makedirs(self._assignments_directory, exist_ok=True)
-        
         # Collect assignment details step by step
         assignment_details = {}
         
@@ -77,54 +76,46 @@ class Assignment:
             except ValueError:
                 print("Invalid time format. Use HH:MM.")
         
-        # Save assignment to a JSON file inside the 'assignments' folder
-        filename = os.path.join(self._assignments_directory, f"{assignment_details['assignment_code']}_assignment.json")
-        
-        # Write the assignment details to the JSON file
-        with open(filename, 'w') as f:
-            json.dump(assignment_details, f, indent=4)
+        # Keep the deadline as an epoch too, for comparing submissions with
+        assignment_details['deadline_epoch'] = Deadlines.epoch(deadline_date, deadline_time)
+
+        # Save the assignment details
+        Storage.repo().save('assignment', assignment_details['assignment_code'], assignment_details)
         
         print("Assignment created successfully!")
     
     def view_created_assignments(self):
         assignments = []
         
-        # Iterate through assignment files
-        for filename in os.listdir(self._assignments_directory):
-            if filename.endswith('_assignment.json'):
-                with open(os.path.join(self._assignments_directory, filename), 'r') as f:
-                    assignment_data = json.load(f)
-                    assignments.append([
-                        assignment_data['assignment_code'],
-                        assignment_data['assignment_name'],
-                        assignment_data['details'],
-                        assignment_data['points'],
-                        assignment_data['deadline_date'],
-                        assignment_data['deadline_time']
-                    ])
+        # Iterate through assignments
+        for _, assignment_data in Storage.repo().load_all('assignment'):
+            assignments.append([
+                assignment_data['assignment_code'],
+                assignment_data['assignment_name'],
+                assignment_data['details'],
+                assignment_data['points'],
+                assignment_data['deadline_date'],
+                assignment_data['deadline_time']
+            ])
         
         # Display using tabulate
         headers = ["Assignment Code", "Assignment Name", "Details", "Points", "Deadline Date", "Deadline Time"]
         print(tabulate(assignments, headers=headers, tablefmt="grid"))
 
     def assign_assignment(self):
-        os.makedirs(self._courses_directory, exist_ok=True)
+        repo = Storage.repo()
         
         # 1. Enter Assignment Code
         assignment_code = input("1 - Enter Assignment Code: ") 
         
-        # Construct full path to the assignment file
-        full_assignment_path = os.path.join(self._assignments_directory, f"{assignment_code}_assignment.json")
-        
-        # Check if the file exists
-        if not os.path.exists(full_assignment_path):
-            print(f"Assignment file does not exist: {full_assignment_path}")
+        # Check if the assignment exists
+        if not repo.exists('assignment', assignment_code):
+            print(f"Assignment does not exist: {assignment_code}")
             return
         
         # Load assignment details
         try: 
-            with open(full_assignment_path, 'r') as f: 
-                assignment_data = json.load(f) 
+            assignment_data = repo.load('assignment', assignment_code)
         except Exception as e:
             print(f"Error reading assignment file: {e}")
             return 
@@ -134,10 +125,8 @@ class Assignment:
         
         # Load course details to get enrolled students
         try:
-            full_course_path = os.path.join(self._courses_directory, f"{course_code}_course.json")
-            with open(full_course_path, 'r') as f:
-                course_data = json.load(f)
-        except FileNotFoundError:
+            course_data = repo.load('course', course_code)
+        except RecordNotFound:
             print(f"Course {course_code} not found!") 
             return
         
@@ -149,10 +138,9 @@ class Assignment:
             print(f"No students enrolled in course {course_code}")
             return
         
-        # Create an assignments tracking file
-        assignments_tracking_file = os.path.join(self._assignments_directory, f"{assignment_code}_assigned.json")
-        
-        # Prepare assignment tracking data
+        # Prepare assignment tracking data; assignments created before the
+        # deadline epoch was stored get it here
+        Deadlines.stamp('assignment', assignment_data)
         assignment_tracking = { 
             'assignment_code': assignment_code, 
             'course_code': course_code, 
@@ -161,58 +149,96 @@ class Assignment:
         }
         
         # Add student details to tracking
-        for student in enrolled_students:
+        for student in References.roster(enrolled_students):
             assignment_tracking['assigned_students'].append({
                 'student_id': student['student_id'], 
-                'username': student['username']
+                'username': student.get('username', 'N/A')
             })
         
-        # Save assignment tracking
-        with open(assignments_tracking_file, 'w') as f: 
-            json.dump(assignment_tracking, f, indent=4)
+        # Save assignment tracking; giving an assignment out again reopens it
+        with repo.transaction():
+            repo.save('assigned', assignment_code, assignment_tracking)
+            if repo.exists('missing', assignment_code):
+                repo.delete('missing', assignment_code)
         
         print(f"Assignment {assignment_code} assigned to {len(enrolled_students)} student/s in course {course_code}!")
     
     def view_assignments_passed(self):
         passed_assignments = []
         
-        # Iterate through the directory where student submission files are stored
-        for filename in os.listdir(self._assignments_directory):
-            if filename.endswith('_submission.json'):  # Look for submission files, not assigned ones
-                with open(os.path.join(self._assignments_directory, filename), 'r') as f:
-                    submission_data = json.load(f)
-
-                # Extract relevant data from the submission
-                student_id = submission_data.get('student_id')
-                username = submission_data.get('username')
-                assignment_code = submission_data.get('assignment_code')
-                assignment_name = submission_data.get('assignment_name')
-                submission_details = submission_data.get('submission_details', 'N/A')
-                status = submission_data.get('status')
-                score = submission_data.get('score', 'Not yet Scored')
-                grade_rate = submission_data.get('grade_rate', 'Pending')
+        # Iterate through the student submissions
+        for _, submission_data in Storage.repo().load_all('submission'):
+            # Extract relevant data from the submission
+            student_id = submission_data.get('student_id')
+            username = submission_data.get('username')
+            assignment_code = submission_data.get('assignment_code')
+            assignment_name = submission_data.get('assignment_name')
+            submission_details = submission_data.get('submission_details', 'N/A')
+            score = submission_data.get('score', 'Not yet Scored')
+            grade_rate = submission_data.get('grade_rate', 'Pending')
 
-                # Check if the submission is passed on time or late
-                submission_status = Assignment._check_late_submission(submission_data, {'submission_time': submission_data['submission_timestamp']})
+            # The status was decided when the submission was accepted; only
+            # a record without one is judged here
+            submission_status = submission_data.get('status') or Assignment._check_late_submission(
+                submission_data, {'submission_time': submission_data.get('submission_timestamp')})
 
-                # Add to passed assignments list if submitted
-                if submission_status == "On Time" or submission_status == "Late":
-                    passed_assignments.append([
-                        username,
-                        student_id,
-                        assignment_code,
-                        assignment_name,
-                        submission_details,
-                        submission_status,
-                        score,
-                        grade_rate
-                    ])
-        
+            # Add to passed assignments list if submitted
+            if submission_status == "On Time" or submission_status == "Late":
+                passed_assignments.append([
+                    username,
+                    student_id,
+                    assignment_code,
+                    assignment_name,
+                    submission_details,
+                    submission_status,
+                    score,
+                    grade_rate
+                ])
+    
         # Display using tabulate
         print("\nAssignments Passed:")
         headers = ["Student Name", "Student ID", "Assignment Code", "Assignment Name", "Passed Assignment Details", "Status(Late or On Time)", "Score", "Grade Rate"]
         print(tabulate(passed_assignments, headers=headers, tablefmt="grid"))
         
+    # Show who has not submitted, who submitted late and whose submission is
+    # not graded yet, for one assignment or every assignment of a course
+    def view_submission_tracker(self):
+        repo = Storage.repo()
+
+        # 1. Enter Assignment Code, or a course code for all of its assignments
+        assignment_code = input("1 - Enter Assignment Code (leave blank for a whole course): ").strip()
+        if assignment_code:
+            if not repo.exists('assigned', assignment_code):
+                print(f"Assignment {assignment_code} has not been assigned to any course.")
+                return
+            reports = {assignment_code: repo.submission_report(assignment_code)}
+        else:
+            course_code = input("2 - Enter Course Code: ").strip()
+            reports = repo.course_submission_report(course_code)
+            if not reports:
+                print(f"No assignments assigned in course {course_code}")
+                return
+
+        # Counts per assignment
+        print("\nSubmission Tracker:")
+        summary = [[code, report['assigned'], report['submitted'], len(report['not_submitted']),
+                    len(report['late']), len(report['ungraded'])] for code, report in reports.items()]
+        headers = ["Assignment Code", "Assigned", "Submitted", "Not Submitted", "Late", "Not Graded"]
+        print(tabulate(summary, headers=headers, tablefmt="grid"))
+
+        # One row per student to follow up on
+        students = []
+        for code, report in reports.items():
+            for label, field in (("Not Submitted", 'not_submitted'), ("Late", 'late'), ("Not Graded", 'ungraded')):
+                for student_id in report[field]:
+                    student = References.student(student_id) or {}
+                    students.append([code, student_id, student.get('username', 'N/A'), label])
+        if students:
+            headers = ["Assignment Code", "Student ID", "Student Name", "Status"]
+            print(tabulate(students, headers=headers, tablefmt="grid"))
+        else:
+            print("Every assigned student has submitted and been graded.")
+
     @staticmethod
     def _check_late_submission(assignment_details, student):
         if not student.get('submission_time'):
@@ -243,24 +269,8 @@ class Assignment:
             return
         
         try:
-            # Find all assigned assignment tracking files
-            assigned_files = [f for f in os.listdir(self._assignments_directory) 
-                            if f.endswith('_assigned.json')]
-            
-            for file in assigned_files:
-                # Read each assigned assignment file
-                with open(os.path.join(self._assignments_directory, file), 'r') as f:
-                    assigned_data = json.load(f)
-                
-                # Check if student is in the assigned students list
-                student_assigned = any(
-                    assigned_student['student_id'] == student_id
-                    for assigned_student in assigned_data.get('assigned_students', [])
-                )
-                
-                if student_assigned:
-                    # Increment assignment count if student is assigned this assignment
-                    assignment_count += 1
+            # One entry per assignment in the student's inbox
+            assignment_count = len(Storage.repo().student_inbox(student_id))
             
             return assignment_count
         
@@ -269,8 +279,6 @@ class Assignment:
             return 0  # Return 0 if there's an error
 
     def student_view_assignment(self, student):
-        os.makedirs(self._assignments_directory, exist_ok=True)
-        
         # Determine if student is a string (student_id) or an object
         if isinstance(student, str):
             student_id = student  # If it's a string, it's already the student ID
@@ -281,40 +289,19 @@ class Assignment:
             return
         
         try:
-            # Find all assigned assignment tracking files
-            assigned_files = [f for f in os.listdir(self._assignments_directory) 
-                            if f.endswith('_assigned.json')]
-            
             assignment_data = []
             
-            for file in assigned_files:
-                # Read each assigned assignment file
-                with open(os.path.join(self._assignments_directory, file), 'r') as f:
-                    assigned_data = json.load(f)
-                
-                # Check if student is in the assigned students list
-                student_assigned = any(
-                    assigned_student['student_id'] == student_id  # Use student_id determined above
-                    for assigned_student in assigned_data.get('assigned_students', [])
-                )
-                
-                if student_assigned:
-                    # Extract assignment details from the main assignment file
-                    assignment_code = assigned_data.get('assignment_code')
-                    assignment_file_path = os.path.join(self._assignments_directory, f"{assignment_code}_assignment.json")
-                    
-                    with open(assignment_file_path, 'r') as af:
-                        assignment_details = json.load(af)
-                    
-                    assignment_data.append([
-                        assigned_data.get('course_code', 'N/A'),
-                        assignment_code,
-                        assignment_details.get('assignment_name', 'N/A'),
-                        assignment_details.get('details', 'N/A'),
-                        assignment_details.get('points', 'N/A'),
-                        assignment_details.get('deadline_date', 'N/A'),
-                        assignment_details.get('deadline_time', 'N/A')
-                    ])
+            # The student's inbox already carries the course code and deadline
+            for entry in Storage.repo().student_inbox(student_id):
+                assignment_data.append([
+                    entry['course_code'],
+                    entry['assignment_code'],
+                    entry.get('assignment_name', 'N/A'),
+                    entry.get('details', 'N/A'),
+                    entry.get('points', 'N/A'),
+                    entry.get('deadline_date', 'N/A'),
+                    entry.get('deadline_time', 'N/A')
+                ])
             
             # Display assignments using tabulate
             if assignment_data:
@@ -323,8 +310,7 @@ class Assignment:
                 print(tabulate(assignment_data, headers=headers, tablefmt="grid"))
                 
                 # Print the total number of assignments
-                total_assignments = Assignment.count_assignments_for_student(self, student)
-                print(f"Total Assignments: {total_assignments}\n")
+                print(f"Total Assignments: {len(assignment_data)}\n")
             else:
                 print("No assignments found for you.")
         
@@ -333,7 +319,7 @@ class Assignment:
 
     # Submit an assignment if the student is assigned to it
     def student_submit_assignment(self, student):
-        os.makedirs(self._assignments_directory, exist_ok=True)
+        repo = Storage.repo()
 
         student_id = getattr(student, '_user_id', None)
 
@@ -344,15 +330,13 @@ class Assignment:
                 print("Error: Assignment code cannot be empty.")
                 return
             
-            # Find the correct assignment file
-            assignment_file_path = os.path.join(self._assignments_directory, f"{assignment_code}_assigned.json")
-            if not os.path.exists(assignment_file_path):
+            # Find the correct assignment tracking record
+            if not repo.exists('assigned', assignment_code):
                 print(f"Error: Assignment '{assignment_code}' not found.")
                 return
             
             # Load assignment data
-            with open(assignment_file_path, 'r') as f:
-                assigned_data = json.load(f)
+            assigned_data = repo.load('assigned', assignment_code)
             
             # Check if student is assigned to this assignment
             student_assigned = next(
@@ -364,22 +348,24 @@ class Assignment:
                 print("Error: You are not assigned to this assignment.")
                 return
             
-            # Check if the student has already submitted
-            if student_assigned.get('submission_status') == 'Submitted':
+            # Check if the student has already submitted or has a submission
+            # still queued; submissions from before migrate-submissions are
+            # keyed by the student alone
+            intake = SubmissionQueue.shared()
+            submission_key = repo.submission_key(assignment_code, student_id)
+            submitted = intake.is_pending(submission_key) or repo.exists('submission', submission_key) or (
+                repo.exists('submission', student_id)
+                and repo.load('submission', student_id).get('assignment_code') == assignment_code)
+            if student_assigned.get('submission_status') == 'Submitted' or submitted:
                 print("Error: You have already submitted this assignment.")
                 return
             
             # Extract assignment details
             assignment_details = assigned_data.get('assignment_details', {})
-            deadline_str = f"{assignment_details['deadline_date']} {assignment_details['deadline_time']}"
-            deadline = datetime.strptime(deadline_str, "%Y-%m-%d %H:%M")
-
-            # Get the current submission time and check if it's late
-            submission_time = datetime.now()  # Get current time
-            submission_status = Assignment._check_late_submission(assignment_details, {'submission_time': submission_time.strftime("%Y-%m-%d %H:%M")})
+            deadline = Deadlines.deadline_of(assignment_details)
 
             # Warn the student if the submission is late
-            if submission_status == "Late":
+            if Deadlines.status(Deadlines.minute_epoch(datetime.now()), deadline) == "Late":
                 print("Warning: The submission deadline has passed. Your submission will be marked as late.")
 
             # 2. Enter Submission Details
@@ -388,7 +374,7 @@ class Assignment:
                 print("Error: Submission details cannot be empty.")
                 return
 
-            # Prepare submission data with the new status
+            # Prepare submission data; the queue stamps the time and status
             submission_data = {
                 'course_code': assigned_data['course_code'],
                 'assignment_name': assignment_details['assignment_name'],
@@ -396,21 +382,26 @@ class Assignment:
                 'student_id': student_assigned['student_id'],
                 'username': student_assigned['username'],
                 'submission_details': submission_details,
-                'submission_timestamp': submission_time.strftime("%Y-%m-%d %H:%M"),
+                'submission_timestamp': None,
+                'submission_epoch': None,
                 'deadline_date': assignment_details['deadline_date'],
                 'deadline_time': assignment_details['deadline_time'],
-                'status': submission_status  # Add status field based on deadline comparison
+                'deadline_epoch': deadline,
+                'status': None
             }
             
-            # Save the submission
-            submission_filename = f"{student_assigned['student_id']}_assignment_submission.json"
-            submission_path = os.path.join(self._assignments_directory, submission_filename)
-            
-            with open(submission_path, 'w') as f:
-                json.dump(submission_data, f, indent=4)
+            # Hand the submission to the intake queue under its (assignment,
+            # student) key and wait until its batch is saved
+            ticket = intake.put(submission_key, submission_data, deadline)
+            if ticket is None:
+                print("Error: You have already submitted this assignment.")
+                return
+            if not ticket.wait(SubmissionQueue.WAIT_TIMEOUT):
+                print(f"Assignment '{assignment_code}' was accepted at {submission_data['submission_timestamp']} and will be saved shortly.")
+                return submission_key
             
             print(f"Assignment '{assignment_code}' submitted successfully!")
-            return submission_path
+            return submission_key
         
         except FileNotFoundError as e:
             print(f"Error: {e}")
@@ -0,0 +1,55 @@
+# Whole-class enrollment: the per-student path against the bulk engine.
+#
+# Usage: python benchmarks/bench_bulk_enroll.py [--students 100 500 2000]
+#
+# The per-student path runs enroll_single_student for every match inside
+# one transaction, rewriting the growing course file once per student.
+# The bulk path is Enrollment.enroll_cohort, which writes it once.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_group_commit import make_class
+from enrollment import Enrollment
+from storage import Storage
+
+def per_student(repo):
+    start = time.perf_counter()
+    course_data = repo.load('course', 'BENCH01')
+    students = repo.find_students(major='BSCS', year_level='1st', semester='1st')
+    with contextlib.redirect_stdout(io.StringIO()), repo.transaction():
+        for student_data in students:
+            Enrollment.enroll_single_student(student_data, course_data, student_data['user_id'], 'BENCH01')
+    return time.perf_counter() - start
+
+def bulk(repo):
+    summary = Enrollment.enroll_cohort('BENCH01', major='BSCS', year_level='1st', semester='1st')
+    return summary['seconds']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, nargs='+', default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    print(f"{'students':>8} {'per-student (s)':>16} {'bulk (s)':>9} {'bulk students/sec':>18}")
+    for count in args.students:
+        timings = {}
+        for name, enroll in (('per-student', per_student), ('bulk', bulk)):
+            with tempfile.TemporaryDirectory(dir='.') as root:
+                os.chdir(root)
+                repo = Storage.configure('json')
+                make_class(repo, count)
+                timings[name] = enroll(repo)
+                assert len(repo.load('course', 'BENCH01')['enrolled_students']) == count
+                os.chdir('..')
+        print(f"{count:>8} {timings['per-student']:>16.2f} {timings['bulk']:>9.2f} {count / timings['bulk']:>18.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# Deadline scheduler: loading every open assignment and closing them as
+# their deadlines pass, against polling the assignment files.
+#
+# Usage: python benchmarks/bench_deadline_scheduler.py [--assignments 5000] [--roster 10] [--submitted 0.7] [--days 14]
+#
+# A scratch data/ tree gets --assignments assignments, each given to
+# --roster students, with deadlines spread over --days days and a share of
+# the students already submitted. The scheduler runs on a simulated clock
+# that is stepped one minute at a time over the whole span.
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from deadlinescheduler import DeadlineScheduler
+from storage import Storage
+
+START = 1_800_000_000 // 60 * 60
+
+def make_data(repo, assignments, roster, submitted, days):
+    students = [f"24-S{i:05d}" for i in range(roster * 20)]
+    expected = 0
+    with repo.transaction():
+        for i in range(assignments):
+            assignment_code = f"A{i:06d}"
+            deadline_epoch = START + random.randrange(days * 24 * 60) * 60
+            assigned_students = random.sample(students, roster)
+            repo.save('assigned', assignment_code, {
+                'assignment_code': assignment_code,
+                'course_code': f"C{i % 200:03d}",
+                'assignment_details': {'assignment_code': assignment_code, 'assignment_name': assignment_code,
+                                       'details': '', 'points': 100, 'deadline_date': None, 'deadline_time': None,
+                                       'deadline_epoch': deadline_epoch},
+                'assigned_students': [{'student_id': student_id, 'username': student_id}
+                                      for student_id in assigned_students]
+            })
+            for student_id in assigned_students:
+                if random.random() < submitted:
+                    repo.save('submission', repo.submission_key(assignment_code, student_id), {
+                        'assignment_code': assignment_code, 'student_id': student_id, 'status': 'On Time'})
+                else:
+                    expected += 1
+    return expected
+
+# One pass over the assignment files, as a scheduler polling them would make
+# every time it checks for passed deadlines
+def poll(directory):
+    deadlines = {}
+    for filename in os.listdir(directory):
+        if filename.endswith('_assigned.json'):
+            with open(os.path.join(directory, filename)) as f:
+                assigned_data = json.load(f)
+            deadlines[assigned_data['assignment_code']] = assigned_data['assignment_details']['deadline_epoch']
+    return deadlines
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--assignments', type=int, default=5000)
+    parser.add_argument('--roster', type=int, default=10, help="students per assignment")
+    parser.add_argument('--submitted', type=float, default=0.7, help="share of students who submitted")
+    parser.add_argument('--days', type=int, default=14, help="days the deadlines are spread over")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        repo = Storage.configure('json')
+        expected = make_data(repo, args.assignments, args.roster, args.submitted, args.days)
+
+        start = time.perf_counter()
+        poll('data/assignments')
+        poll_seconds = time.perf_counter() - start
+
+        now = [START - 60]
+        start = time.perf_counter()
+        scheduler = DeadlineScheduler(repo, clock=lambda: now[0])
+        load_seconds = time.perf_counter() - start
+
+        ticks, busiest, closed = 0, 0, 0
+        start = time.perf_counter()
+        while now[0] <= START + args.days * 24 * 3600 + DeadlineScheduler.GRACE:
+            now[0] += 60
+            tick = time.perf_counter()
+            closed_now = scheduler.run_due()
+            if closed_now:
+                ticks += 1
+                closed += len(closed_now)
+                busiest = max(busiest, time.perf_counter() - tick)
+        run_seconds = time.perf_counter() - start
+
+        missing = sum(len(missing_data['missing_students']) for _, missing_data in repo.load_all('missing'))
+        assert closed == args.assignments and missing == expected
+
+        print(f"assignments: {args.assignments}, roster: {args.roster}, simulated minutes: {args.days * 24 * 60}")
+        print(f"one poll of the assignment files: {poll_seconds * 1000:.1f} ms")
+        print(f"scheduler load: {load_seconds * 1000:.1f} ms")
+        print(f"closed {closed} assignment/s in {ticks} tick/s, {missing} missing submission/s recorded")
+        print(f"all minutes: {run_seconds:.2f}s, busiest tick: {busiest * 1000:.1f} ms")
+        os.chdir('/')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Whole-class enrollment cost with per-write fsync versus group commit.
+#
+# Usage: python benchmarks/bench_group_commit.py [--students 500]
+#
+# Per-write mode saves every student and the course in its own commit,
+# as a single-student enrollment would. Group mode wraps the whole class
+# in one repository transaction, so each directory is flushed once.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from enrollment import Enrollment
+from storage import Storage
+
+def make_class(repo, count):
+    repo.save('course', 'BENCH01', {
+        'course_code': 'BENCH01',
+        'course_name': 'Benchmark Course',
+        'credited_units': 3,
+        'assigned_college_room': 'CEIT',
+        'room_number': '1',
+        'day': 'Monday',
+        'start_time': '9:00',
+        'end_time': '11:00',
+        'instructor_id': None,
+        'name': None,
+        'enrolled_students': []
+    })
+    with repo.transaction():
+        for i in range(count):
+            user_id = f"24-{i:07d}"
+            repo.save('student', user_id, {
+                'user_id': user_id,
+                'username': f"user{i}",
+                'password': f"pw{i}",
+                'name': f"Student {i}",
+                'email': f"user{i}@example.edu",
+                'birthdate': '2004-01-01',
+                'address': 'Campus',
+                'gender': 'female',
+                'major': 'BSCS',
+                'year_level': '1st',
+                'semester': '1st',
+                'academic_year': '2024-2025',
+                'courses': []
+            })
+
+def enroll_class(repo, grouped):
+    course_data = repo.load('course', 'BENCH01')
+    students = repo.find_students(major='BSCS', year_level='1st', semester='1st')
+    batch = repo.transaction() if grouped else contextlib.nullcontext()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), batch:
+        for student_data in students:
+            Enrollment.enroll_single_student(student_data, course_data, student_data['user_id'], 'BENCH01')
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, nargs='+', default=[100, 500])
+    args = parser.parse_args()
+
+    print(f"{'students':>8} {'per-write (s)':>14} {'group (s)':>10} {'speedup':>8}")
+    for count in args.students:
+        timings = {}
+        for grouped in (False, True):
+            with tempfile.TemporaryDirectory(dir='.') as root:
+                os.chdir(root)
+                repo = Storage.configure('json')
+                make_class(repo, count)
+                timings[grouped] = enroll_class(repo, grouped)
+                os.chdir('..')
+        print(f"{count:>8} {timings[False]:>14.2f} {timings[True]:>10.2f} {timings[False] / timings[True]:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
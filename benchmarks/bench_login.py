@@ -0,0 +1,90 @@
+# Login latency against the size of data/users.
+#
+# Usage: python benchmarks/bench_login.py [--sizes 100 1000 10000 100000]
+#
+# Each size gets its own scratch data/ tree. The indexed path is timed
+# against the previous full-directory scan for the smaller sizes.
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from person import PlatformAdmin
+from storage import Storage
+
+def make_users(count):
+    os.makedirs('data/users', exist_ok=True)
+    for i in range(count):
+        user_id = f"24-{i:07d}"
+        with open(f'data/users/{user_id}_student_profile.json', 'w') as f:
+            json.dump({
+                'user_id': user_id,
+                'username': f"user{i}",
+                'password': f"pw{i}",
+                'name': f"Student {i}",
+                'major': 'BSCS',
+                'year_level': '1st',
+                'semester': '1st',
+                'academic_year': '2024-2025',
+                'courses': []
+            }, f, indent=4)
+
+# The pre-index login path: user_exists + authenticate_user, both full scans
+def scan_login(username, password):
+    found = None
+    for _ in range(2):
+        for filename in os.listdir('data/users'):
+            if filename.endswith('_student_profile.json'):
+                with open(os.path.join('data/users', filename), 'r') as f:
+                    user_data = json.load(f)
+                if user_data.get('username') == username and user_data.get('password') == password:
+                    found = user_data
+                    break
+    return found
+
+def time_logins(login, count, samples):
+    picks = [random.randrange(count) for _ in range(samples)]
+    start = time.perf_counter()
+    for i in picks:
+        assert login(f"user{i}", f"pw{i}")
+    return (time.perf_counter() - start) / samples * 1000
+
+def indexed_login(username, password):
+    return (PlatformAdmin.user_exists(username, 'student') and
+            PlatformAdmin.authenticate_user(username, password, 'student'))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--scan-limit', type=int, default=10000,
+                        help="largest size to also time the full-scan login on")
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'build (s)':>10} {'indexed (ms)':>13} {'scan (ms)':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            os.chdir(root)
+            make_users(size)
+
+            # Fresh repository and index for this tree
+            Storage.configure('json')
+            start = time.perf_counter()
+            PlatformAdmin.rebuild_user_index()
+            build = time.perf_counter() - start
+
+            indexed = time_logins(indexed_login, size, args.samples)
+            scan = '-'
+            if size <= args.scan_limit:
+                scan = f"{time_logins(scan_login, size, max(1, args.samples // 20)):.2f}"
+            print(f"{size:>8} {build:>10.2f} {indexed:>13.3f} {scan:>10}")
+            os.chdir('/')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Bulk room removal: closing a building moves its courses to the remaining
+# rooms of the same college at the same times.
+#
+# Usage: python benchmarks/bench_room_closure.py [--sections 2000] [--rooms 200] [--close 10]
+#
+# A scratch data/ tree gets rooms spread over ten colleges, filled by the
+# batch timetable solver, and every course gets a few enrolled students.
+# The first --close rooms of one college are then removed with --reassign.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from course import Room
+from references import References
+from storage import Storage
+from timetable import Timetable
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_timetable import COLLEGES, make_data, make_sections
+
+def enroll(repo, placed, students, per_course):
+    profiles = {f"24-S{i:05d}": {'user_id': f"24-S{i:05d}", 'username': f"student{i}", 'password': f"pw{i}",
+                                 'name': f"Student {i}", 'courses': []} for i in range(students)}
+    with repo.transaction():
+        for course_details in placed:
+            for student_id in random.sample(sorted(profiles), per_course):
+                profiles[student_id]['courses'].append(References.course_ref(course_details['course_code']))
+                course_details['enrolled_students'].append(References.student_ref(student_id))
+            repo.save('course', course_details['course_code'], course_details)
+        for student_id, student_data in profiles.items():
+            repo.save('student', student_id, student_data)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=2000)
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--instructors', type=int, default=150)
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--per-course', type=int, default=10)
+    parser.add_argument('--close', type=int, default=10, help="rooms of the building to close")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        repo = Storage.configure('json')
+        make_data(repo, args.rooms, args.instructors)
+        result = Timetable.schedule(repo, make_sections(args.sections, args.instructors))
+        enroll(repo, result['placed'], args.students, args.per_course)
+
+        college = COLLEGES[0]
+        building = sorted((room_key for room_key in repo.keys('room') if room_key.startswith(f"{college}_")),
+                          key=lambda room_key: int(room_key.split('_')[1]))[:args.close]
+        courses = sum(len(repo.room_course_codes(room_key)) for room_key in building)
+
+        start = time.perf_counter()
+        result = Room.delete_rooms(building, reassign=True)
+        seconds = time.perf_counter() - start
+
+        print(f"rooms: {args.rooms}, courses: {repo.count('course')}, closing {len(building)} {college} rooms "
+              f"with {courses} course/s")
+        print(f"moved: {len(result['moved'])}, stuck: {len(result['stuck'])}, removed: {len(result['removed'])}, "
+              f"kept: {len(result['kept'])}")
+        print(f"reassign and remove: {seconds:.2f}s")
+        os.chdir('/')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Room conflict checks: linear scan of "HH:MM" slots against RoomSchedule.
+#
+# Usage: python benchmarks/bench_room_schedule.py [--slots 1000 3000 7000]
+#
+# Each room is packed with back-to-back slots across Monday to Friday, as
+# many as requested. Queries are random proposed slots on random days.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from roomschedule import RoomSchedule, to_minutes, to_time
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+def make_slots(count):
+    per_day = -(-count // len(DAYS))
+    length = max(1, 24 * 60 // per_day)
+    slots = []
+    for i in range(count):
+        start = (i % per_day) * length
+        slots.append({'day': DAYS[i // per_day], 'start_time': to_time(start), 'end_time': to_time(start + length)})
+    return slots
+
+# The previous check: reparse and compare every slot, stop at the first clash
+def linear_conflict(slots, day, start, end):
+    for slot in slots:
+        if slot['day'] == day:
+            if not (end <= to_minutes(slot['start_time']) or start >= to_minutes(slot['end_time'])):
+                return slot
+    return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--slots', type=int, nargs='+', default=[1000, 3000, 7000])
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'slots':>6} {'build (ms)':>11} {'linear (us)':>12} {'interval (us)':>14} {'add+remove (us)':>16}")
+    for count in args.slots:
+        slots = make_slots(count)
+        queries = []
+        for _ in range(args.queries):
+            start = random.randrange(0, 23 * 60)
+            queries.append((random.choice(DAYS), start, start + random.randrange(30, 120)))
+
+        start_time = time.perf_counter()
+        schedule = RoomSchedule(slots)
+        build = (time.perf_counter() - start_time) * 1000
+
+        start_time = time.perf_counter()
+        for day, start, end in queries:
+            linear_conflict(slots, day, start, end)
+        linear = (time.perf_counter() - start_time) / len(queries) * 1e6
+
+        start_time = time.perf_counter()
+        for day, start, end in queries:
+            schedule.conflicts(day, start, end)
+        interval = (time.perf_counter() - start_time) / len(queries) * 1e6
+
+        start_time = time.perf_counter()
+        for day, start, end in queries:
+            schedule.add(day, start, end, None)
+            schedule.remove(day, start, end)
+        update = (time.perf_counter() - start_time) / len(queries) * 1e6
+
+        print(f"{count:>6} {build:>11.2f} {linear:>12.1f} {interval:>14.1f} {update:>16.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Room utilization report: occupancy matrix build and every aggregate.
+#
+# Usage: python benchmarks/bench_room_usage.py [--rooms 1000 5000 20000]
+#
+# Rooms are spread over ten colleges with a random week of 1-3 hour classes
+# each. Records are served from memory so the timings cover the matrix and
+# the report figures, not reading room files.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from roomschedule import to_time
+from roomusage import RoomUsage
+from snapshot import SnapshotRepository
+
+def make_rooms(count, classes):
+    rooms = {}
+    for i in range(count):
+        scheduled_times = []
+        for _ in range(random.randint(0, classes)):
+            start = random.randrange(7 * 60, 19 * 60, 30)
+            scheduled_times.append({'day': random.choice(RoomUsage.DAYS), 'start_time': to_time(start),
+                                    'end_time': to_time(start + random.choice([60, 90, 120, 180]))})
+        college = f"COL{i % 10}"
+        rooms[f"{college}_{i}"] = {'assigned_college_room': college, 'room_number': str(i),
+                                   'scheduled_times': scheduled_times}
+    return rooms
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--classes', type=int, default=25, help="most classes per room and week")
+    args = parser.parse_args()
+
+    print(f"{'rooms':>6} {'slots':>7} {'build (ms)':>11} {'report (ms)':>12} {'total (ms)':>11}")
+    for count in args.rooms:
+        rooms = make_rooms(count, args.classes)
+        repo = SnapshotRepository({'room': rooms}, None)
+        slots = sum(len(room['scheduled_times']) for room in rooms.values())
+
+        start = time.perf_counter()
+        usage = RoomUsage.build(repo)
+        build = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        usage.by_room()
+        usage.by_college()
+        usage.by_day()
+        usage.by_hour()
+        usage.heatmap()
+        usage.idle_rooms(0.1)
+        usage.heatmap('COL3')
+        report = (time.perf_counter() - start) * 1000
+
+        print(f"{count:>6} {slots:>7} {build:>11.1f} {report:>12.1f} {build + report:>11.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Cold-start cost of reading every record: directory walk vs snapshot.
+#
+# Usage: python benchmarks/bench_snapshot.py [--sizes 10000 100000 1000000]
+#
+# Each size gets its own scratch data/ tree of student profiles. The walk
+# reads them the way load_all() does with an empty cache; the snapshot
+# timings are one build and one cold load of data/snapshot.bin.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_login import make_users
+from jsoncache import JsonCache
+from snapshot import Snapshot
+from storage import JsonRepository
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'records':>8} {'walk (s)':>9} {'build (s)':>10} {'load (s)':>9} {'size (MiB)':>11} {'speedup':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            os.chdir(root)
+            make_users(size)
+
+            # Empty cache so every record is read from its file
+            repo = JsonRepository(JsonCache())
+            repo.count('student')
+            walk, _ = timed(lambda: sum(1 for _ in repo.load_all('student')))
+
+            build, _ = timed(lambda: Snapshot.build(JsonRepository(JsonCache(0))))
+
+            Snapshot._loaded = None
+            load, snapshot = timed(lambda: Snapshot.load())
+            assert snapshot.count('student') == size
+
+            mib = os.path.getsize(Snapshot.PATH) / 1024 / 1024
+            print(f"{size:>8} {walk:>9.2f} {build:>10.2f} {load:>9.3f} {mib:>11.1f} {walk / load:>7.0f}x")
+            os.chdir('/')
+
+if __name__ == '__main__':
+    main()
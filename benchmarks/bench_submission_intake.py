@@ -0,0 +1,108 @@
+# Deadline-time submission spike: acceptance latency with one save per
+# submission versus the batched intake queue.
+#
+# Usage: python benchmarks/bench_submission_intake.py [--submissions 5000] [--window 10] [--workers 512]
+#
+# One assignment is given to every student of a scratch data/ tree. The
+# submissions arrive at random over --window seconds, weighted towards the
+# end as they are before a deadline, and are handled by a pool of worker
+# threads standing in for concurrent sessions. Latency runs from a
+# submission's arrival until it is on disk.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from deadlines import Deadlines
+from storage import Storage
+from submissionqueue import SubmissionQueue
+
+ASSIGNMENT = 'BENCH_ASSIGNMENT'
+
+def make_submissions(count):
+    return [{
+        'course_code': 'BENCH01',
+        'assignment_name': 'Benchmark',
+        'assignment_code': ASSIGNMENT,
+        'student_id': f"24-{i:07d}",
+        'username': f"Student {i}",
+        'submission_details': f"answer {i}",
+        'submission_timestamp': None,
+        'submission_epoch': None,
+        'deadline_date': None,
+        'deadline_time': None,
+        'deadline_epoch': None,
+        'status': None
+    } for i in range(count)]
+
+# Arrival offsets in seconds, most of them close to the end of the window
+def make_arrivals(count, window):
+    return sorted(window * (1 - random.random() ** 3) for _ in range(count))
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def run(mode, repo, submissions, arrivals, workers, deadline):
+    latencies = []
+    save_lock = threading.Lock()
+    intake = SubmissionQueue(repo)
+
+    def accept(submission, arrived):
+        key = repo.submission_key(ASSIGNMENT, submission['student_id'])
+        if mode == 'direct':
+            now = datetime.now()
+            submission['submission_timestamp'] = now.strftime("%Y-%m-%d %H:%M")
+            submission['submission_epoch'] = Deadlines.minute_epoch(now)
+            submission['status'] = Deadlines.status(submission['submission_epoch'], deadline)
+            with save_lock:
+                repo.save('submission', key, submission)
+        else:
+            intake.put(key, submission, deadline).wait()
+        latencies.append(time.perf_counter() - arrived)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        for submission, offset in zip(submissions, arrivals):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(accept, submission, start + offset)
+    elapsed = time.perf_counter() - start
+    intake.close()
+    return latencies, elapsed, intake.stats()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=5000)
+    parser.add_argument('--window', type=float, default=10, help="seconds over which the submissions arrive")
+    parser.add_argument('--workers', type=int, default=512, help="concurrent sessions")
+    args = parser.parse_args()
+
+    deadline = Deadlines.minute_epoch(datetime.now() + timedelta(minutes=5))
+    arrivals = make_arrivals(args.submissions, args.window)
+
+    print(f"{args.submissions} submissions in {args.window:g}s, {args.workers} sessions")
+    print(f"{'mode':>7} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} {'elapsed (s)':>12} {'batches':>8}")
+    for mode in ('direct', 'queue'):
+        with tempfile.TemporaryDirectory() as root:
+            os.chdir(root)
+            repo = Storage.configure('json')
+            latencies, elapsed, stats = run(mode, repo, make_submissions(args.submissions), arrivals,
+                                            args.workers, deadline)
+            assert repo.count('submission') == args.submissions
+            batches = stats['batches'] if mode == 'queue' else args.submissions
+            print(f"{mode:>7} {percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} "
+                  f"{max(latencies) * 1000:>9.1f} {elapsed:>12.2f} {batches:>8}")
+            os.chdir('/')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# "Who hasn't submitted": the per-assignment report from the assigned and
+# submitted id sets against scanning every submission record.
+#
+# Usage: python benchmarks/bench_submission_report.py [--assignments 2000] [--roster 30] [--queries 200]
+#
+# Uses the scratch data/ tree of bench_deadline_scheduler. The scan is the
+# old route: the assigned_students list combined with a pass over every
+# submission in data/assignments.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from storage import Storage
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_deadline_scheduler import make_data
+
+def scan(repo, assignment_code):
+    assigned = {student['student_id'] for student in repo.load('assigned', assignment_code)['assigned_students']}
+    submitted = {data['student_id'] for _, data in repo.load_all('submission')
+                 if data.get('assignment_code') == assignment_code}
+    return sorted(assigned - submitted)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--assignments', type=int, default=2000)
+    parser.add_argument('--roster', type=int, default=30, help="students per assignment")
+    parser.add_argument('--submitted', type=float, default=0.7, help="share of students who submitted")
+    parser.add_argument('--queries', type=int, default=200, help="assignments to report on")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        repo = Storage.configure('json')
+        make_data(repo, args.assignments, args.roster, args.submitted, 14)
+        codes = random.sample(repo.keys('assigned'), min(args.queries, args.assignments))
+        scanned = codes[:max(1, len(codes) // 20)]
+
+        start = time.perf_counter()
+        expected = {code: scan(repo, code) for code in scanned}
+        scan_ms = (time.perf_counter() - start) * 1000 / len(scanned)
+
+        start = time.perf_counter()
+        reports = {code: repo.submission_report(code) for code in codes}
+        report_ms = (time.perf_counter() - start) * 1000 / len(codes)
+
+        assert all(reports[code]['not_submitted'] == expected[code] for code in scanned)
+        print(f"assignments: {args.assignments}, submissions: {repo.count('submission')}, roster: {args.roster}")
+        print(f"scan per assignment:   {scan_ms:.2f} ms ({len(scanned)} queries)")
+        print(f"report per assignment: {report_ms:.3f} ms ({len(codes)} queries)")
+        os.chdir('/')
+
+if __name__ == '__main__':
+    main()
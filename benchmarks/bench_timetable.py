@@ -0,0 +1,91 @@
+# Batch timetable solver: sections placed, time to solve and to write.
+#
+# Usage: python benchmarks/bench_timetable.py [--sections 1000] [--rooms 200]
+#
+# A scratch data/ tree gets empty rooms spread over ten colleges and a pool
+# of instructors. Sections prefer one or two colleges and half of them have
+# an instructor. The result is checked for room and instructor overlaps.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from roomschedule import to_minutes
+from storage import JsonRepository
+from timetable import Timetable
+
+COLLEGES = [f"COL{i}" for i in range(10)]
+
+def make_data(repo, rooms, instructors):
+    with repo.transaction():
+        for i in range(rooms):
+            college = COLLEGES[i % len(COLLEGES)]
+            repo.save('room', f"{college}_{i}", {'assigned_college_room': college, 'room_number': str(i),
+                                                 'scheduled_times': []})
+        for i in range(instructors):
+            repo.save('instructor', f"24-I{i:05d}", {'user_id': f"24-I{i:05d}", 'username': f"instructor{i}",
+                                                     'password': f"pw{i}", 'name': f"Instructor {i}",
+                                                     'assigned_courses': []})
+
+def make_sections(count, instructors):
+    sections = []
+    for i in range(count):
+        units = random.randint(2, 5)
+        sections.append({
+            'course_code': f"S{i:05d}",
+            'course_name': f"Section {i}",
+            'credited_units': units,
+            'duration_minutes': random.choice([60, 90, 120, 180]),
+            'preferred_colleges': random.sample(COLLEGES, random.randint(1, 2)),
+            'instructor_id': f"24-I{random.randrange(instructors):05d}" if random.random() < 0.5 else None
+        })
+    return sections
+
+# Every pair of courses sharing a room or an instructor on a day must not overlap
+def overlaps(placed):
+    booked = {}
+    for course in placed:
+        room_key = ('room', course['assigned_college_room'], course['room_number'], course['day'])
+        keys = [room_key] + ([('instructor', course['instructor_id'], course['day'])] if course['instructor_id'] else [])
+        for key in keys:
+            booked.setdefault(key, []).append((to_minutes(course['start_time']), to_minutes(course['end_time'])))
+    found = 0
+    for slots in booked.values():
+        slots.sort()
+        found += sum(1 for (_, end), (start, _) in zip(slots, slots[1:]) if start < end)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sections', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--instructors', type=int, default=150)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        repo = JsonRepository()
+        make_data(repo, args.rooms, args.instructors)
+        sections = make_sections(args.sections, args.instructors)
+
+        start = time.perf_counter()
+        timetable = Timetable(repo)
+        placed, unplaced = timetable.solve(sections)
+        solve = time.perf_counter() - start
+
+        start = time.perf_counter()
+        timetable.write(placed)
+        write = time.perf_counter() - start
+
+        print(f"sections: {len(sections)}, rooms: {args.rooms}, instructors: {args.instructors}")
+        print(f"placed: {len(placed)}, unplaced: {len(unplaced)}, overlaps: {overlaps(placed)}")
+        print(f"solve: {solve:.2f}s, write: {write:.2f}s")
+        os.chdir('/')
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 import json
 from tabulate import tabulate
-import os
 from datetime import datetime
+from storage import RecordNotFound, Storage
+from snapshot import Snapshot
+from references import References
+from roomschedule import InstructorSchedules, RoomSchedule, RoomSchedules, to_minutes, to_time
+from freeslots import FreeSlotFinder
 
 class Room():
     def __init__(self, assigned_college_room, room_number):
@@ -13,8 +17,7 @@ class Room():
     # Check if a room is already created or exists in the system
     @staticmethod
     def is_room_already_created(assigned_college_room, room_number):
-        filename = f'data/rooms/{assigned_college_room}_{room_number}_room.json'
-        return os.path.exists(filename)
+        return Storage.repo().exists('room', f"{assigned_college_room}_{room_number}")
     
     @staticmethod
     def create_room():
@@ -39,14 +42,9 @@ class Room():
             "scheduled_times": []
         }
         
-        # Ensure data directory exists
-        os.makedirs('data/rooms', exist_ok=True)
-        
         # Save room information
-        filename = f'data/rooms/{assigned_college_room}_{room_number}_room.json'
         try:
-            with open(filename, 'w') as f:
-                json.dump(room_data, f, indent=4)
+            Storage.repo().save('room', f"{assigned_college_room}_{room_number}", room_data)
             
             print(f"Room {assigned_college_room} {room_number} created successfully!")
             return room_data
@@ -58,15 +56,10 @@ class Room():
     def show_all_rooms_with_schedule(cls):
         rooms_data = []
         
-        # Find all room JSON files
+        # Load every room
         try:
-            room_files = [f for f in os.listdir('data/rooms') if f.endswith('_room.json')]
-            
-            for room_file in room_files:
+            for room_key, room_details in Storage.repo().load_all('room'):
                 try:
-                    with open(os.path.join('data/rooms', room_file), 'r') as f:
-                        room_details = json.load(f)
-                    
                     # Prepare room data for display
                     rooms_data.append([
                         room_details['assigned_college_room'],
@@ -77,7 +70,7 @@ class Room():
                     ])
                 
                 except Exception as e:
-                    print(f"Error processing {room_file}: {e}")
+                    print(f"Error processing room {room_key}: {e}")
                     continue
             
             # Display rooms using tabulate
@@ -96,24 +89,141 @@ class Room():
         assigned_college_room = input("Enter Assigned College Room: ").strip().upper()
         room_number = input("Enter Room Number: ").strip()
         
-        # Construct the filename
-        filename = f'data/rooms/{assigned_college_room}_{room_number}_room.json'
+        room_key = f"{assigned_college_room}_{room_number}"
+        repo = Storage.repo()
         
-        # Check if room exists and remove
         try:
-            if os.path.exists(filename):
-                os.remove(filename)
-                print(f"Room {assigned_college_room} {room_number} removed successfully!")
-            else:
+            if not repo.exists('room', room_key):
                 print(f"Room {assigned_college_room} {room_number} not found.")
+                return
+
+            # Courses still scheduled in the room must move first
+            course_codes = repo.room_course_codes(room_key)
+            if course_codes:
+                print(f"Room {assigned_college_room} {room_number} still has {len(course_codes)} course/s scheduled:")
+                courses_data = []
+                for course_code in course_codes:
+                    course_details = repo.load('course', course_code)
+                    courses_data.append([course_code, course_details.get('course_name'), course_details.get('day'),
+                                         course_details.get('start_time'), course_details.get('end_time')])
+                print(tabulate(courses_data, headers=["Code", "Name", "Day", "Start Time", "End Time"], tablefmt="grid"))
+
+                print(f"1 - Move them to other {assigned_college_room} rooms at the same times and remove the room")
+                print("2 - Keep the room")
+                if input("Enter your choice: ").strip() != '1':
+                    print(f"Room {assigned_college_room} {room_number} was not removed.")
+                    return
+
+            result = Room.delete_rooms([room_key], reassign=True)
+            Room.print_removal_summary(result)
         except Exception as e:
             print(f"Error removing room: {e}")
+
+    # Move the courses scheduled in the given rooms to other rooms of the same
+    # college at the same day and time, so no student's or instructor's
+    # timetable changes. Free rooms come from the free-slot search; rooms
+    # taken earlier in the same batch are checked as well. The courses and
+    # rooms are written in one transaction.
+    # Returns (moved [(course_code, from room, to room)], stuck [(course_code, room)])
+    @staticmethod
+    def reassign_courses(room_keys):
+        repo = Storage.repo()
+        closing = set(room_keys)
+        finder = FreeSlotFinder.shared()
+        taken = {}  # room key -> RoomSchedule of slots given out in this batch
+
+        moved, stuck, courses = [], [], {}
+        for room_key in room_keys:
+            for course_code in repo.room_course_codes(room_key):
+                course_details = repo.load('course', course_code)
+                try:
+                    start, end = to_minutes(course_details['start_time']), to_minutes(course_details['end_time'])
+                except (KeyError, ValueError, AttributeError):
+                    stuck.append((course_code, room_key))
+                    continue
+
+                # Search whole slots covering the course's time
+                first = start // FreeSlotFinder.GRANULARITY * FreeSlotFinder.GRANULARITY
+                last = -(-end // FreeSlotFinder.GRANULARITY) * FreeSlotFinder.GRANULARITY
+                candidates = finder.find(last - first, days=[course_details.get('day')],
+                                         college=course_details.get('assigned_college_room'),
+                                         earliest=to_time(first), latest=to_time(last))
+                target = next((candidate[0] for candidate in candidates
+                               if candidate[0] not in closing
+                               and not (candidate[0] in taken and taken[candidate[0]].conflicts(course_details.get('day'), start, end))),
+                              None)
+                if target is None:
+                    stuck.append((course_code, room_key))
+                    continue
+
+                taken.setdefault(target, RoomSchedule()).add(course_details.get('day'), start, end, course_code)
+                courses[course_code] = course_details
+                moved.append((course_code, room_key, target))
+
+        if not moved:
+            return moved, stuck
+
+        # Profiles only refer to the courses, so a move rewrites the course
+        # and the two rooms
+        rooms = {room_key: repo.load('room', room_key) for course_code, source, target in moved for room_key in (source, target)}
+
+        with repo.transaction():
+            for course_code, source, target in moved:
+                course_details = courses[course_code]
+                course_details['assigned_college_room'] = rooms[target]['assigned_college_room']
+                course_details['room_number'] = rooms[target]['room_number']
+                repo.save('course', course_code, course_details)
+
+                slot = {
+                    'day': course_details['day'],
+                    'start_time': course_details['start_time'],
+                    'end_time': course_details['end_time']
+                }
+                rooms[target].setdefault('scheduled_times', []).append(slot)
+                scheduled_times = rooms[source].get('scheduled_times', [])
+                if slot in scheduled_times:
+                    scheduled_times.remove(slot)
+
+            for room_key, room_data in rooms.items():
+                repo.save('room', room_key, room_data)
+
+        return moved, stuck
+
+    # Remove rooms, first moving their courses elsewhere when reassign is set.
+    # A room that still has courses scheduled in it is kept.
+    # Returns {'removed': [room keys], 'kept': {room key: [course codes]}, 'moved': [...], 'stuck': [...]}
+    @staticmethod
+    def delete_rooms(room_keys, reassign=False):
+        repo = Storage.repo()
+        moved, stuck = Room.reassign_courses(room_keys) if reassign else ([], [])
+
+        removed, kept = [], {}
+        with repo.transaction():
+            for room_key in room_keys:
+                course_codes = repo.room_course_codes(room_key)
+                if course_codes:
+                    kept[room_key] = course_codes
+                else:
+                    repo.delete('room', room_key)
+                    removed.append(room_key)
+        return {'removed': removed, 'kept': kept, 'moved': moved, 'stuck': stuck}
+
+    @staticmethod
+    def print_removal_summary(result):
+        if result['moved']:
+            print(tabulate(result['moved'], headers=["Course", "From Room", "To Room"], tablefmt="grid"))
+        if result['stuck']:
+            print("\nNo free room in the same college at the same time for:")
+            print(tabulate(result['stuck'], headers=["Course", "Room"], tablefmt="grid"))
+        for room_key in result['removed']:
+            print(f"Room {room_key.replace('_', ' ', 1)} removed successfully!")
+        for room_key, course_codes in result['kept'].items():
+            print(f"Room {room_key.replace('_', ' ', 1)} was not removed; still scheduled: {', '.join(course_codes)}")
     
     # Check if a room is registered in the system
     @classmethod
     def is_room_registered(cls, assigned_college_room, room_number):
-        filename = f'data/rooms/{assigned_college_room}_{room_number}_room.json'
-        return os.path.exists(filename)
+        return Storage.repo().exists('room', f"{assigned_college_room}_{room_number}")
     
 
 class Schedule(Room):
@@ -153,16 +263,9 @@ class Schedule(Room):
         
         # Check room schedule conflict
         if cls.check_room_schedule_conflict(course_details):
-            # Ensure courses directory exists
-            os.makedirs('data/courses', exist_ok=True)
-            
-            # Create course filename
-            course_filename = f'data/courses/{course_name}_course.json'
-            
             # Save course schedule
             try:
-                with open(course_filename, 'w') as f:
-                    json.dump(course_details, f, indent=4)
+                Storage.repo().save('course', course_name, course_details)
                 
                 print(f"Course {course_name} scheduled successfully!")
                 return course_details
@@ -181,53 +284,41 @@ class Schedule(Room):
         proposed_start_time = course_details.get('start_time')
         proposed_end_time = course_details.get('end_time')
         
-        # Construct room filename
-        room_filename = f'data/rooms/{assigned_college_room}_{room_number}_room.json'
+        room_key = f"{assigned_college_room}_{room_number}"
         
         # Check if room exists
-        if not os.path.exists(room_filename):
+        schedule = RoomSchedules.get(room_key)
+        if schedule is None:
             print(f"Room {assigned_college_room} {room_number} is not registered!")
             return False
         
-        # Read existing room schedules
         try:
-            with open(room_filename, 'r') as f:
-                room_data = json.load(f)
-            
-            # Get existing scheduled times
-            scheduled_times = room_data.get('scheduled_times', [])
-            
-            # Convert times to minutes for comparison
-            def time_to_minutes(time_str):
-                hours, minutes = map(int, time_str.split(':'))
-                return hours * 60 + minutes
+            proposed_start = to_minutes(proposed_start_time)
+            proposed_end = to_minutes(proposed_end_time)
             
-            proposed_start = time_to_minutes(proposed_start_time)
-            proposed_end = time_to_minutes(proposed_end_time)
-            
-            # Check for conflicts on the same day
-            for schedule in scheduled_times:
-                if schedule.get('day') == proposed_day:
-                    sched_start = time_to_minutes(schedule.get('start_time'))
-                    sched_end = time_to_minutes(schedule.get('end_time'))
-                    
-                    # Check for time overlap
-                    if not (proposed_end <= sched_start or proposed_start >= sched_end):
-                        print(f"Time conflict in room {assigned_college_room} {room_number} on {proposed_day}!")
-                        print(f"Conflicting Schedule: {schedule.get('start_time')} - {schedule.get('end_time')}")
-                        return False
+            # Every existing slot on the same day that overlaps the proposed one
+            conflicts = schedule.conflicts(proposed_day, proposed_start, proposed_end)
+            if conflicts:
+                print(f"Time conflict in room {assigned_college_room} {room_number} on {proposed_day}!")
+                for slot in conflicts:
+                    print(f"Conflicting Schedule: {slot.get('start_time')} - {slot.get('end_time')}")
+                return False
             
             # No conflicts found, add new schedule
-            scheduled_times.append({
+            new_slot = {
                 'day': proposed_day,
                 'start_time': proposed_start_time,
                 'end_time': proposed_end_time
-            })
+            }
             
             # Update room JSON with new schedule
-            room_data['scheduled_times'] = scheduled_times
-            with open(room_filename, 'w') as f:
-                json.dump(room_data, f, indent=4)
+            room_data = Storage.repo().load('room', room_key)
+            room_data.setdefault('scheduled_times', []).append(new_slot)
+            Storage.repo().save('room', room_key, room_data)
+            
+            # Saving dropped the cached schedule; keep the updated one instead
+            schedule.add(proposed_day, proposed_start, proposed_end, new_slot)
+            RoomSchedules.put(room_key, schedule)
             
             return True
         
@@ -235,6 +326,57 @@ class Schedule(Room):
             print(f"Error checking room schedule: {e}")
             return False
 
+    # After a conflict, list free slots of the same length in the same college
+    # and let the user pick one. Returns the course details moved to the chosen
+    # room and time, or None if none was chosen.
+    @staticmethod
+    def choose_free_slot(course_details, limit=10):
+        try:
+            requested_start = to_minutes(course_details.get('start_time'))
+            duration = to_minutes(course_details.get('end_time')) - requested_start
+        except (AttributeError, ValueError):
+            return None
+        if duration <= 0:
+            return None
+
+        requested_room = f"{course_details.get('assigned_college_room')}_{course_details.get('room_number')}"
+        candidates = FreeSlotFinder.shared().find(duration, college=course_details.get('assigned_college_room'))
+        if not candidates:
+            print("No free slots of that length found in this college.")
+            return None
+
+        # Same room and day first, then nearest start time; one start per room and day
+        candidates.sort(key=lambda candidate: (candidate[0] != requested_room,
+                                               candidate[1] != course_details.get('day'),
+                                               abs(to_minutes(candidate[2]) - requested_start)))
+        nearest = {}
+        for candidate in candidates:
+            nearest.setdefault(candidate[:2], candidate)
+        candidates = list(nearest.values())[:limit]
+
+        rooms = {}
+        for room_key in {candidate[0] for candidate in candidates}:
+            room_data = Storage.repo().load('room', room_key)
+            rooms[room_key] = (room_data.get('assigned_college_room'), room_data.get('room_number'))
+
+        print("\nFree alternatives:")
+        print(tabulate([[number, *rooms[room_key], day, start_time, end_time]
+                        for number, (room_key, day, start_time, end_time) in enumerate(candidates, 1)],
+                       headers=["#", "College Room", "Room Number", "Day", "Start Time", "End Time"],
+                       tablefmt="grid"))
+
+        choice = input(f"Choose an alternative (1-{len(candidates)}) or press Enter to cancel: ").strip()
+        if not choice:
+            return None
+        if not choice.isdigit() or not 1 <= int(choice) <= len(candidates):
+            print("Invalid choice!")
+            return None
+        room_key, day, start_time, end_time = candidates[int(choice) - 1]
+
+        assigned_college_room, room_number = rooms[room_key]
+        return dict(course_details, assigned_college_room=assigned_college_room, room_number=room_number,
+                    day=day, start_time=start_time, end_time=end_time)
+
 class Course(Schedule, Room):   
     # Class attributes
     _total_courses = 0
@@ -266,25 +408,12 @@ class Course(Schedule, Room):
     
     def save_course_details(self, instructor_id):
         
-        # Construct the filename for the instructor's profile
-        filename = f'data/users/{instructor_id}_instructor_profile.json'
-        
-        # Prepare the course details dictionary
-        course_data = {
-            'course_code': self._course_code,
-            'course_name': self._course_name,
-            'credited_units': self._credited_units,
-            'college_room': self._assigned_college_room,
-            'room_number': self._room_number,
-            'day': self._day,
-            'start_time': self._start_time,
-            'end_time': self._end_time   
-        }
+        # The profile refers to the course; its details stay in the course record
+        course_data = References.course_ref(self._course_code)
         
         try:
             # Read the existing instructor profile
-            with open(filename, 'r') as f:
-                instructor_profile = json.load(f)
+            instructor_profile = Storage.repo().load('instructor', instructor_id)
             
             # Check if 'assigned_courses' exists, if not create it
             if 'assigned_courses' not in instructor_profile:
@@ -293,14 +422,13 @@ class Course(Schedule, Room):
             # Add the new course to the assigned courses
             instructor_profile['assigned_courses'].append(course_data)
             
-            # Write the updated profile back to the file
-            with open(filename, 'w') as f:
-                json.dump(instructor_profile, f, indent=4)
+            # Write the updated profile back
+            Storage.repo().save('instructor', instructor_id, instructor_profile)
             
-            print(f"Course details saved successfully to {filename}")
+            print(f"Course details saved successfully for instructor {instructor_id}")
         
-        except FileNotFoundError:
-            print(f"Instructor profile file not found: {filename}")
+        except RecordNotFound:
+            print(f"Instructor profile not found: {instructor_id}")
         except Exception as e:
             print(f"Error saving course details: {e}")
 
@@ -343,21 +471,20 @@ class Course(Schedule, Room):
         }
 
         # Step 1: Validate Room Existence
-        room_filename = f'data/rooms/{assigned_college_room}_{room_number}_room.json'
-        if not os.path.exists(room_filename):
+        if not Storage.repo().exists('room', f"{assigned_college_room}_{room_number}"):
             print(f"Room {assigned_college_room} {room_number} is not registered in the system!")
             return
 
         # Step 2: Check Room Schedule Conflicts
         if not Schedule.check_room_schedule_conflict(course_details):
-            print("Cannot create course due to scheduling conflict.")
-            return
+            course_details = Schedule.choose_free_slot(course_details)
+            if course_details is None or not Schedule.check_room_schedule_conflict(course_details):
+                print("Cannot create course due to scheduling conflict.")
+                return
 
         # Step 3: Save Course Details
         try:
-            os.makedirs('data/courses', exist_ok=True)
-            with open(f'data/courses/{course_code}_course.json', 'w') as f:
-                json.dump(course_details, f, indent=4)
+            Storage.repo().save('course', course_code, course_details)
 
             print("Course added successfully! Instructor can be assigned later.")
         except Exception as e:
@@ -367,26 +494,24 @@ class Course(Schedule, Room):
         course_code = input("Enter Course Code to Assign: ").strip()
         instructor_id = input("Enter Instructor ID: ").strip()
 
+        repo = Storage.repo()
+
         # Check if course exists
-        course_path = f'data/courses/{course_code}_course.json'
-        if not os.path.exists(course_path):
+        if not repo.exists('course', course_code):
             print(f"Course {course_code} does not exist.")
             return
 
         # Check if instructor profile exists
-        instructor_profile_path = f'data/users/{instructor_id}_instructor_profile.json'
-        if not os.path.exists(instructor_profile_path):
+        if not repo.exists('instructor', instructor_id):
             print(f"No profile found for instructor {instructor_id}.")
             return
 
         try:
             # Load course details
-            with open(course_path, 'r') as f:
-                course_details = json.load(f)
+            course_details = repo.load('course', course_code)
 
             # Load instructor profile
-            with open(instructor_profile_path, 'r') as f:
-                instructor_profile = json.load(f)
+            instructor_profile = repo.load('instructor', instructor_id)
 
             username = instructor_profile.get('name', 'N/A')
 
@@ -394,138 +519,160 @@ class Course(Schedule, Room):
             course_details['instructor_id'] = instructor_id
             course_details['name'] = username
 
-            # Save updated course details
-            with open(course_path, 'w') as f:
-                json.dump(course_details, f, indent=4)
-
             # Update instructor's profile with course assignment
-            new_course_entry = {
-                'course_code': course_code,
-                'course_name': course_details['course_name'],
-                'credited_units': course_details['credited_units'],
-                'assigned_college_room': course_details['assigned_college_room'],
-                'room_number': course_details['room_number'],
-                'day': course_details['day'],
-                'start_time': course_details['start_time'],
-                'end_time': course_details['end_time']
-            }
+            new_course_entry = References.course_ref(course_code)
 
             if 'assigned_courses' not in instructor_profile:
                 instructor_profile['assigned_courses'] = []
 
-            if not any(course['course_code'] == course_code for course in instructor_profile['assigned_courses']):
-                instructor_profile['assigned_courses'].append(new_course_entry)
-                with open(instructor_profile_path, 'w') as f:
-                    json.dump(instructor_profile, f, indent=4)
-                print(f"Course {course_code} successfully assigned to instructor {instructor_id}.")
-            else:
-                print(f"Course {course_code} is already assigned to instructor {instructor_id}.")
+            # Reject a course that meets while the instructor is already teaching
+            schedule = InstructorSchedules.get(instructor_id, instructor_profile)
+            clashes = [
+                course for course in schedule.conflicts(course_details['day'], to_minutes(course_details['start_time']),
+                                                        to_minutes(course_details['end_time']))
+                if course.get('course_code') != course_code
+            ]
+            if clashes:
+                print(f"Instructor {instructor_id} is already teaching at that time on {course_details['day']}!")
+                for course in clashes:
+                    print(f"Conflicting Course: {course.get('course_code')} {course.get('start_time')} - {course.get('end_time')}")
+                print(f"Course {course_code} was not assigned.")
+                return
+
+            # Save the course and the instructor profile together
+            with repo.transaction():
+                repo.save('course', course_code, course_details)
+
+                if not any(course['course_code'] == course_code for course in instructor_profile['assigned_courses']):
+                    instructor_profile['assigned_courses'].append(new_course_entry)
+                    repo.save('instructor', instructor_id, instructor_profile)
+                    print(f"Course {course_code} successfully assigned to instructor {instructor_id}.")
+                else:
+                    print(f"Course {course_code} is already assigned to instructor {instructor_id}.")
         except Exception as e:
             print(f"Error assigning course to instructor: {e}")
 
     def remove_course(self):
-        course_code = input("Enter Course Code to remove: ")
-        
-        # Debug: Check existing course files
-        course_files = [f for f in os.listdir('data/courses') if f.endswith('_course.json')]
-        print(f"Debug: Existing course files: {course_files}")
-        
-        # Check if course JSON file exists
-        course_file_path = f'data/courses/{course_code}_course.json'
-        
-        # Debug: Check specific file path
-        print(f"Debug: Checking file path {course_file_path}")
-        print(f"Debug: File exists: {os.path.exists(course_file_path)}")
-        
-        # Read the course file to verify its contents
-        try:
-            with open(course_file_path, 'r') as f:
-                course_details = json.load(f)
-            
-            print("Debug: Course details:")
-            print(json.dumps(course_details, indent=4))
-        except FileNotFoundError:
-            print(f"Debug: File {course_file_path} not found")
-        except json.JSONDecodeError:
-            print(f"Debug: Error decoding JSON in {course_file_path}")
-        
-        # Check course in self.courses
-        course = next((c for c in self.courses if c._course_code == course_code), None)
-        
-        if course or os.path.exists(course_file_path):
-            # Remove from courses list
-            self.courses = [c for c in self.courses if c._course_code != course_code]
-            
-            # Remove course from any instructors who have it assigned
-            for instructor in self.instructors:
-                instructor._assigned_courses = [
-                    c for c in instructor._assigned_courses if c._course_code != course_code
-                ]
-                
-                # Update instructor's JSON file
-                try:
-                    with open(f'data/users/{instructor._user_id}_instructor_profile.json', 'r') as f:
-                        instructor_profile = json.load(f)
-                    
-                    # Remove the course from assigned courses
-                    instructor_profile['assigned_courses'] = [
-                        c for c in instructor_profile.get('assigned_courses', []) 
-                        if c['course_code'] != course_code
-                    ]
-                    
-                    # Save updated profile
-                    with open(f'data/users/{instructor._user_id}_instructor_profile.json', 'w') as f:
-                        json.dump(instructor_profile, f, indent=4)
-                except FileNotFoundError:
-                    pass
-            
-            # Remove course details file
-            try:
-                os.remove(course_file_path)
-                print(f"Course {course_code} removed successfully!")
-            except Exception as e:
-                print(f"Error removing course file: {e}")
-        else:
+        course_code = input("Enter Course Code to remove: ").strip()
+
+        if not Storage.repo().exists('course', course_code):
             print("Course not found.")
+            return
+
+        try:
+            removed = Course.delete_course(course_code)
+        except Exception as e:
+            print(f"Error removing course: {e}")
+            return
+
+        # Keep the platform's in-memory list in step
+        self.courses = [c for c in self.courses if c._course_code != course_code]
+
+        print(tabulate([
+            ["Student profiles updated", removed['students']],
+            ["Instructor profiles updated", removed['instructors']],
+            ["Room slots freed", removed['room_slots']],
+            ["Assignment records removed", removed['assignments']],
+            ["Submission records removed", removed['submissions']],
+        ], headers=["Removed With Course", "Count"], tablefmt="grid"))
+        print(f"Course {course_code} removed successfully!")
+
+    # Delete a course and every reference to it: the students enrolled in it,
+    # the instructors it is assigned to, its slot in the room schedule and the
+    # assignments given out in it with their submissions. The affected
+    # records are found through the repository's reverse lookups and written
+    # in one transaction.
+    # Returns the number of records of each sort that were changed.
+    @staticmethod
+    def delete_course(course_code):
+        repo = Storage.repo()
+        course_details = repo.load('course', course_code)
+
+        def without_course(entries):
+            return [entry for entry in entries if entry.get('course_code') != course_code]
+
+        students = {}
+        for student_id in repo.roster_ids(course_code):
+            student_data = repo.load('student', student_id)
+            student_data['courses'] = without_course(student_data.get('courses', []))
+            students[student_id] = student_data
+
+        instructor_ids = set(repo.course_instructor_ids(course_code))
+        if course_details.get('instructor_id') and repo.exists('instructor', course_details['instructor_id']):
+            instructor_ids.add(course_details['instructor_id'])
+        instructors = {}
+        for instructor_id in sorted(instructor_ids):
+            instructor_profile = repo.load('instructor', instructor_id)
+            assigned_courses = without_course(instructor_profile.get('assigned_courses', []))
+            if len(assigned_courses) != len(instructor_profile.get('assigned_courses', [])):
+                instructors[instructor_id] = dict(instructor_profile, assigned_courses=assigned_courses)
+
+        # The room keeps one slot per course; free the one matching this course
+        room_key = f"{course_details.get('assigned_college_room')}_{course_details.get('room_number')}"
+        room_data = None
+        if repo.exists('room', room_key):
+            room_data = repo.load('room', room_key)
+            slots = room_data.get('scheduled_times', [])
+            meeting = {field: course_details.get(field) for field in ('day', 'start_time', 'end_time')}
+            index = next((i for i, slot in enumerate(slots)
+                          if {field: slot.get(field) for field in meeting} == meeting), None)
+            if index is None:
+                room_data = None
+            else:
+                del slots[index]
+
+        # Assignments given out in the course go with it, along with their
+        # submissions; submissions saved before migrate-submissions are keyed
+        # by the student alone
+        assignment_codes = repo.course_assignment_codes(course_code)
+        submission_keys = []
+        for assignment_code in assignment_codes:
+            for student_id in repo.submitted_ids(assignment_code):
+                submission_key = repo.submission_key(assignment_code, student_id)
+                submission_keys.append(submission_key if repo.exists('submission', submission_key) else student_id)
+
+        with repo.transaction():
+            for student_id, student_data in students.items():
+                repo.save('student', student_id, student_data)
+            for instructor_id, instructor_profile in instructors.items():
+                repo.save('instructor', instructor_id, instructor_profile)
+            if room_data is not None:
+                repo.save('room', room_key, room_data)
+            for submission_key in submission_keys:
+                if repo.exists('submission', submission_key):
+                    repo.delete('submission', submission_key)
+            for assignment_code in assignment_codes:
+                repo.delete('assigned', assignment_code)
+                if repo.exists('missing', assignment_code):
+                    repo.delete('missing', assignment_code)
+                if repo.exists('assignment', assignment_code):
+                    repo.delete('assignment', assignment_code)
+            repo.delete('course', course_code)
+
+        return {
+            'students': len(students),
+            'instructors': len(instructors),
+            'room_slots': 0 if room_data is None else 1,
+            'assignments': len(assignment_codes),
+            'submissions': len(submission_keys),
+        }
 
     def show_all_courses(self):
         courses_data = []
         
         instructor_data = {}
-        instructor_dir = os.path.join('data', 'users')  # Construct the path
-
-        # Debug: Check if the instructor directory exists
-        if not os.path.exists(instructor_dir):
-            print(f"Error: The directory '{instructor_dir}' does not exist.")
-            return
-        
-        # Debug: List files in the instructor directory
-        # print("Instructor files found:", os.listdir(instructor_dir))
+        repo = Snapshot.reader()
 
-        instructor_files = [f for f in os.listdir(instructor_dir) if f.endswith('_instructor_profile.json')]
-        
-        for instructor_file in instructor_files:
+        for instructor_id, instructor in repo.load_all('instructor'):
             try:
-                with open(os.path.join(instructor_dir, instructor_file), 'r') as f:
-                    instructor = json.load(f)
-                    instructor_data[instructor['user_id']] = instructor['name']
+                instructor_data[instructor['user_id']] = instructor['name']
             except Exception as e:
-                print(f"Error loading {instructor_file}: {e}")
+                print(f"Error loading instructor {instructor_id}: {e}")
                 continue
         
-        # Load course files
-        course_dir = os.path.join('data', 'courses')
-        if not os.path.exists(course_dir):
-            print(f"Error: The directory '{course_dir}' does not exist.")
-            return
-        
-        course_files = [f for f in os.listdir(course_dir) if f.endswith('_course.json')]
-        
-        for course_file in course_files:
+        # Load courses
+        for course_code, course_details in repo.load_all('course'):
             try:
-                with open(os.path.join(course_dir, course_file), 'r') as f:
-                    course_details = json.load(f)
-                
                 instructor_id = course_details['instructor_id']
                 username = course_details.get('username') or instructor_data.get(instructor_id, 'To be Assigned')
                 
@@ -542,7 +689,7 @@ class Course(Schedule, Room):
                     username
                 ])
             except Exception as e:
-                print(f"Error processing {course_file}: {e}")
+                print(f"Error processing course {course_code}: {e}")
                 continue
         
         # Display courses using tabulate
@@ -563,11 +710,10 @@ class Course(Schedule, Room):
     def show_student_courses(self, student):
         try:
             # Load student's profile using their user ID
-            with open(f'data/users/{student._user_id}_student_profile.json', 'r') as f:
-                student_profile = json.load(f)
+            student_profile = Storage.repo().load('student', student._user_id)
             
-            # Extract enrolled courses
-            enrolled_courses = student_profile.get('courses', [])
+            # Extract enrolled courses, joined with their course records
+            enrolled_courses = References.courses(student_profile.get('courses', []))
             
             # Check if the student has any enrolled courses
             if not enrolled_courses:
@@ -596,10 +742,8 @@ class Course(Schedule, Room):
             courses_data = []
             for course in sorted_courses:
                 try:
-                    # Load course details from its JSON file
-                    course_file_path = os.path.join('data', 'courses', f"{course['course_code']}_course.json")
-                    with open(course_file_path, 'r') as f:
-                        course_details = json.load(f)
+                    # Load course details from its record
+                    course_details = Storage.repo().load('course', course['course_code'])
                     
                     # Append course details with instructor name to the list
                     courses_data.append([
@@ -614,7 +758,7 @@ class Course(Schedule, Room):
                         course_details.get('instructor_id', 'N/A'),
                         course_details.get('name', 'N/A')
                     ])
-                except FileNotFoundError:
+                except RecordNotFound:
                     print(f"Course file not found for {course['course_code']}")
                 except json.JSONDecodeError:
                     print(f"Error reading course file for {course['course_code']}")
@@ -659,11 +803,10 @@ class Course(Schedule, Room):
     def show_instructor_courses(self, instructor):
         try:
             # Load instructor's profile using their user ID
-            with open(f'data/users/{instructor._user_id}_instructor_profile.json', 'r') as f:
-                instructor_profile = json.load(f)
+            instructor_profile = Storage.repo().load('instructor', instructor._user_id)
             
-            # Extract assigned courses
-            assigned_courses = instructor_profile.get('assigned_courses', [])
+            # Extract assigned courses, joined with their course records
+            assigned_courses = References.courses(instructor_profile.get('assigned_courses', []))
             
             # Check if the instructor has any assigned courses
             if not assigned_courses:
@@ -726,8 +869,7 @@ class Course(Schedule, Room):
     def get_enrolled_students_count(course_code):
         try:
             # Load course data
-            with open(f'data/courses/{course_code}_course.json', 'r') as f:
-                course_data = json.load(f)
+            course_data = Storage.repo().load('course', course_code)
             
             # Return the number of enrolled students
             return len(course_data.get('enrolled_students', []))
@@ -753,8 +895,7 @@ class Course(Schedule, Room):
                 
                 # First, verify if this course is assigned to the instructor
                 try:
-                    with open(f'data/users/{instructor._user_id}_instructor_profile.json', 'r') as f:
-                        instructor_profile = json.load(f)
+                    instructor_profile = Storage.repo().load('instructor', instructor._user_id)
                     
                     # Check if the course is assigned to this instructor
                     course_assigned = any(
@@ -772,33 +913,16 @@ class Course(Schedule, Room):
                 # Collect students enrolled in this course
                 students_data = []
                 
-                # Scan through all student profile files
-                import os
-                student_files = [f for f in os.listdir('data/users') if f.endswith('_student_profile.json')]
-                
-                for student_file in student_files:
-                    try:
-                        with open(os.path.join('data/users', student_file), 'r') as f:
-                            student_profile = json.load(f)
-                        
-                        # Check if student is enrolled in the specified course
-                        enrolled_in_course = any(
-                            course.get('course_code') == course_code 
-                            for course in student_profile.get('courses', [])
-                        )
-                        
-                        if enrolled_in_course:
-                            students_data.append([
-                                student_profile['user_id'],
-                                student_profile['name'],
-                                student_profile['email'],
-                                student_profile['major'],
-                                student_profile['year_level'],
-                                student_profile['semester'],
-                                student_profile['academic_year'],
-                            ])
-                    except (FileNotFoundError, json.JSONDecodeError):
-                        continue
+                for student_profile in Storage.repo().students_in_course(course_code):
+                    students_data.append([
+                        student_profile['user_id'],
+                        student_profile['name'],
+                        student_profile['email'],
+                        student_profile['major'],
+                        student_profile['year_level'],
+                        student_profile['semester'],
+                        student_profile['academic_year'],
+                    ])
                 
                 # Display students using tabulate
                 if students_data:
@@ -819,22 +943,20 @@ class Course(Schedule, Room):
 
 
     def student_drop_course(student):
-        # Define student file path
-        student_file_path = f"data/users/{student._user_id}_student_profile.json"
-
         student_id = student._user_id if hasattr(student, '_user_id') else student.get('user_id')
         if not student_id:
             print("Error: Student ID not found.")
             return
 
+        repo = Storage.repo()
+
         try:
-            # Load student JSON data
-            if not os.path.exists(student_file_path):
+            # Load student data
+            if not repo.exists('student', student_id):
                 print("Student file not found.")
                 return
 
-            with open(student_file_path, 'r') as student_file:
-                student_data = json.load(student_file)
+            student_data = repo.load('student', student_id)
 
             # Display available courses
             if "courses" not in student_data or not student_data["courses"]:
@@ -842,9 +964,11 @@ class Course(Schedule, Room):
                 return
 
             # Prepare courses for tabular display
+            courses = References.courses(student_data["courses"])
             table = []
-            for course in student_data["courses"]:
-                table.append([course["course_code"], course["course_name"], course["credited_units"], course["day"], f"{course['start_time']} - {course['end_time']}"])
+            for course in courses:
+                table.append([course["course_code"], course.get("course_name", "N/A"), course.get("credited_units", "N/A"),
+                              course.get("day", "N/A"), f"{course.get('start_time', 'N/A')} - {course.get('end_time', 'N/A')}"])
             
             print("\nYour enrolled courses:")
             print(tabulate(table, headers=["Course Code", "Course Name", "Units", "Day", "Time"], tablefmt="grid"))
@@ -854,7 +978,7 @@ class Course(Schedule, Room):
             
             # Check if the course exists
             course_found = None
-            for course in student_data["courses"]:
+            for course in courses:
                 if course["course_code"] == course_code:
                     course_found = course
                     break
@@ -864,7 +988,7 @@ class Course(Schedule, Room):
                 return
 
             # Confirm the action
-            confirm = input(f"Are you sure you want to drop the course '{course_code}: {course_found['course_name']}'? (yes/no): ").strip().lower()
+            confirm = input(f"Are you sure you want to drop the course '{course_code}: {course_found.get('course_name', 'N/A')}'? (yes/no): ").strip().lower()
             if confirm != "yes":
                 print(f"Dropping of course {course_code} is cancelled.")
                 return
@@ -874,30 +998,26 @@ class Course(Schedule, Room):
                 course for course in student_data["courses"] if course["course_code"] != course_code
             ]
 
-            # Save updated student data
-            with open(student_file_path, 'w') as student_file:
-                json.dump(student_data, student_file, indent=4)
+            # Load course data, if the course still exists
+            course_data = repo.load('course', course_code) if repo.exists('course', course_code) else None
+            if course_data is not None:
+                # Remove the student from the course's enrolled_students list
+                course_data["enrolled_students"] = [
+                    student for student in course_data.get("enrolled_students", [])
+                    if student["student_id"] != student_id
+                ]
+
+            with repo.transaction():
+                # Save updated student and course data
+                repo.save('student', student_id, student_data)
+                if course_data is not None:
+                    repo.save('course', course_code, course_data)
+
+            # Report only once both records are saved
             print(f"Course {course_code} successfully removed from your profile.")
-            
-            # Define course file path
-            course_file_path = f"data/courses/{course_code}_course.json"
-            if not os.path.exists(course_file_path):
+            if course_data is None:
                 print("Course file not found, but it was removed from your profile.")
                 return
-
-            # Load course JSON data
-            with open(course_file_path, 'r') as course_file:
-                course_data = json.load(course_file)
-
-            # Remove the student from the course's enrolled_students list
-            course_data["enrolled_students"] = [
-                student for student in course_data.get("enrolled_students", [])
-                if student["student_id"] != student_id
-            ]
-
-            # Save updated course data
-            with open(course_file_path, 'w') as course_file:
-                json.dump(course_data, course_file, indent=4)
             print(f"Your enrollment in course '{course_code}' has been successfully removed.")
 
         except Exception as e:
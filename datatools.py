@@ -0,0 +1,281 @@
+# Maintenance commands for the platform's data store.
+#
+# Usage:
+#   python datatools.py import-sqlite [--db data/elearning.db]
+#   python datatools.py rebuild-indexes [--storage json|sqlite]
+#   python datatools.py check-manifests
+#   python datatools.py snapshot [--output data/snapshot.bin]
+#   python datatools.py migrate-feedback
+#   python datatools.py migrate-submissions [--storage json|sqlite]
+#   python datatools.py check-rosters [--storage json|sqlite]
+#   python datatools.py room-usage [--college CEIT] [--top 20] [--idle-below 10]
+#   python datatools.py schedule-courses SECTIONS.csv|SECTIONS.json [--dry-run]
+#   python datatools.py remove-rooms ROOM_KEY... [--reassign]
+#   python datatools.py normalize-references [--storage json|sqlite]
+#   python datatools.py store-epochs [--storage json|sqlite]
+#   python datatools.py late-report [--assignment CODE | --course CODE]
+#   python datatools.py close-deadlines [--storage json|sqlite]
+
+import argparse
+import json
+import time
+from tabulate import tabulate
+from course import Room
+from deadlines import Deadlines
+from deadlinescheduler import DeadlineScheduler
+from references import References
+from snapshot import Snapshot
+from storage import JsonRepository, SqliteRepository, Storage, import_repository
+from timetable import Timetable
+
+def import_sqlite(args):
+    counts = import_repository(JsonRepository(), SqliteRepository(args.db))
+    for kind, count in counts.items():
+        print(f"{kind:>12}: {count}")
+    print(f"Imported {sum(counts.values())} record/s into {args.db}")
+
+def rebuild_indexes(args):
+    Storage.configure(args.storage, args.db).rebuild_indexes()
+    print("Indexes rebuilt.")
+
+def check_manifests(args):
+    differences = JsonRepository().check_manifests()
+    for kind, key, problem in differences:
+        print(f"{kind:>12}: {key} ({problem})")
+    if differences:
+        print(f"Repaired {len(differences)} manifest entr{'y' if len(differences) == 1 else 'ies'}.")
+    else:
+        print("Manifests match the data directories.")
+
+def build_snapshot(args):
+    counts = Snapshot.build(JsonRepository(), args.output)
+    for kind, count in counts.items():
+        print(f"{kind:>12}: {count}")
+    print(f"Wrote {sum(counts.values())} record/s to {args.output}")
+
+def migrate_feedback(args):
+    migrated = JsonRepository().migrate_logs()
+    print(f"Converted {migrated} feedback file/s to append-only logs.")
+
+def check_rosters(args):
+    problems = Storage.configure(args.storage, args.db).check_rosters()
+    for course_code, student_id, problem in problems:
+        print(f"{course_code:>12}: {student_id} ({problem})")
+    if not problems:
+        print("Course rosters are consistent.")
+    elif args.storage == 'json' and any('roster index' in problem for _, _, problem in problems):
+        print(f"Found {len(problems)} problem/s. The roster index has been rebuilt from the student profiles.")
+    else:
+        print(f"Found {len(problems)} problem/s.")
+
+# Heatmap cell: a shade for the share of rooms booked, then the share itself
+SHADES = ' \u2591\u2592\u2593\u2588'
+
+def heat(share):
+    return f"{SHADES[min(int(share * len(SHADES)), len(SHADES) - 1)]} {share:.0%}"
+
+def room_usage(args):
+    # NumPy is only needed for this report
+    try:
+        from roomusage import RoomUsage
+    except ImportError:
+        print("The room-usage report needs NumPy: pip install numpy")
+        return
+
+    repo = Storage.configure(args.storage, args.db)
+    usage = RoomUsage.build(Snapshot.fresh(repo) or repo)
+    if not usage.room_count():
+        print("No rooms found.")
+        return
+    college = args.college.upper() if args.college else None
+    scope = f"college {college}" if college else "all colleges"
+    print(f"Room utilization, {scope}, {RoomUsage.OPEN}-{RoomUsage.CLOSE} Monday to Friday")
+
+    rooms = usage.by_room(college)
+    if not rooms:
+        print(f"No rooms found for college {college}.")
+        return
+    shown = rooms[:args.top] if args.top else rooms
+    print(f"\nRooms (busiest {len(shown)} of {len(rooms)}):")
+    print(tabulate([[room_key, room_college, f"{hours:.1f}", f"{share:.0%}"] for room_key, room_college, hours, share in shown],
+                   headers=["Room", "College", "Booked Hours/Week", "Utilization"], tablefmt="grid"))
+
+    if college is None:
+        print("\nColleges:")
+        print(tabulate([[name, count, f"{share:.0%}"] for name, count, share in usage.by_college()],
+                       headers=["College", "Rooms", "Utilization"], tablefmt="grid"))
+
+    print("\nDays:")
+    print(tabulate([[day, f"{share:.0%}"] for day, share in zip(RoomUsage.DAYS, usage.by_day(college))],
+                   headers=["Day", "Utilization"], tablefmt="grid"))
+
+    print("\nHours:")
+    print(tabulate([[hour, f"{share:.0%}"] for hour, share in zip(usage.hours(), usage.by_hour(college))],
+                   headers=["Hour", "Utilization"], tablefmt="grid"))
+
+    heatmap = usage.heatmap(college)
+    print("\nShare of rooms booked:")
+    print(tabulate([[day] + [heat(share) for share in row] for day, row in zip(RoomUsage.DAYS, heatmap)],
+                   headers=["Day"] + usage.hours(), tablefmt="grid"))
+    day, hour = divmod(int(heatmap.argmax()), heatmap.shape[1])
+    print(f"Peak: {RoomUsage.DAYS[day]} {usage.hours()[hour]} ({heatmap[day, hour]:.0%} of rooms booked)")
+
+    idle = usage.idle_rooms(args.idle_below / 100, college)
+    print(f"\nRooms under {args.idle_below:g}% utilization: {len(idle)}")
+    if idle:
+        print(tabulate([[room_key, room_college, f"{hours:.1f}", f"{share:.0%}"] for room_key, room_college, hours, share in idle],
+                       headers=["Room", "College", "Booked Hours/Week", "Utilization"], tablefmt="grid"))
+
+def schedule_courses(args):
+    try:
+        sections = Timetable.read_sections(args.sections)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {args.sections}: {e}")
+        return
+
+    result = Timetable.schedule(Storage.configure(args.storage, args.db), sections, args.dry_run)
+    if result['placed']:
+        print(tabulate([[course['course_code'], course['assigned_college_room'], course['room_number'], course['day'],
+                         course['start_time'], course['end_time'], course['instructor_id'] or 'N/A']
+                        for course in result['placed']],
+                       headers=["Code", "College Room", "Room Number", "Day", "Start Time", "End Time", "Instructor ID"],
+                       tablefmt="grid"))
+    if result['unplaced']:
+        print("\nUnplaced sections:")
+        print(tabulate([[section.get('course_code') or 'N/A', reason] for section, reason in result['unplaced']],
+                       headers=["Code", "Reason"], tablefmt="grid"))
+
+    action = "Would place" if args.dry_run else "Placed"
+    print(f"{action} {len(result['placed'])} of {len(sections)} section/s in {result['seconds']:.2f}s.")
+
+def remove_rooms(args):
+    repo = Storage.configure(args.storage, args.db)
+    room_keys = []
+    for room_key in args.rooms:
+        if repo.exists('room', room_key):
+            room_keys.append(room_key)
+        else:
+            print(f"Room {room_key} not found.")
+
+    start = time.perf_counter()
+    result = Room.delete_rooms(room_keys, reassign=args.reassign)
+    Room.print_removal_summary(result)
+    print(f"Removed {len(result['removed'])} of {len(room_keys)} room/s, moved {len(result['moved'])} course/s "
+          f"in {time.perf_counter() - start:.2f}s.")
+
+# Size of the records References.migrate rewrites, as stored JSON
+def reference_bytes(repo):
+    return sum(len(json.dumps(data)) for kind in References.FIELDS for _, data in repo.load_all(kind))
+
+def migrate_submissions(args):
+    moved, skipped = Storage.configure(args.storage, args.db).migrate_submissions()
+    print(f"Moved {len(moved)} submission record/s to (assignment, student) keys.")
+    if skipped:
+        print(f"Left in place (missing assignment or student, or key already taken): {', '.join(skipped)}")
+
+def normalize_references(args):
+    repo = Storage.configure(args.storage, args.db)
+    before = reference_bytes(repo)
+    counts = References.migrate(repo)
+    after = reference_bytes(repo)
+
+    print(tabulate([[kind, seen, rewritten] for kind, (seen, rewritten) in counts.items()],
+                   headers=["Kind", "Records", "Rewritten"], tablefmt="grid"))
+    print(f"Student, instructor and course records: {before} -> {after} bytes.")
+
+def store_epochs(args):
+    counts = Deadlines.migrate(Storage.configure(args.storage, args.db))
+    print(tabulate([[kind, seen, rewritten] for kind, (seen, rewritten) in counts.items()],
+                   headers=["Kind", "Records", "Rewritten"], tablefmt="grid"))
+
+def late_report(args):
+    # NumPy is only needed for this report
+    try:
+        from latereport import LateReport
+    except ImportError:
+        print("The late-submission report needs NumPy: pip install numpy")
+        return
+
+    repo = Storage.configure(args.storage, args.db)
+    if args.assignment:
+        report = LateReport.of_assignment(repo, args.assignment)
+    elif args.course:
+        report = LateReport.of_course(repo, args.course)
+    else:
+        report = LateReport.build(repo, repo.keys('assigned'))
+    if not report.submission_count():
+        print("No submissions found.")
+        return
+
+    print(tabulate([list(row) for row in report.by_assignment()],
+                   headers=["Assignment Code", "Submissions", "On Time", "Late", "Unknown", "Stored Status Differs"],
+                   tablefmt="grid"))
+    for submission_data in report.disagreements():
+        print(f"Submission of {submission_data.get('student_id')} for {submission_data.get('assignment_code')} "
+              f"is stored as {submission_data.get('status') or 'no status'}.")
+
+# Close the assignments whose deadlines passed while the platform was not
+# running
+def close_deadlines(args):
+    repo = Storage.configure(args.storage, args.db)
+    scheduler = DeadlineScheduler(repo)
+    closed = scheduler.run_due()
+    deadline_stats = scheduler.stats()
+    if deadline_stats['failed']:
+        print(f"Error closing {deadline_stats['failed']} assignment/s, last: {deadline_stats['last_error']}")
+    if not closed:
+        print("No assignment is past its deadline.")
+        return
+
+    rows = []
+    for assignment_code in closed:
+        missing_data = repo.load('missing', assignment_code)
+        rows.append([assignment_code, missing_data['course_code'], missing_data['assigned_count'],
+                     missing_data['submitted_count'], len(missing_data['missing_students'])])
+    print(tabulate(rows, headers=["Assignment Code", "Course Code", "Assigned", "Submitted", "Missing"], tablefmt="grid"))
+    print(f"Closed {len(closed)} assignment/s.")
+
+def main():
+    parser = argparse.ArgumentParser(prog='datatools.py')
+    parser.add_argument('--storage', choices=Storage.BACKENDS, default='json')
+    parser.add_argument('--db', default=SqliteRepository.DEFAULT_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('import-sqlite', help="copy the data/ JSON tree into a SQLite database").set_defaults(run=import_sqlite)
+    commands.add_parser('rebuild-indexes', help="rebuild derived indexes from the stored records").set_defaults(run=rebuild_indexes)
+    commands.add_parser('check-manifests', help="compare the JSON manifests with their directories and repair them").set_defaults(run=check_manifests)
+
+    commands.add_parser('migrate-feedback', help="convert JSON feedback arrays into append-only feedback logs").set_defaults(run=migrate_feedback)
+    commands.add_parser('migrate-submissions', help="re-key submissions saved per student to one record per assignment and student").set_defaults(run=migrate_submissions)
+    commands.add_parser('check-rosters', help="compare the roster index, course files and student profiles").set_defaults(run=check_rosters)
+    snapshot = commands.add_parser('snapshot', help="pack the data/ JSON tree into one binary snapshot for read-only views")
+    snapshot.add_argument('--output', default=Snapshot.PATH)
+    snapshot.set_defaults(run=build_snapshot)
+    usage = commands.add_parser('room-usage', help="report room utilization per room, college, day and hour")
+    usage.add_argument('--college', help="only rooms of this assigned college room")
+    usage.add_argument('--top', type=int, default=20, help="rooms to list, busiest first (0 for all)")
+    usage.add_argument('--idle-below', type=float, default=10, help="utilization percentage under which a room is idle")
+    usage.set_defaults(run=room_usage)
+    schedule = commands.add_parser('schedule-courses', help="place a list of new course sections into free rooms and times")
+    schedule.add_argument('sections', help=f"CSV with columns {', '.join(Timetable.FIELDS)}, or a JSON list of the same")
+    schedule.add_argument('--dry-run', action='store_true', help="report the placements without saving them")
+    schedule.set_defaults(run=schedule_courses)
+    remove = commands.add_parser('remove-rooms', help="remove rooms, e.g. every room of a closed building")
+    remove.add_argument('rooms', nargs='+', metavar='ROOM_KEY', help="college room and number, e.g. CEIT_24")
+    remove.add_argument('--reassign', action='store_true',
+                        help="move scheduled courses to free rooms of the same college at the same times first")
+    remove.set_defaults(run=remove_rooms)
+    commands.add_parser('normalize-references', help="replace course and student rows copied into profiles and courses with references").set_defaults(run=normalize_references)
+    commands.add_parser('store-epochs', help="add deadline and submission epochs to records saved before they were stored").set_defaults(run=store_epochs)
+    late = commands.add_parser('late-report', help="count on-time and late submissions per assignment")
+    scope = late.add_mutually_exclusive_group()
+    scope.add_argument('--assignment', help="only this assignment")
+    scope.add_argument('--course', help="every assignment given in this course")
+    late.set_defaults(run=late_report)
+    commands.add_parser('close-deadlines', help="record missing submissions for assignments past their deadline").set_defaults(run=close_deadlines)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
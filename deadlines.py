@@ -0,0 +1,104 @@
+from datetime import datetime
+
+# Deadlines and submission times as integer epochs.
+#
+# Assignments keep 'deadline_epoch' next to their deadline date and time,
+# and submissions keep 'submission_epoch' next to their timestamp. Both are
+# local time to the minute, like the text fields, so judging a submission
+# is one integer comparison instead of parsing two strings. Records written
+# before the epochs were stored fall back to parsing their text fields.
+
+class Deadlines:
+    # Where each kind of record keeps its deadline: the record itself or one
+    # of its fields
+    DEADLINE_FIELDS = {'assignment': None, 'assigned': 'assignment_details', 'submission': None}
+
+    # Epochs parsed so far, by "YYYY-MM-DD HH:MM"
+    _epochs = {}
+
+    # Epoch of a "YYYY-MM-DD" date and "HH:MM" time, parsed once per process
+    @classmethod
+    def epoch(cls, date_text, time_text):
+        text = f"{date_text} {time_text}"
+        if text not in cls._epochs:
+            cls._epochs[text] = int(datetime.strptime(text, "%Y-%m-%d %H:%M").timestamp())
+        return cls._epochs[text]
+
+    # Epoch of a datetime, to the minute
+    @staticmethod
+    def minute_epoch(moment):
+        return int(moment.replace(second=0, microsecond=0).timestamp())
+
+    # Late if submitted in a minute after the deadline minute, as
+    # submissions have always been judged
+    @staticmethod
+    def status(submission_epoch, deadline_epoch):
+        return "Late" if submission_epoch > deadline_epoch else "On Time"
+
+    # Deadline epoch of an assignment or submission record, or None if it
+    # has no deadline
+    @classmethod
+    def deadline_of(cls, data):
+        if data.get('deadline_epoch') is not None:
+            return data['deadline_epoch']
+        if data.get('deadline_date') and data.get('deadline_time'):
+            return cls.epoch(data['deadline_date'], data['deadline_time'])
+        return None
+
+    # Submission epoch of a submission record, or None if it has no timestamp
+    @classmethod
+    def submitted_of(cls, submission_data):
+        if submission_data.get('submission_epoch') is not None:
+            return submission_data['submission_epoch']
+        timestamp = submission_data.get('submission_timestamp')
+        if timestamp:
+            date_text, time_text = timestamp.split(' ', 1)
+            return cls.epoch(date_text, time_text)
+        return None
+
+    # Add the missing epochs to an assignment, assigned or submission record
+    # in place, and the status to a submission that has none.
+    # Returns True if the record changed.
+    @classmethod
+    def stamp(cls, kind, data):
+        field = cls.DEADLINE_FIELDS[kind]
+        holder = data.get(field, {}) if field else data
+        changed = False
+
+        deadline = cls.deadline_of(holder)
+        if deadline is not None and holder.get('deadline_epoch') != deadline:
+            holder['deadline_epoch'] = deadline
+            changed = True
+
+        if kind == 'submission':
+            submitted = cls.submitted_of(data)
+            if submitted is not None and data.get('submission_epoch') != submitted:
+                data['submission_epoch'] = submitted
+                changed = True
+            if not data.get('status') and submitted is not None and deadline is not None:
+                data['status'] = cls.status(submitted, deadline)
+                changed = True
+        return changed
+
+    # Store the epochs on every assignment, assigned and submission record
+    # that lacks them, in one transaction.
+    # Returns {kind: (records seen, records rewritten)}.
+    @classmethod
+    def migrate(cls, repo):
+        counts, changed = {}, []
+        for kind in cls.DEADLINE_FIELDS:
+            seen = rewritten = 0
+            for key, data in repo.load_all(kind):
+                seen += 1
+                try:
+                    if cls.stamp(kind, data):
+                        changed.append((kind, key, data))
+                        rewritten += 1
+                except ValueError as e:
+                    print(f"Error processing {kind} {key}: {e}")
+            counts[kind] = (seen, rewritten)
+
+        with repo.transaction():
+            for kind, key, data in changed:
+                repo.save(kind, key, data)
+        return counts
@@ -0,0 +1,245 @@
+import atexit
+import heapq
+import threading
+import time
+from deadlines import Deadlines
+from storage import RecordNotFound, Storage
+
+# Deadline scheduler.
+#
+# Every open assignment sits in a min-heap by closing time. The heap is
+# loaded once from the assignment deadlines the repository already indexes
+# and kept current from its change notifications, so no file is polled:
+# one timer thread sleeps until the earliest deadline. Once it has passed,
+# the assignment is closed by saving its missing-submissions record, the
+# assigned students minus the ones who submitted. Moving a deadline leaves
+# the old heap entry behind; entries are checked against the current
+# deadline when they come up. An assignment stays open until its record is
+# committed: if closing it fails, it is tried again RETRY seconds later and
+# the error is kept for stats() rather than printed over the menus.
+#
+# A missing-submissions record stays current after closing: late
+# submissions take their students off it, and one taken at a deadline
+# that has since moved is deleted so the assignment closes again.
+
+class DeadlineScheduler:
+    # A submission made during the deadline minute is on time, so an
+    # assignment closes once that minute is over
+    GRACE = 60
+
+    # Seconds before closing an assignment is tried again after a failure
+    RETRY = 30
+
+    # Class attributes
+    _shared = None
+
+    # Held while missing-submissions records are written, so a late
+    # submission cannot be saved between an assignment's report being taken
+    # and its record being saved
+    RECORD_LOCK = threading.Lock()
+
+    # clock returns the current time as an epoch; tests can pass their own
+    # and call run_due() instead of starting the timer thread
+    def __init__(self, repo, clock=time.time):
+        # Protected instance attributes
+        self._repo = repo
+        self._clock = clock
+        self._lock = threading.Condition()
+        self._heap = []       # (closing epoch, deadline epoch, assignment_code)
+        self._deadlines = {}  # assignment_code -> deadline epoch, open assignments only
+        self._thread = None
+        self._stopping = False
+        self._closed = 0
+        self._failed = 0         # failed attempts to close an assignment
+        self._last_error = None  # the latest of them, for stats()
+
+        # Assignments with a missing-submissions record for their current
+        # deadline are already closed
+        closed = {assignment_code: missing_data.get('deadline_epoch')
+                  for assignment_code, missing_data in repo.load_all('missing')}
+        for assignment_code, deadline_epoch in repo.assignment_deadlines().items():
+            if deadline_epoch is not None and closed.get(assignment_code) != deadline_epoch:
+                self._deadlines[assignment_code] = deadline_epoch
+
+        # Records taken at a deadline that was moved afterwards
+        moved = [assignment_code for assignment_code in self._deadlines if assignment_code in closed]
+        if moved:
+            with repo.transaction():
+                for assignment_code in moved:
+                    repo.delete('missing', assignment_code)
+
+        self._heap = [(deadline_epoch + self.GRACE, deadline_epoch, assignment_code)
+                      for assignment_code, deadline_epoch in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+        repo.subscribe(self._changed)
+        atexit.register(self.stop)
+
+    # The scheduler for the current repository
+    @classmethod
+    def shared(cls):
+        repo = Storage.repo()
+        if cls._shared is None or cls._shared._repo is not repo:
+            if cls._shared is not None:
+                cls._shared.stop()
+            cls._shared = cls(repo)
+        return cls._shared
+
+    # Reschedule an assignment whose tracking record was saved or deleted
+    def _changed(self, kind, key):
+        if kind != 'assigned':
+            return
+        try:
+            deadline_epoch = Deadlines.deadline_of(self._repo.load('assigned', key).get('assignment_details', {}))
+        except (RecordNotFound, ValueError):
+            deadline_epoch = None
+        self.schedule(key, deadline_epoch)
+
+    # Open an assignment until deadline_epoch, replacing any earlier
+    # deadline; None drops it
+    def schedule(self, assignment_code, deadline_epoch):
+        with self._lock:
+            if deadline_epoch is None:
+                self._deadlines.pop(assignment_code, None)
+            else:
+                self._deadlines[assignment_code] = deadline_epoch
+                heapq.heappush(self._heap, (deadline_epoch + self.GRACE, deadline_epoch, assignment_code))
+            self._lock.notify()
+
+    # Seconds until the earliest open assignment closes, or None if none is open
+    def _wait_time(self):
+        while self._heap and self._deadlines.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return self._heap[0][0] - self._clock()
+
+    # Close every assignment whose deadline has passed, in one transaction.
+    # An assignment leaves the open set only once its record is committed;
+    # one that fails is tried again RETRY seconds later. Returns the codes
+    # closed.
+    def run_due(self, repo=None):
+        repo = repo or self._repo
+        now = self._clock()
+        due = {}
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, deadline_epoch, assignment_code = heapq.heappop(self._heap)
+                if self._deadlines.get(assignment_code) == deadline_epoch:
+                    due[assignment_code] = deadline_epoch
+        if not due:
+            return []
+
+        closed, gone, failed = [], [], {}
+        try:
+            with DeadlineScheduler.RECORD_LOCK, repo.transaction():
+                for assignment_code, deadline_epoch in due.items():
+                    try:
+                        repo.save('missing', assignment_code,
+                                  DeadlineScheduler.missing_record(repo, assignment_code, deadline_epoch, now))
+                        closed.append(assignment_code)
+                    except RecordNotFound:
+                        # No longer assigned; there is nothing to close
+                        gone.append(assignment_code)
+                    except Exception as e:
+                        failed[assignment_code] = e
+        except Exception as e:
+            # Nothing was committed
+            closed, gone = [], []
+            failed = {assignment_code: e for assignment_code in due}
+
+        with self._lock:
+            for assignment_code in closed + gone:
+                if self._deadlines.get(assignment_code) == due[assignment_code]:
+                    del self._deadlines[assignment_code]
+            for assignment_code, error in failed.items():
+                heapq.heappush(self._heap, (now + self.RETRY, due[assignment_code], assignment_code))
+                self._failed += 1
+                self._last_error = f"{assignment_code}: {error}"
+            self._closed += len(closed)
+        return closed
+
+    # The missing-submissions record of an assignment: everyone it was given
+    # to who has not submitted
+    @staticmethod
+    def missing_record(repo, assignment_code, deadline_epoch, now):
+        assigned_data = repo.load('assigned', assignment_code)
+        report = repo.submission_report(assignment_code)
+        usernames = {student['student_id']: student.get('username', 'N/A')
+                     for student in assigned_data.get('assigned_students', [])}
+        return {
+            'assignment_code': assignment_code,
+            'course_code': assigned_data.get('course_code'),
+            'deadline_epoch': deadline_epoch,
+            'closed_epoch': int(now),
+            'assigned_count': report['assigned'],
+            'submitted_count': report['assigned'] - len(report['not_submitted']),
+            'missing_students': [{'student_id': student_id, 'username': usernames.get(student_id, 'N/A')}
+                                 for student_id in report['not_submitted']]
+        }
+
+    # Take students who have now submitted off the missing-submissions
+    # records of their assignments. Call inside the transaction that saves
+    # the submissions, holding RECORD_LOCK.
+    @staticmethod
+    def record_submissions(repo, submissions):
+        submitted = {}
+        for submission_data in submissions:
+            submitted.setdefault(submission_data.get('assignment_code'), set()).add(submission_data.get('student_id'))
+
+        for assignment_code, student_ids in submitted.items():
+            if assignment_code is None or not repo.exists('missing', assignment_code):
+                continue
+            missing_data = repo.load('missing', assignment_code)
+            missing_students = [student for student in missing_data.get('missing_students', [])
+                                if student['student_id'] not in student_ids]
+            removed = len(missing_data.get('missing_students', [])) - len(missing_students)
+            if removed:
+                missing_data['missing_students'] = missing_students
+                missing_data['submitted_count'] = missing_data.get('submitted_count', 0) + removed
+                repo.save('missing', assignment_code, missing_data)
+
+    # Start the timer thread. It works on its own repository, since a SQLite
+    # connection may only be used by the thread that opened it.
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='deadline-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        repo = self._repo.reopen()
+        while True:
+            with self._lock:
+                while not self._stopping:
+                    wait = self._wait_time()
+                    if wait is not None and wait <= 0:
+                        break
+                    self._lock.wait(wait)
+                if self._stopping:
+                    return
+            try:
+                self.run_due(repo)
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                    self._last_error = str(e)
+                    if not self._stopping:
+                        self._lock.wait(self.RETRY)
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._lock.notify()
+        if thread is not None:
+            thread.join()
+
+    # Open assignments, assignments closed so far, failed attempts to close
+    # one and the latest error, or None
+    def stats(self):
+        with self._lock:
+            return {'open': len(self._deadlines), 'closed': self._closed,
+                    'failed': self._failed, 'last_error': self._last_error}
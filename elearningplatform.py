@@ -8,7 +8,10 @@ from course import Course, Room
 from os import system, name
 from grade import Grade
 from feedback import Feedback
+from deadlinescheduler import DeadlineScheduler
 from tabulate import tabulate
+from storage import SqliteRepository, Storage
+import argparse
 
 def clear(): #* clearing terminals
   if name == 'nt': #* for windows
@@ -23,7 +26,16 @@ class ELearningPlatform:
     Platform_Details = "A system designed to manage students,\ninstructors, and administrators."
     Creator = "Abellera, Lagata, and Martinez"
     
-    def __init__(self):
+    def __init__(self, storage_backend='json', db_path=SqliteRepository.DEFAULT_PATH, cache_mb=None):
+        # Select the storage backend (JSON data/ tree or SQLite database)
+        cache_bytes = int(cache_mb * 1024 * 1024) if cache_mb else None
+        self.repository = Storage.configure(storage_backend, db_path, cache_bytes)
+        self.storage_backend = storage_backend
+
+        # Close assignments and record missing submissions as deadlines pass
+        self.deadlines = DeadlineScheduler.shared()
+        self.deadlines.start()
+
         # Instance Attributes
         self.students = []
         self.instructors = []
@@ -328,7 +340,8 @@ class ELearningPlatform:
             print("3 - Assign Assignment to Students")
             print("4 - View Assignments Passed")
             print("5 - Assign Score for Assignment")
-            print("6 - Back to Instructor Menu")
+            print("6 - Track Missing Submissions")
+            print("7 - Back to Instructor Menu")
             
             choice = input("Enter your choice: ")
             
@@ -343,6 +356,8 @@ class ELearningPlatform:
             elif choice == '5':
                 Grade.assign_grade_to_student()
             elif choice == '6':
+                Assignment.view_submission_tracker(self)
+            elif choice == '7':
                 break
             else:
                 print("Invalid choice. Please try again.")
@@ -440,7 +455,8 @@ class ELearningPlatform:
             print("3 - Students")
             print("4 - Instructors")
             print("5 - Rooms")
-            print("6 - Back to Main Menu")
+            print("6 - Storage Statistics")
+            print("7 - Back to Main Menu")
             
             choice = input("Enter your choice: ")
             
@@ -460,10 +476,26 @@ class ELearningPlatform:
                 clear()
                 self.admin_room_menu()
             elif choice == '6':
+                clear()
+                self.show_storage_stats()
+            elif choice == '7':
                 break
             else:
                 print("Invalid choice. Please try again.")
 
+    def show_storage_stats(self):
+        storage_info = [["Storage Backend", self.storage_backend]]
+        storage_info.extend([name, value] for name, value in self.repository.stats().items())
+        deadline_stats = self.deadlines.stats()
+        storage_info.append(["Open Assignments", deadline_stats['open']])
+        storage_info.append(["Assignments Closed This Session", deadline_stats['closed']])
+        if deadline_stats['failed']:
+            storage_info.append(["Failed Attempts to Close", deadline_stats['failed']])
+            storage_info.append(["Last Closing Error", deadline_stats['last_error']])
+
+        print("\n--- STORAGE STATISTICS ---")
+        print(tabulate(storage_info, tablefmt="grid"))
+
     def admin_courses_menu(self):
         while True:
             print("\n--- ADMIN COURSE MENU ---")
@@ -516,13 +548,16 @@ class ELearningPlatform:
         while True:
             print("\n--- ADMIN INSTRUCTOR MENU ---")
             print("1 - Show Instructors")
-            print("2 - Back to Admin Menu")
+            print("2 - Show Free Instructors")
+            print("3 - Back to Admin Menu")
             
             choice = input("Enter your choice: ")
             
             if choice == '1':
                 PlatformAdmin.show_instructors(self)
             elif choice == '2':
+                PlatformAdmin.show_free_instructors(self)
+            elif choice == '3':
                 break
             else:
                 print("Invalid choice. Please try again.")
@@ -552,7 +587,16 @@ class ELearningPlatform:
         self.main_menu()
 
 def main():
-    platform = ELearningPlatform()
+    parser = argparse.ArgumentParser(description=ELearningPlatform.Platform_Name)
+    parser.add_argument('--storage', choices=Storage.BACKENDS, default='json',
+                        help="storage backend to use (default: json)")
+    parser.add_argument('--db', default=SqliteRepository.DEFAULT_PATH,
+                        help="SQLite database path when --storage sqlite is used")
+    parser.add_argument('--cache-mb', type=float, default=None,
+                        help="memory budget for the JSON record cache in MiB (default: 32)")
+    args = parser.parse_args()
+
+    platform = ELearningPlatform(args.storage, args.db, args.cache_mb)
     platform.run()
 
 if __name__ == "__main__":
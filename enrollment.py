@@ -1,10 +1,13 @@
 import json
+import time
 from person import Student
 from course import Course
 from datetime import datetime
-import glob
 from tabulate import tabulate
-import os
+from storage import Storage
+from snapshot import Snapshot
+from references import References
+from roomschedule import StudentSchedules, to_minutes
 
 class Enrollment:
     # Class attribute
@@ -27,8 +30,7 @@ class Enrollment:
     def is_student_enrolled(student_id, course_code):
         try:
             # Load student data
-            with open(f'data/users/{student_id}_student_profile.json', 'r') as f:
-                student_data = json.load(f)
+            student_data = Storage.repo().load('student', student_id)
             
             # Check if the course is in the student's list of enrolled courses
             return any(c['course_code'] == course_code for c in student_data.get('courses', []))
@@ -66,18 +68,16 @@ class Enrollment:
                 print(f"Student {student_id} is already enrolled in course {course_code}.")
                 return
 
-            # Try to load student from JSON file
+            # Try to load student record
             try:
-                with open(f'data/users/{student_id}_student_profile.json', 'r') as f:
-                    student_data = json.load(f)
+                student_data = Storage.repo().load('student', student_id)
             except FileNotFoundError:
                 print(f"Error: Student with ID {student_id} was not found.")
                 return
 
-            # Try to load course from JSON file
+            # Try to load course record
             try:
-                with open(f'data/courses/{course_code}_course.json', 'r') as f:
-                    course_data = json.load(f)
+                course_data = Storage.repo().load('course', course_code)
             except FileNotFoundError:
                 print(f"Error: Course with Code {course_code} was not found.")
                 return
@@ -92,30 +92,115 @@ class Enrollment:
             semester = input("Enter Semester(1st, 2nd): ")
             course_code = input("Enter Course Code: ")
 
-            # Try to load course data
+            # Enroll every matching student with one write per record
             try:
-                with open(f'data/courses/{course_code}_course.json', 'r') as f:
-                    course_data = json.load(f)
+                summary = Enrollment.enroll_cohort(course_code, major=program, year_level=year_level, semester=semester)
             except FileNotFoundError:
                 print(f"Error: Course with Code {course_code} was not found.")
                 return
 
-            # Loop through all student files and find matching students
-            student_files = glob.glob('data/users/*_student_profile.json')
-            for student_file in student_files:
-                with open(student_file, 'r') as f:
-                    student_data = json.load(f)
-
-                # Match program, year level, and semester
-                if (student_data['major'] == program and 
-                    student_data['year_level'] == year_level and 
-                    student_data['semester'] == semester):
-                    
-                    student_id = student_data['user_id']
-                    Enrollment.enroll_single_student(student_data, course_data, student_id, course_code)
+            Enrollment.print_enrollment_summary(course_code, summary)
         else:
             print("Invalid choice. Please Try Again.")
 
+    # Code of a course in the student's timetable that meets at the same
+    # time as the given one, or None. student_data can be passed in when it
+    # has just been loaded.
+    @staticmethod
+    def find_clash(student_id, course_data, student_data=None):
+        schedule = StudentSchedules.get(student_id, student_data)
+        if schedule is None:
+            return None
+        try:
+            start = to_minutes(course_data['start_time'])
+            end = to_minutes(course_data['end_time'])
+        except (KeyError, ValueError, AttributeError):
+            return None
+
+        for course in schedule.conflicts(course_data.get('day'), start, end):
+            if course.get('course_code') != course_data.get('course_code'):
+                return course.get('course_code')
+        return None
+
+    # Add a course row to a student's timetable, taken before their profile
+    # was saved, and keep it as the cached one
+    @staticmethod
+    def _add_to_schedule(student_id, schedule, course_row):
+        try:
+            schedule.add(course_row['day'], to_minutes(course_row['start_time']),
+                         to_minutes(course_row['end_time']), course_row)
+        except (KeyError, ValueError, AttributeError):
+            return
+        StudentSchedules.put(student_id, schedule)
+
+    # Enroll every student in a cohort in one pass. The roster is worked out
+    # with set operations and each touched record is written once: every
+    # newly enrolled student, then the course.
+    # Returns {'enrolled': [ids], 'skipped': [ids], 'conflicting': [(id, clashing course)], 'seconds': float}
+    @staticmethod
+    def enroll_cohort(course_code, **cohort):
+        started = time.perf_counter()
+        repo = Storage.repo()
+        course_data = repo.load('course', course_code)
+
+        candidates = {student['user_id']: student for student in repo.find_students(**cohort)}
+        roster = {entry['student_id'] for entry in course_data.get('enrolled_students', [])}
+        already_listed = {
+            student_id for student_id, student in candidates.items()
+            if any(c['course_code'] == course_code for c in student.get('courses', []))
+        }
+
+        skipped = (candidates.keys() & roster) | already_listed
+        conflicting = []
+        enrolled = []
+        for student_id in sorted(candidates.keys() - skipped):
+            clash = Enrollment.find_clash(student_id, course_data, candidates[student_id])
+            if clash:
+                conflicting.append((student_id, clash))
+            else:
+                enrolled.append(student_id)
+
+        if enrolled:
+            course_row = References.course_row(course_data)
+            schedules = {student_id: StudentSchedules.get(student_id, candidates[student_id]) for student_id in enrolled}
+            with repo.transaction():
+                for student_id in enrolled:
+                    student_data = candidates[student_id]
+                    student_data.setdefault('courses', []).append(References.course_ref(course_code))
+                    repo.save('student', student_id, student_data)
+
+                course_data.setdefault('enrolled_students', []).extend(
+                    References.student_ref(student_id) for student_id in enrolled)
+                repo.save('course', course_code, course_data)
+            Enrollment._total_enrollments += len(enrolled)
+
+            # Saving dropped the students' timetables; extend them instead of rebuilding
+            for student_id in enrolled:
+                Enrollment._add_to_schedule(student_id, schedules[student_id], course_row)
+
+        return {
+            'enrolled': enrolled,
+            'skipped': sorted(skipped),
+            'conflicting': conflicting,
+            'seconds': time.perf_counter() - started
+        }
+
+    @staticmethod
+    def print_enrollment_summary(course_code, summary):
+        print(tabulate([
+            ["Enrolled", len(summary['enrolled'])],
+            ["Skipped (already enrolled)", len(summary['skipped'])],
+            ["Conflicting schedule", len(summary['conflicting'])],
+        ], headers=["Result", "Students"], tablefmt="grid"))
+
+        if summary['conflicting']:
+            print("\nStudents not enrolled because of a schedule conflict:")
+            print(tabulate(summary['conflicting'], headers=["Student ID", "Conflicting Course"], tablefmt="grid"))
+
+        seconds = summary['seconds']
+        rate = len(summary['enrolled']) / seconds if seconds > 0 else 0
+        print(f"Enrolled {len(summary['enrolled'])} student/s in {course_code} in {seconds:.2f}s ({rate:.0f} students/sec).")
+
     @staticmethod
     def enroll_single_student(student_data, course_data, student_id, course_code):
         # Create student and course objects
@@ -157,40 +242,30 @@ class Enrollment:
             for s in course_data.get('enrolled_students', [])
         )
 
-        if not course_exists and not student_already_enrolled:
+        # Check the course against the student's timetable
+        clash = None if course_exists else Enrollment.find_clash(student_id, course_data, student_data)
+
+        if clash:
+            print(f"Student {student_id} cannot be enrolled in {course_code}: it clashes with {clash} "
+                  f"on {course_data.get('day')}.")
+        elif not course_exists and not student_already_enrolled:
             # Enroll the student
             enrollment = Enrollment(student, course)
             enrollment.enroll_course(course)
 
             # Update student profile
-            student_data.setdefault('courses', []).append({
-                'course_code': course._course_code,
-                'course_name': course._course_name,
-                'credited_units': course._credited_units,
-                'college_room': course._assigned_college_room,
-                'room_number': course._room_number,
-                'day': course._day,
-                'start_time': course._start_time,
-                'end_time': course._end_time,
-                'instructor_id': course._instructor_id
-            })
+            schedule = StudentSchedules.get(student_id, student_data)
+            student_data.setdefault('courses', []).append(References.course_ref(course_code))
 
             # Update course data
-            course_data.setdefault('enrolled_students', []).append({
-                'student_id': student_id,
-                'username': student_data['name'],
-                'student_email': student_data['email'],
-                'student_major': student_data['major'],
-                'student_year_level': student_data['year_level'],
-                'student_semester': student_data['semester'],
-                'academic_year': student_data['academic_year']
-            })
-
-            # Save updated files
-            with open(f'data/users/{student_id}_student_profile.json', 'w') as f:
-                json.dump(student_data, f, indent=4)
-            with open(f'data/courses/{course_code}_course.json', 'w') as f:
-                json.dump(course_data, f, indent=4)
+            course_data.setdefault('enrolled_students', []).append(References.student_ref(student_id))
+
+            # Save both records in one transaction
+            repo = Storage.repo()
+            with repo.transaction():
+                repo.save('student', student_id, student_data)
+                repo.save('course', course_code, course_data)
+            Enrollment._add_to_schedule(student_id, schedule, References.course_row(course_data))
 
             print(f"Student {student_id} successfully enrolled in {course_code}.")
         elif course_exists:
@@ -199,25 +274,18 @@ class Enrollment:
             print(f"Student {student_id} is already in course {course_code}.")
 
     def course_request(student):
-        # Directory paths
-        courses_dir = "data/courses"
-        requests_dir = "data/requests"
+        repo = Storage.repo()
 
-        # Get the student's profile file path
+        # Get the student's ID
         student_id = student._user_id if hasattr(student, '_user_id') else student.get('user_id')
-        student_profile_path = f"data/users/{student_id}_student_profile.json"
         
         if not student_id:
             print("Error: Student ID not found.")
             return
 
-        # Ensure the requests directory exists
-        os.makedirs(requests_dir, exist_ok=True)
-
         # Load the student's profile, including major, year level, and semester
         try:
-            with open(student_profile_path, 'r') as f:
-                student_profile = json.load(f)
+            student_profile = repo.load('student', student_id)
 
             name = student_profile.get("name")
             major = student_profile.get("major")
@@ -228,19 +296,16 @@ class Enrollment:
             print(f"Error reading student profile: {e}")
             return
 
-        # Read available courses from the course directory, excluding already enrolled ones
+        # Read available courses, excluding already enrolled ones
         available_courses = []
         try:
-            for file in os.listdir(courses_dir):
-                if file.endswith("_course.json"):
-                    with open(os.path.join(courses_dir, file), 'r') as f:
-                        course_data = json.load(f)
-                        if course_data["course_code"] not in enrolled_courses:
-                            available_courses.append({
-                                "Course Code": course_data["course_code"],
-                                "Course Name": course_data["course_name"],
-                                "Credits": course_data["credited_units"]
-                            })
+            for _, course_data in repo.load_all('course'):
+                if course_data["course_code"] not in enrolled_courses:
+                    available_courses.append({
+                        "Course Code": course_data["course_code"],
+                        "Course Name": course_data["course_name"],
+                        "Credits": course_data["credited_units"]
+                    })
 
             # Check if there are courses available for request
             if not available_courses:
@@ -252,7 +317,6 @@ class Enrollment:
             print(tabulate(available_courses, headers="keys", tablefmt="grid"))
 
             # Initialize student's course request data
-            request_filename = os.path.join(requests_dir, f"{student_id}_course_requests.json")
             request_data = {
                 "student_id": student_id,
                 "name": name,
@@ -262,10 +326,9 @@ class Enrollment:
                 "course_requests": []
             }
 
-            # Load existing requests if file exists
-            if os.path.exists(request_filename):
-                with open(request_filename, 'r') as f:
-                    request_data = json.load(f)
+            # Load existing requests if any
+            if repo.exists('request', student_id):
+                request_data = repo.load('request', student_id)
 
             # Loop for selecting courses
             while True:
@@ -296,8 +359,7 @@ class Enrollment:
                     break
 
             # Save the updated course requests
-            with open(request_filename, 'w') as f:
-                json.dump(request_data, f, indent=4)
+            repo.save('request', student_id, request_data)
 
             print("Your course requests have been successfully saved!")
 
@@ -306,45 +368,32 @@ class Enrollment:
 
 
     def view_course_requests():
-        # Directory for course request files
-        requests_dir = "data/requests"
-
-        # Check if the directory exists
-        if not os.path.exists(requests_dir):
-            print("No course requests found. The requests directory does not exist.")
-            return
-
         # Prepare a list to hold the tabulated data
         table_data = []
 
         try:
-            # Iterate through all files in the requests directory
-            for file in os.listdir(requests_dir):
-                if file.endswith("_course_requests.json"):
-                    # Read each JSON file
-                    with open(os.path.join(requests_dir, file), 'r') as f:
-                        request_data = json.load(f)
-
-                        # Extract required fields
-                        student_id = request_data.get("student_id", "Unknown")
-                        name = request_data.get("name", "Unknown")
-                        major = request_data.get("major", "Unknown")
-                        year_level = request_data.get("year_level", "Unknown")
-                        semester = request_data.get("semester", "Unknown")
-
-                        # Extract course request details
-                        course_requests = request_data.get("course_requests", [])
-                        course_codes = [course["course_code"] for course in course_requests]
-
-                        # Add data to the table
-                        table_data.append({
-                            "Student ID": student_id,
-                            "Name": name,
-                            "Major": major,
-                            "Year Level": year_level,
-                            "Semester": semester,
-                            "Course Requests": ", ".join(course_codes)
-                        })
+            # Iterate through all course requests
+            for _, request_data in Snapshot.reader().load_all('request'):
+                # Extract required fields
+                student_id = request_data.get("student_id", "Unknown")
+                name = request_data.get("name", "Unknown")
+                major = request_data.get("major", "Unknown")
+                year_level = request_data.get("year_level", "Unknown")
+                semester = request_data.get("semester", "Unknown")
+
+                # Extract course request details
+                course_requests = request_data.get("course_requests", [])
+                course_codes = [course["course_code"] for course in course_requests]
+
+                # Add data to the table
+                table_data.append({
+                    "Student ID": student_id,
+                    "Name": name,
+                    "Major": major,
+                    "Year Level": year_level,
+                    "Semester": semester,
+                    "Course Requests": ", ".join(course_codes)
+                })
 
             # Check if there are any requests to display
             if not table_data:
@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+from fileio import atomic_write_text
+
+# Append-only log of JSON entries, used for per-instructor feedback.
+#
+# The active segment is {key}_feedback.log. Its first line is a fixed-width
+# header holding the number of the segment's first entry, its entry count
+# and the byte length of its entries, so counting and appending never read
+# the entries themselves. Each append writes one line, fsyncs it, then
+# rewrites the header in place. A crash between the two leaves complete
+# lines past the recorded length; they are rolled forward on the next open.
+#
+# Once the active segment holds SEGMENT_ENTRIES it is sealed into the
+# {key}_feedback_segments/ directory and a new one is started. Sealed
+# segments are merged into larger ones by a background thread, which keeps
+# the number of files per log small without ever blocking an append.
+
+class EntryLog:
+    HEADER_SIZE = 64
+    SEGMENT_ENTRIES = 1000
+
+    # Merge sealed segments once this many are waiting, up to this many entries
+    COMPACT_TRIGGER = 4
+    COMPACT_ENTRIES = 64000
+
+    # Locks per log path, shared by every EntryLog on that path in this
+    # process: one for appends, one so only one compaction runs at a time
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, path, legacy_path=None):
+        # Protected instance attributes
+        self._path = path
+        self._legacy_path = legacy_path
+        self._segments_dir = path[:-len('.log')] + '_segments' if path.endswith('.log') else path + '_segments'
+        with EntryLog._locks_guard:
+            self._lock, self._compact_lock = EntryLog._locks.setdefault(
+                os.path.abspath(path), (threading.RLock(), threading.Lock()))
+
+    @staticmethod
+    def _header(first, count, length):
+        text = json.dumps({'first': first, 'count': count, 'length': length})
+        return (text.ljust(EntryLog.HEADER_SIZE - 1) + '\n').encode('utf-8')
+
+    @staticmethod
+    def _encode(entries):
+        return ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+
+    # (first, count, length) of an open segment, counting complete entries
+    # written after the header was last updated
+    @staticmethod
+    def _read_header(f):
+        f.seek(0)
+        header = json.loads(f.read(EntryLog.HEADER_SIZE))
+        first, count, length = header['first'], header['count'], header['length']
+
+        f.seek(EntryLog.HEADER_SIZE + length)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            count += 1
+            length += len(line)
+        return first, count, length
+
+    def exists(self):
+        return os.path.exists(self._path) or self._has_legacy()
+
+    def _has_legacy(self):
+        return self._legacy_path is not None and os.path.exists(self._legacy_path)
+
+    # Convert an old whole-array JSON file into a log. Returns True if
+    # there was one to convert.
+    def migrate_legacy(self):
+        if os.path.exists(self._path) or not self._has_legacy():
+            return False
+        with open(self._legacy_path, 'r') as f:
+            entries = json.load(f)
+        self.rewrite(entries)
+        os.remove(self._legacy_path)
+        return True
+
+    # Number of the entry the next sealed segment would start at
+    def _sealed_end(self):
+        end = 0
+        for first, count, _ in self._segments():
+            end = max(end, first + count)
+        return end
+
+    # (first, count, path) for every sealed segment, ordered by first entry.
+    # Segments left over from an interrupted compaction are covered by the
+    # merged one; they are skipped, and removed when remove_covered is set.
+    def _segments(self, remove_covered=False):
+        if not os.path.exists(self._segments_dir):
+            return []
+        segments = []
+        for filename in os.listdir(self._segments_dir):
+            if not filename.endswith('.seg'):
+                continue
+            path = os.path.join(self._segments_dir, filename)
+            try:
+                with open(path, 'rb') as f:
+                    first, count, _ = EntryLog._read_header(f)
+            except (FileNotFoundError, ValueError, KeyError):
+                # Removed by a compaction in the meantime
+                continue
+            segments.append((first, count, path))
+
+        kept, end = [], 0
+        for first, count, path in sorted(segments):
+            if first < end:
+                if remove_covered:
+                    os.remove(path)
+                continue
+            kept.append((first, count, path))
+            end = first + count
+        return kept
+
+    def _segment_path(self, first):
+        return os.path.join(self._segments_dir, f"{first:010d}.seg")
+
+    def append(self, entry):
+        with self._lock:
+            self.migrate_legacy()
+            if not os.path.exists(self._path):
+                atomic_write_text(self._path, EntryLog._header(self._sealed_end(), 0, 0).decode('utf-8'), grouped=False)
+
+            line = EntryLog._encode([entry])
+            with open(self._path, 'r+b') as f:
+                first, count, length = EntryLog._read_header(f)
+                f.seek(EntryLog.HEADER_SIZE + length)
+                f.write(line)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+
+                count += 1
+                f.seek(0)
+                f.write(EntryLog._header(first, count, length + len(line)))
+
+            if count >= self.SEGMENT_ENTRIES:
+                self._seal(first, count)
+
+    # Move the full active segment aside and start a new one after it
+    def _seal(self, first, count):
+        os.makedirs(self._segments_dir, exist_ok=True)
+        os.replace(self._path, self._segment_path(first))
+        atomic_write_text(self._path, EntryLog._header(first + count, 0, 0).decode('utf-8'), grouped=False)
+
+        waiting = [segment for segment in self._segments() if segment[1] < self.COMPACT_ENTRIES]
+        if len(waiting) >= self.COMPACT_TRIGGER:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    # Merge runs of sealed segments into segments of up to COMPACT_ENTRIES.
+    # Only sealed segments are touched, so appends carry on meanwhile.
+    def compact(self):
+        with self._compact_lock:
+            runs, run = [], []
+            for segment in self._segments(remove_covered=True):
+                if run and sum(count for _, count, _ in run) + segment[1] > self.COMPACT_ENTRIES:
+                    runs.append(run)
+                    run = []
+                run.append(segment)
+            runs.append(run)
+
+            for run in runs:
+                if len(run) < 2:
+                    continue
+                entries = []
+                for _, _, path in run:
+                    entries += self._read_segment(path, 0, None)
+                first = run[0][0]
+                body = EntryLog._encode(entries)
+
+                # The merged segment replaces the first of the run, which makes
+                # the rest of the run redundant before they are removed
+                atomic_write_text(self._segment_path(first),
+                                  (EntryLog._header(first, len(entries), len(body)) + body).decode('utf-8'),
+                                  grouped=False)
+                for _, _, path in run[1:]:
+                    os.remove(path)
+
+    @staticmethod
+    def _read_segment(path, skip, limit):
+        entries = []
+        with open(path, 'rb') as f:
+            _, count, length = EntryLog._read_header(f)
+            f.seek(EntryLog.HEADER_SIZE)
+            for index, line in enumerate(f):
+                if index >= count or (limit is not None and len(entries) >= limit):
+                    break
+                if index >= skip:
+                    entries.append(json.loads(line))
+        return entries
+
+    # Total number of entries
+    def count(self):
+        with self._lock:
+            self.migrate_legacy()
+        try:
+            with open(self._path, 'rb') as f:
+                first, count, _ = EntryLog._read_header(f)
+            return first + count
+        except FileNotFoundError:
+            return self._sealed_end()
+
+    # Entries start .. start + limit (all of them when limit is None)
+    def read(self, start=0, limit=None):
+        with self._lock:
+            self.migrate_legacy()
+            while True:
+                try:
+                    return self._read(start, limit)
+                except FileNotFoundError:
+                    # A compaction merged a segment away mid-read; start over
+                    continue
+
+    def _read(self, start, limit):
+        entries = []
+        segments = self._segments()
+        try:
+            with open(self._path, 'rb') as f:
+                active_first, active_count, _ = EntryLog._read_header(f)
+            segments.append((active_first, active_count, self._path))
+        except FileNotFoundError:
+            active_first = None
+
+        for first, count, path in segments:
+            # Sealed segments a rewrite has made obsolete
+            if path != self._path and active_first is not None and first >= active_first:
+                continue
+            if first + count <= start:
+                continue
+            wanted = None if limit is None else limit - len(entries)
+            entries += EntryLog._read_segment(path, max(0, start - first), wanted)
+            if limit is not None and len(entries) >= limit:
+                break
+        return entries
+
+    # Replace every entry, e.g. when importing or migrating
+    def rewrite(self, entries):
+        with self._lock, self._compact_lock:
+            body = EntryLog._encode(entries)
+            atomic_write_text(self._path, (EntryLog._header(0, len(entries), len(body)) + body).decode('utf-8'),
+                              grouped=False)
+            self._remove_segments()
+
+    def delete(self):
+        with self._lock, self._compact_lock:
+            if not self.exists():
+                raise FileNotFoundError(self._path)
+            for path in (self._path, self._legacy_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            self._remove_segments()
+
+    def _remove_segments(self):
+        if os.path.exists(self._segments_dir):
+            for filename in os.listdir(self._segments_dir):
+                os.remove(os.path.join(self._segments_dir, filename))
+            os.rmdir(self._segments_dir)
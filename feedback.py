@@ -1,11 +1,15 @@
 import json
 import os
 from tabulate import tabulate
+from storage import Storage
 
 class Feedback:
     # Class attributes
     _total_feedbacks = 0
 
+    # Feedback entries shown per page
+    PAGE_SIZE = 10
+
     # Directories/ Class Attributes
     _DATA_FOLDER = 'data'
     _FEEDBACK_FOLDER = os.path.join(_DATA_FOLDER, 'feedback')
@@ -36,23 +40,9 @@ class Feedback:
 
     @classmethod
     def verify_instructor(cls, instructor_id):
-        # Define the path to the user profiles folder
-        profiles_folder = os.path.join(cls._DATA_FOLDER, 'users')
-        
         try:
-            # List all files that match the instructor profile naming convention
-            instructor_files = [f for f in os.listdir(profiles_folder) if f.endswith('_instructor_profile.json')]
-            
-            # Loop through each instructor file to find a matching instructor_id
-            for instructor_file in instructor_files:
-                file_path = os.path.join(profiles_folder, instructor_file)
-                with open(file_path, 'r') as file:
-                    instructor_data = json.load(file)
-                    if instructor_data.get('user_id') == instructor_id:
-                        return True  # Match found
-            
-            # If no match is found
-            return False
+            # Instructor profiles are keyed by their user_id
+            return Storage.repo().exists('instructor', instructor_id)
         
         except (FileNotFoundError, json.JSONDecodeError):
             print("Error accessing instructor files or file is corrupted.")
@@ -88,30 +78,8 @@ class Feedback:
                 "feedback": feedback_text
             }
 
-            # Construct feedback file path
-            feedback_file_path = os.path.join(
-                Feedback._FEEDBACK_FOLDER, 
-                f"{instructor_id}_feedback.json"
-            )
-
-            # Ensure the feedback directory exists
-            os.makedirs(Feedback._FEEDBACK_FOLDER, exist_ok=True)
-
-            # Check if the feedback file exists; if not, create it with an empty list
-            if not os.path.exists(feedback_file_path):
-                with open(feedback_file_path, 'w') as file:
-                    json.dump([], file)  # Create an empty list in the file if it doesn't exist
-
-            # Read existing feedbacks
-            with open(feedback_file_path, 'r') as file:
-                feedbacks = json.load(file)
-
-            # Add new feedback
-            feedbacks.append(feedback_entry)
-
-            # Write feedback back to file
-            with open(feedback_file_path, 'w') as file:
-                json.dump(feedbacks, file, indent=4)
+            # Add new feedback to the end of the instructor's feedback log
+            Storage.repo().append('feedback', instructor_id, feedback_entry)
 
             print("Feedback sent successfully!")
 
@@ -120,16 +88,9 @@ class Feedback:
 
     @classmethod
     def get_total_feedbacks(cls, instructor_id):
-        feedback_file_path = os.path.join(Feedback._FEEDBACK_FOLDER, f"{instructor_id}_feedback.json")
-        
         try:
-            if not os.path.exists(feedback_file_path):
-                return 0  # No feedback file means no feedback
-            
-            with open(feedback_file_path, 'r') as file:
-                feedbacks = json.load(file)
-            
-            return len(feedbacks)  # Return the number of feedbacks
+            # Read from the log header; no feedback record means no feedback
+            return Storage.repo().entry_count('feedback', instructor_id)
 
         except json.JSONDecodeError:
             print("Error reading feedback file. The file may be corrupted.")
@@ -149,41 +110,52 @@ class Feedback:
             print("No instructor ID available.")
             return
 
-        feedback_file_path = os.path.join(
-            Feedback._FEEDBACK_FOLDER, 
-            f"{instructor_id}_feedback.json"
-        )
-
         try:
-            with open(feedback_file_path, 'r') as file:
-                feedbacks = json.load(file)
-
-            instructor_feedbacks = [
-                feedback for feedback in feedbacks 
-                if feedback['instructor_id'] == instructor_id
-            ]
+            repo = Storage.repo()
 
-            if not instructor_feedbacks:
+            # Call the static method to get the total feedback count
+            total_feedbacks = Feedback.get_total_feedbacks(instructor_id)
+            if not total_feedbacks:
                 print("No feedback available.")
                 return
 
-            # Prepare data for tabulation
-            table_data = [
-                [
-                    feedback['course_code'],
-                    feedback['feedback']
-                ] 
-                for feedback in instructor_feedbacks
-            ]
-
-            # Display feedback using tabulate
-            headers = ["Course Code", "Feedback"]
-            print("\nList of Feedbacks:")
-            print(tabulate(table_data, headers=headers, tablefmt="grid"))
-            
-            # Call the static method to get the total feedback count
-            total_feedbacks = Feedback.get_total_feedbacks(instructor_id)
-            print(f"Total Feedbacks Received: {total_feedbacks}\n")
+            total_pages = (total_feedbacks + Feedback.PAGE_SIZE - 1) // Feedback.PAGE_SIZE
+            page = 0
+
+            while True:
+                # Read only the entries on this page
+                feedbacks = repo.load_entries('feedback', instructor_id, page * Feedback.PAGE_SIZE, Feedback.PAGE_SIZE)
+
+                # Prepare data for tabulation
+                table_data = [
+                    [
+                        feedback['course_code'],
+                        feedback['feedback']
+                    ]
+                    for feedback in feedbacks
+                    if feedback['instructor_id'] == instructor_id
+                ]
+
+                # Display feedback using tabulate
+                headers = ["Course Code", "Feedback"]
+                print("\nList of Feedbacks:")
+                print(tabulate(table_data, headers=headers, tablefmt="grid"))
+                if total_pages > 1:
+                    print(f"Page {page + 1} of {total_pages}")
+                print(f"Total Feedbacks Received: {total_feedbacks}\n")
+
+                if total_pages == 1:
+                    break
+
+                choice = input("n - Next Page, p - Previous Page, b - Back: ").strip().lower()
+                if choice == 'n' and page + 1 < total_pages:
+                    page += 1
+                elif choice == 'p' and page > 0:
+                    page -= 1
+                elif choice == 'b':
+                    break
+                else:
+                    print("No more pages in that direction." if choice in ('n', 'p') else "Invalid choice. Please try again.")
 
         except FileNotFoundError:
             print(f"No feedback file found for Instructor ID: {instructor_id}")
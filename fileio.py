@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+# Crash-safe file writes.
+#
+# Every write goes to a temp file next to its target and is renamed over it,
+# so a crash leaves either the old or the new file, never a truncated one.
+# Outside a group each write is fsynced and its directory flushed on its
+# own. Inside group_commit() writes are staged; at the end the staged files
+# are fsynced, renamed into place together and each directory is flushed
+# once, so bulk operations pay one directory flush instead of one per file
+# and never wait on I/O that is not theirs.
+#
+# The renames of a group are not atomic on their own, so a group of more
+# than one file first writes a commit journal listing them. A crash during
+# the renames leaves the journal behind, and recover() finishes the group
+# from it on the next start; a crash before the journal is written leaves
+# only temp files, which recover() discards.
+
+_state = threading.local()
+
+def _pending():
+    # path -> (temp path, text) for staged writes, or None for staged deletes
+    return getattr(_state, 'pending', None)
+
+# Run a callback once the current write is on disk: straight away outside a
+# group, after the rename step inside one. Callbacks sharing a key run once.
+def on_commit(callback, key=None):
+    callbacks = getattr(_state, 'callbacks', None)
+    if _pending() is None:
+        callback()
+    elif key is None:
+        callbacks[object()] = callback
+    else:
+        callbacks.setdefault(key, callback)
+
+# Collect item under key and run flush(items) once the current write is on
+# disk: straight away outside a group, once for all of the group's items
+# inside one. Lets derived files take a whole group in one update.
+def on_commit_batch(key, item, flush):
+    if _pending() is None:
+        flush([item])
+        return
+    batches = _state.batches
+    if key not in batches:
+        items = batches[key] = []
+        _state.callbacks[('batch', key)] = lambda: flush(items)
+    batches[key].append(item)
+
+# Unique per thread as well as per process, so two threads writing the same
+# file never share a temporary file
+def _temp_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def _fsync_directory(directory):
+    # Directories cannot be opened for fsync on Windows
+    if os.name == 'nt':
+        return
+    fd = os.open(directory or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# grouped=False writes through immediately even inside a group; used for
+# derived files such as indexes that are read back straight away.
+def atomic_write_text(path, text, grouped=True):
+    temp_path = _temp_path(path)
+    pending = _pending() if grouped else None
+
+    with open(temp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        if pending is None:
+            os.fsync(f.fileno())
+
+    if pending is None:
+        os.replace(temp_path, path)
+        _fsync_directory(os.path.dirname(path))
+    else:
+        pending[path] = (temp_path, text)
+        _state.directories.add(os.path.normpath(os.path.dirname(path)))
+
+# Binary files are always written through; nothing reads them back staged
+def atomic_write_bytes(path, data):
+    temp_path = _temp_path(path)
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    _fsync_directory(os.path.dirname(path))
+
+def atomic_write_json(path, data):
+    atomic_write_text(path, json.dumps(data, indent=4))
+
+def remove_file(path):
+    pending = _pending()
+    if pending is None:
+        os.remove(path)
+        _fsync_directory(os.path.dirname(path))
+        return
+
+    if not staged_exists(path):
+        raise FileNotFoundError(path)
+    entry = pending.get(path)
+    if entry:
+        os.remove(entry[0])
+    pending[path] = None
+
+# Returns (True, text) for a staged write, (True, None) for a staged delete
+# and (False, None) when the path has nothing staged in this thread.
+def staged(path):
+    pending = _pending()
+    if pending is None or path not in pending:
+        return False, None
+    entry = pending[path]
+    return True, entry[1] if entry else None
+
+# Whether this thread's open group has written temp files into a directory,
+# which moves its mtime before anything is committed
+def has_staged_writes(directory):
+    directories = getattr(_state, 'directories', None)
+    return bool(directories) and os.path.normpath(directory) in directories
+
+def staged_exists(path):
+    is_staged, text = staged(path)
+    if is_staged:
+        return text is not None
+    return os.path.exists(path)
+
+# Staged writes and deletes inside one directory: {filename: exists}
+def staged_in(directory):
+    pending = _pending() or {}
+    return {
+        os.path.basename(path): entry is not None
+        for path, entry in pending.items()
+        if os.path.dirname(path) == os.path.normpath(directory)
+    }
+
+def _journal_path(journal_dir):
+    return os.path.join(journal_dir, f"commit.{os.getpid()}.{threading.get_ident()}.json")
+
+# Apply a group's renames and deletes and flush the directories they touched
+def _apply(files):
+    directories = set()
+    for path, temp_path in files:
+        if temp_path is None:
+            if os.path.exists(path):
+                os.remove(path)
+        elif os.path.exists(temp_path):
+            os.replace(temp_path, path)
+        directories.add(os.path.dirname(path))
+
+    for directory in directories:
+        _fsync_directory(directory)
+
+def _commit(pending, journal_dir):
+    # Flush the group's own files only; nothing is renamed until every one
+    # of them is on disk
+    for entry in pending.values():
+        if not entry:
+            continue
+        fd = os.open(entry[0], os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    files = [(path, entry[0] if entry else None) for path, entry in pending.items()]
+    if len(files) < 2:
+        # One rename is atomic by itself
+        _apply(files)
+        return
+
+    # The group is committed once its journal is on disk; from then on a
+    # crash is finished by recover() instead of leaving half the group
+    journal_path = _journal_path(journal_dir)
+    os.makedirs(journal_dir, exist_ok=True)
+    atomic_write_text(journal_path, json.dumps({'pid': os.getpid(), 'files': files}), grouped=False)
+    _apply(files)
+    os.remove(journal_path)
+    # Flushed, so a journal already applied is never replayed over later writes
+    _fsync_directory(journal_dir)
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    # Signal 0 is CTRL_C_EVENT on Windows, where only threads of one
+    # process share the data anyway
+    if os.name == 'nt':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        # Exists but belongs to someone else, or cannot be checked here
+        return True
+    return True
+
+# Finish the groups of dead processes whose journals were left in
+# journal_dir, then remove their leftover temp files from the given
+# directories. Returns the number of groups finished.
+def recover(journal_dir, directories):
+    finished = 0
+    if os.path.isdir(journal_dir):
+        for filename in sorted(os.listdir(journal_dir)):
+            if not (filename.startswith('commit.') and filename.endswith('.json')):
+                continue
+            journal_path = os.path.join(journal_dir, filename)
+            try:
+                with open(journal_path) as f:
+                    journal = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if _process_alive(journal.get('pid')):
+                continue
+            _apply(journal['files'])
+            os.remove(journal_path)
+            _fsync_directory(journal_dir)
+            finished += 1
+
+    # Temp files are named .<name>.<pid>.<thread>.tmp
+    for directory in set(directories) | {journal_dir}:
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            if not (filename.startswith('.') and filename.endswith('.tmp')):
+                continue
+            try:
+                pid = int(filename.split('.')[-3])
+            except (IndexError, ValueError):
+                continue
+            if not _process_alive(pid):
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    pass
+    return finished
+
+def _discard(pending):
+    for entry in pending.values():
+        if entry and os.path.exists(entry[0]):
+            os.remove(entry[0])
+
+# The commit journal of a group of several files is written to journal_dir
+@contextmanager
+def group_commit(journal_dir):
+    # Nested groups join the outermost one
+    if _pending() is not None:
+        yield
+        return
+
+    _state.pending = {}
+    _state.callbacks = {}
+    _state.batches = {}
+    _state.directories = set()
+    try:
+        yield
+    except BaseException:
+        pending, _state.pending = _state.pending, None
+        _state.callbacks = _state.batches = _state.directories = None
+        _discard(pending)
+        raise
+    else:
+        pending, _state.pending = _state.pending, None
+        callbacks, _state.callbacks = _state.callbacks, None
+        _state.batches = _state.directories = None
+        _commit(pending, journal_dir)
+        for callback in callbacks.values():
+            callback()
@@ -0,0 +1,166 @@
+from roomschedule import to_minutes, to_time
+from storage import Storage
+
+# Free-slot search across every room.
+#
+# Each room's week is a bitmap of 5-minute slots per weekday, held as a
+# Python int with one bit per slot (set = busy). For a query the bitmaps of
+# all rooms are packed side by side into one int per day, separated by an
+# always-busy guard bit, so each shift-and-AND step tests every room at once.
+
+class FreeSlotFinder:
+    GRANULARITY = 5
+    DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')
+    SLOTS_PER_DAY = 24 * 60 // GRANULARITY
+
+    # Default window new classes may be placed in
+    OPEN = '7:00'
+    CLOSE = '21:00'
+
+    # Bits per room in a packed day, including the guard bit
+    _WIDTH = SLOTS_PER_DAY + 1
+
+    # "H:MM" for every minute of the day, so results do not format times one by one
+    _TIMES = [to_time(minutes) for minutes in range(24 * 60 + 1)]
+
+    # Process-wide instance for the current repository
+    _shared = None
+
+    def __init__(self, repo):
+        # Protected instance attributes
+        self._repo = repo
+        self._rooms = None      # room_key -> (college, {day: busy bitmap})
+        self._stale = set()     # rooms written since they were loaded
+        self._packed = None     # (room order, {day: packed bitmap}, {college: mask})
+        self._version = None    # version stamp of the rooms when they were loaded
+        repo.subscribe(self._changed)
+
+    @classmethod
+    def shared(cls):
+        repo = Storage.repo()
+        if cls._shared is None or cls._shared._repo is not repo:
+            cls._shared = cls(repo)
+        return cls._shared
+
+    def _changed(self, kind, key):
+        if kind == 'room':
+            self._stale.add(key)
+            self._packed = None
+
+    # Busy bitmap per day for a room's scheduled_times. Times that do not
+    # fall on a slot boundary mark every slot they touch.
+    @staticmethod
+    def occupancy(scheduled_times):
+        days = {}
+        for slot in scheduled_times:
+            try:
+                first = to_minutes(slot['start_time']) // FreeSlotFinder.GRANULARITY
+                last = -(-to_minutes(slot['end_time']) // FreeSlotFinder.GRANULARITY)
+            except (KeyError, ValueError, AttributeError):
+                continue
+            first, last = max(first, 0), min(last, FreeSlotFinder.SLOTS_PER_DAY)
+            if last > first:
+                days[slot.get('day')] = days.get(slot.get('day'), 0) | (((1 << (last - first)) - 1) << first)
+        return days
+
+    # One int holding the day bitmap of every room in turn, each followed by
+    # a busy guard bit so no free run crosses from one room into the next
+    @staticmethod
+    def pack(bitmaps):
+        packed = FreeSlotFinder.repeat(1 << FreeSlotFinder.SLOTS_PER_DAY, len(bitmaps))
+        for i, bitmap in enumerate(bitmaps):
+            packed |= bitmap << (i * FreeSlotFinder._WIDTH)
+        return packed
+
+    # A day bitmap copied into the position of each of count packed rooms
+    @staticmethod
+    def repeat(bitmap, count):
+        width = FreeSlotFinder._WIDTH
+        return bitmap * (((1 << (count * width)) - 1) // ((1 << width) - 1))
+
+    # Bit p of the result is set when bits p .. p + length - 1 of free are all set
+    @staticmethod
+    def runs(free, length):
+        run, covered = free, 1
+        while covered < length:
+            step = min(covered, length - covered)
+            run &= run >> step
+            covered += step
+        return run
+
+    def _load_room(self, room_key, room_data):
+        self._rooms[room_key] = (room_data.get('assigned_college_room'),
+                                 FreeSlotFinder.occupancy(room_data.get('scheduled_times', [])))
+
+    # Rooms written through the repository are reloaded one by one; a write
+    # from another process only shows in the version stamp, and reloads all
+    def _refresh(self):
+        version = self._repo.external_version('room')
+        if version != self._version:
+            self._rooms = None
+            self._packed = None
+            self._version = version
+
+        if self._rooms is None:
+            self._rooms = {}
+            self._stale.clear()
+            for room_key, room_data in self._repo.load_all('room'):
+                self._load_room(room_key, room_data)
+
+        for room_key in self._stale:
+            self._rooms.pop(room_key, None)
+            if self._repo.exists('room', room_key):
+                self._load_room(room_key, self._repo.load('room', room_key))
+        self._stale.clear()
+
+        if self._packed is None:
+            order = sorted(self._rooms)
+            packed = {day: FreeSlotFinder.pack([self._rooms[room_key][1].get(day, 0) for room_key in order])
+                      for day in self.DAYS}
+
+            # Per college, the bits of every room outside it
+            full_room = (1 << self._WIDTH) - 1
+            colleges = {}
+            for i, room_key in enumerate(order):
+                colleges.setdefault(self._rooms[room_key][0], 0)
+                colleges[self._rooms[room_key][0]] |= full_room << (i * self._WIDTH)
+            self._packed = (order, packed, colleges)
+        return self._packed
+
+    # Every free (room_key, day, start_time, end_time) for a class of the
+    # given length, starting on a slot boundary between earliest and
+    # latest - duration. days defaults to Monday-Friday; college limits the
+    # search to rooms of one assigned_college_room.
+    def find(self, duration_minutes, days=None, college=None, earliest=OPEN, latest=CLOSE):
+        order, packed, colleges = self._refresh()
+        length = -(-duration_minutes // self.GRANULARITY)
+        if not order or length <= 0:
+            return []
+
+        # Allowed start slots, repeated for every room
+        first = -(-to_minutes(earliest) // self.GRANULARITY)
+        last = to_minutes(latest) // self.GRANULARITY - length
+        if last < first:
+            return []
+        starts_allowed = FreeSlotFinder.repeat(((1 << (last - first + 1)) - 1) << first, len(order))
+
+        everything = (1 << (len(order) * self._WIDTH)) - 1
+        if college is not None:
+            starts_allowed &= colleges.get(college, 0)
+
+        candidates = []
+        for day in (days or self.DAYS):
+            if day not in packed:
+                continue
+            run = FreeSlotFinder.runs(~packed[day] & everything, length) & starts_allowed
+
+            # Set bits read off the binary string, least significant first;
+            # clearing them one by one would copy the whole int per candidate
+            bits = format(run, 'b')[::-1]
+            position = bits.find('1')
+            while position != -1:
+                room, slot = divmod(position, self._WIDTH)
+                position = bits.find('1', position + 1)
+                start = slot * self.GRANULARITY
+                candidates.append((order[room], day, self._TIMES[start], self._TIMES[start + duration_minutes]))
+        return candidates
@@ -1,6 +1,6 @@
-import json
 import os
 from tabulate import tabulate
+from storage import RecordNotFound, Storage
 
 class Grade: 
     # Directories
@@ -29,7 +29,7 @@ class Grade:
     # Assign a grade to a student for a specific assignment.  
     @classmethod
     def assign_grade_to_student(cls):
-        os.makedirs(cls._assignments_directory, exist_ok=True)
+        repo = Storage.repo()
         try:
             # 1. Prompt for Assignment Code
             assignment_code = input("1 - Enter Assignment Code: ").strip()
@@ -43,17 +43,18 @@ class Grade:
                 print("Error: Student ID cannot be empty.")
                 return
 
-            # Find the corresponding student's submission file
-            submission_filename = f"{student_id}_assignment_submission.json"
-            submission_path = os.path.join(cls._assignments_directory, submission_filename)
-
-            if not os.path.exists(submission_path):
+            # Find the student's submission for this assignment; submissions
+            # from before migrate-submissions are keyed by the student alone
+            submission_key = repo.submission_key(assignment_code, student_id)
+            if (not repo.exists('submission', submission_key) and repo.exists('submission', student_id)
+                    and repo.load('submission', student_id).get('assignment_code') == assignment_code):
+                submission_key = student_id
+            if not repo.exists('submission', submission_key):
                 print(f"Error: No submission found for student ID {student_id} for assignment {assignment_code}.")
                 return
 
             # Load existing submission data
-            with open(submission_path, 'r') as f:
-                submission_data = json.load(f)
+            submission_data = repo.load('submission', submission_key)
 
             # 3. Check if a grade has already been assigned
             if "score" in submission_data and "grade_rate" in submission_data:
@@ -78,9 +79,8 @@ class Grade:
             submission_data['score'] = score
             submission_data['grade_rate'] = grade_rate
 
-            # Save the updated submission data back to the file
-            with open(submission_path, 'w') as f:
-                json.dump(submission_data, f, indent=4)
+            # Save the updated submission data back
+            repo.save('submission', submission_key, submission_data)
 
             print(f"Grade assigned to student {student_id} for assignment '{assignment_code}' with score: {score} ({grade_rate})")
 
@@ -90,7 +90,6 @@ class Grade:
     # Allow student to view the status of their assignments
     @staticmethod
     def student_view_assignment_status(self, student):
-        os.makedirs(self._assignments_directory, exist_ok=True)
         passed_assignments = []
         
         # Ensure student has a 'student_id' attribute
@@ -99,36 +98,28 @@ class Grade:
             print("Error: Student ID not found.")
             return
         
-        # Iterate through all submission files to find the relevant data for the student
-        for filename in os.listdir(self._assignments_directory):
-            if filename.endswith(f"{student_id}_assignment_submission.json"):
-                try:
-                    # Load the student's submission data from the JSON file
-                    with open(os.path.join(self._assignments_directory, filename), 'r') as f:
-                        submission_data = json.load(f)
-                        
-                        # Check if the student_id in the file matches the logged-in student_id
-                        if submission_data.get('student_id') == student_id:
-                            # Extract relevant details for the student
-                            course_code = submission_data.get('course_code')
-                            assignment_code = submission_data.get('assignment_code')
-                            assignment_name = submission_data.get('assignment_name')
-                            score = submission_data.get('score', 'Not yet graded')  # Default to 'N/A' if no score is present
-                            grade_rate = submission_data.get('grade_rate', 'Not yet assigned')  # Default to 'N/A' if no grade rate is present
-                            status = submission_data.get('status', 'N/A')  # Default to 'N/A' if no status is present
-                            
-                            # Append the data to the passed_assignments list
-                            passed_assignments.append([
-                                course_code,
-                                assignment_code,
-                                assignment_name,
-                                score,
-                                grade_rate,
-                                status
-                            ])
-                except Exception as e:
-                    print(f"Error processing {filename}: {e}")
-                    continue
+        # Load every submission of the student
+        try:
+            for submission_data in Storage.repo().student_submissions(student_id):
+                # Extract relevant details for the student
+                course_code = submission_data.get('course_code')
+                assignment_code = submission_data.get('assignment_code')
+                assignment_name = submission_data.get('assignment_name')
+                score = submission_data.get('score', 'Not yet graded')  # Default to 'N/A' if no score is present
+                grade_rate = submission_data.get('grade_rate', 'Not yet assigned')  # Default to 'N/A' if no grade rate is present
+                status = submission_data.get('status', 'N/A')  # Default to 'N/A' if no status is present
+                
+                # Append the data to the passed_assignments list
+                passed_assignments.append([
+                    course_code,
+                    assignment_code,
+                    assignment_name,
+                    score,
+                    grade_rate,
+                    status
+                ])
+        except Exception as e:
+            print(f"Error processing submission for {student_id}: {e}")
         
         # Display the assignment details
         if passed_assignments:
@@ -147,16 +138,16 @@ class Grade:
             course_code = input("Enter Course Code: ").strip()
             student_id = input("Enter Student ID: ").strip()
 
-            # Path for the course file
-            course_file_path = f"data/courses/{course_code}_course.json"
-            if not os.path.exists(course_file_path):
+            repo = Storage.repo()
+
+            # Check the course exists
+            if not repo.exists('course', course_code):
                 print(f"Error: Course file for '{course_code}' not found.")
                 return
             
             # Check if student is enrolled in the course
             try:
-                with open(course_file_path, 'r') as file:
-                    course_data = json.load(file)
+                course_data = repo.load('course', course_code)
 
                 # Get list of enrolled students
                 enrolled_students = course_data.get("enrolled_students", [])
@@ -169,12 +160,8 @@ class Grade:
                 print(f"Error reading course file: {e}")
                 return
 
-            # Prepare filename for saving grades
-            filename = f"{student_id}_grade.json"
-            filepath = os.path.join(self.grades_dir, filename)
-
             # Check if the grade has already been assigned
-            if os.path.exists(filepath):
+            if repo.exists('grade', student_id):
                 print(f"Error: Grade has already been assigned to Student ID {student_id} for Course {course_code}.")
                 return
 
@@ -195,10 +182,8 @@ class Grade:
                 "grade": grade
             }]
             
-            # Save the grade to the JSON file
-            os.makedirs(self.grades_dir, exist_ok=True)
-            with open(filepath, 'w') as file:
-                json.dump(grades_data, file, indent=4)
+            # Save the grade
+            repo.save('grade', student_id, grades_data)
             
             print(f"Grade saved successfully for Student ID '{student_id}' in Course '{course_code}'.")
 
@@ -210,24 +195,13 @@ class Grade:
             print("Error: Student ID not found.")
             return
         
-        # Find all grade files for this student
-        student_grade_files = [
-            f for f in os.listdir(self.grades_dir) 
-            if f.startswith(f"{student_id}_") and f.endswith("_grade.json")
-        ]
-        
-        if not student_grade_files:
+        # Collect all grades for this student
+        try:
+            all_grades = Storage.repo().load('grade', student_id)
+        except RecordNotFound:
             print(f"No grades found for Student ID {student_id}")
             return
         
-        # Collect all grades
-        all_grades = []
-        for filename in student_grade_files:
-            filepath = os.path.join(self.grades_dir, filename)
-            with open(filepath, 'r') as file:
-                course_grades = json.load(file)
-                all_grades.extend(course_grades)
-        
         # Calculate average
         average = Grade.Calculate_Average(self, student)
         
@@ -250,22 +224,11 @@ class Grade:
             print("Error: Student ID not found.")
             return
         
-        # Find all grade files for this student
-        student_grade_files = [
-            f for f in os.listdir(self.grades_dir) 
-            if f.startswith(f"{student_id}_") and f.endswith("_grade.json")
-        ]
-        
-        if not student_grade_files:
+        # Collect all grades for this student
+        try:
+            all_grades = [grade['grade'] for grade in Storage.repo().load('grade', student_id)]
+        except RecordNotFound:
             return 0
         
-        # Collect all grades
-        all_grades = []
-        for filename in student_grade_files:
-            filepath = os.path.join(self.grades_dir, filename)
-            with open(filepath, 'r') as file:
-                course_grades = json.load(file)
-                all_grades.extend([grade['grade'] for grade in course_grades])
-        
         # Calculate and return average
         return sum(all_grades) / len(all_grades) if all_grades else 0
\ No newline at end of file
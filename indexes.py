@@ -0,0 +1,894 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+import hashlib
+import json
+import os
+import threading
+from fileio import atomic_write_text, has_staged_writes
+
+try:
+    import fcntl
+except ImportError:  # not POSIX; only threads are kept apart
+    fcntl = None
+
+# Exclusive lock on one index log, shared by every index object over it in
+# this process and taken with flock against other processes. The flock is
+# on a separate .lock file, since compaction renames a new log over the old
+# one. Reentrant, so a rebuild can append and compact while holding it.
+class LogLock:
+    # Class attributes
+    _locks = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path):
+        # Protected instance attributes
+        self._path = path + '.lock'
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    # A forked child shares the parent's open lock files, and flock would
+    # treat the two as one holder; give the child its own
+    @classmethod
+    def _after_fork(cls):
+        cls._guard = threading.Lock()
+        for lock in cls._locks.values():
+            if lock._file is not None:
+                lock._file.close()
+            lock._file = None
+            lock._lock = threading.RLock()
+            lock._depth = 0
+
+    # The lock of the log at path
+    @classmethod
+    def of(cls, path):
+        with cls._guard:
+            lock = cls._locks.get(path)
+            if lock is None:
+                lock = cls._locks[path] = cls(path)
+            return lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1 and fcntl is not None:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                    self._file = open(self._path, 'a')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                self._depth -= 1
+                self._lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._lock.release()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=LogLock._after_fork)
+
+class PersistentIndex(ABC):
+    # Compact the log once it holds this many more records than live entries
+    COMPACT_SLACK = 1000
+
+    # The log is index_dir/name.jsonl
+    def __init__(self, name, index_dir):
+        # Protected instance attributes
+        self._index_dir = index_dir
+        self._path = os.path.join(index_dir, f"{name}.jsonl")
+        self._lock = LogLock.of(os.path.abspath(self._path))
+        self._entries = None
+        self._offset = 0
+        self._records = 0
+        self._log = None  # the log file replayed so far, and its inode
+        self._inode = None
+        self._external = 0  # bumped whenever records another writer logged are replayed
+
+    # Fresh container for the in-memory entries
+    def _empty(self):
+        return {}
+
+    # Number of live entries, used to decide when to compact
+    def _size(self):
+        return len(self._entries)
+
+    # Apply one log record to the in-memory entries
+    @abstractmethod
+    def _apply(self, record):
+        pass
+
+    # Records that recreate the current entries, used when compacting
+    @abstractmethod
+    def _snapshot_records(self):
+        pass
+
+    # Rebuild the whole log from the data the index is derived from
+    @abstractmethod
+    def rebuild(self):
+        pass
+
+    # Replay any log records written since the last refresh.
+    # Returns False when the index has never been built.
+    def _refresh(self):
+        # Nothing was appended and the log was not replaced: no need to lock
+        if self._entries is not None:
+            try:
+                stat = os.stat(self._path)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and stat.st_ino == self._inode and stat.st_size == self._offset:
+                return True
+        with self._lock:
+            return self._replay()
+
+    # own: the records being replayed were just written by this object
+    def _replay(self, own=False):
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            self._entries = None
+            return False
+
+        # The log was rewritten (rebuild/compaction), replay from the start.
+        # The log being replayed is held open, so its inode cannot be reused
+        # by a later rewrite and mistaken for it.
+        if self._entries is None or stat.st_ino != self._inode or stat.st_size < self._offset:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            try:
+                self._log = open(self._path, 'rb')
+            except FileNotFoundError:
+                self._entries = None
+                return False
+            self._inode = os.fstat(self._log.fileno()).st_ino
+            self._entries = self._empty()
+            self._offset = 0
+            self._records = 0
+            if not own:
+                self._external += 1
+
+        offset = self._offset
+        self._log.seek(self._offset)
+        for line in self._log:
+            # Stop at a partially written trailing record
+            if not line.endswith(b'\n'):
+                break
+            self._offset += len(line)
+            if line.strip():
+                self._apply(json.loads(line))
+                self._records += 1
+        if self._offset != offset and not own:
+            self._external += 1
+        return True
+
+    # Append records to the log and fold them into the in-memory entries.
+    # Compaction happens under the same lock, so no append can land in the
+    # log it replaces.
+    def _append(self, records):
+        with self._lock:
+            self._replay()
+            os.makedirs(self._index_dir, exist_ok=True)
+            with open(self._path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+            self._replay(own=True)
+
+            if self._records > self._size() * 2 + self.COMPACT_SLACK:
+                self._rewrite(self._snapshot_records())
+
+    # Replace the whole log with the given records
+    def _rewrite(self, records):
+        with self._lock:
+            os.makedirs(self._index_dir, exist_ok=True)
+            atomic_write_text(self._path, ''.join(json.dumps(record) + '\n' for record in records), grouped=False)
+            self._entries = None
+            self._replay(own=True)
+
+# An index derived from repository records. It is built from every record
+# of its SOURCES kinds, read through the repository that owns it, so it
+# follows the repository's data root and backend.
+class RecordIndex(PersistentIndex):
+    # Kinds of record the index is built from
+    SOURCES = ()
+
+    def __init__(self, name, repo):
+        super().__init__(name, repo.INDEX_DIR)
+        # Protected instance attributes
+        self._repo = repo
+
+    # Log records that put one stored record into the index
+    @abstractmethod
+    def _records_of(self, kind, key, data):
+        pass
+
+    # Load the index, building it from the records on first use
+    def _ensure(self):
+        if not self._refresh():
+            self.rebuild()
+
+    # Holds the log lock throughout, so an append made while the records are
+    # read is not overwritten by the rebuilt log
+    def rebuild(self):
+        with self._lock:
+            records = []
+            for kind in self.SOURCES:
+                for key, data in self._repo.load_all(kind):
+                    try:
+                        records.extend(self._records_of(kind, key, data))
+                    except Exception as e:
+                        print(f"Error processing {kind} {key}: {e}")
+                        continue
+            self._rewrite(records)
+
+class CredentialIndex(RecordIndex):
+    # Directory / Class attributes
+    SOURCES = ('student', 'instructor', 'admin')
+
+    def __init__(self, repo):
+        super().__init__('credentials', repo)
+
+    @staticmethod
+    def hash_password(user_id, password):
+        return hashlib.sha256(f"{user_id}:{password}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def verify(entry, password):
+        return entry['password_hash'] == CredentialIndex.hash_password(entry['user_id'], password)
+
+    def _apply(self, record):
+        if record['op'] == 'put':
+            self._entries[record['username']] = record['entry']
+        elif record['op'] == 'del':
+            self._entries.pop(record['username'], None)
+
+    def _snapshot_records(self):
+        return [{'op': 'put', 'username': username, 'entry': entry}
+                for username, entry in self._entries.items()]
+
+    # Username -> {user_id, user_type, password_hash}, or None
+    def lookup(self, username):
+        self._ensure()
+        return self._entries.get(username)
+
+    # Keep the index in step with a profile that was just saved
+    def record(self, user_data, user_type):
+        self._ensure()
+        entry = {
+            'user_id': user_data['user_id'],
+            'user_type': user_type,
+            'password_hash': CredentialIndex.hash_password(user_data['user_id'], user_data['password'])
+        }
+        if self._entries.get(user_data['username']) != entry:
+            self._append([{'op': 'put', 'username': user_data['username'], 'entry': entry}])
+
+    # Drop a username whose profile was deleted
+    def forget(self, username):
+        self._ensure()
+        if username in self._entries:
+            self._append([{'op': 'del', 'username': username}])
+
+    def _records_of(self, kind, key, data):
+        return [{'op': 'put', 'username': data['username'], 'entry': {
+            'user_id': data['user_id'],
+            'user_type': kind,
+            'password_hash': CredentialIndex.hash_password(data['user_id'], data['password'])
+        }}]
+
+class DirectoryManifest(PersistentIndex):
+    def __init__(self, directory, kinds, index_dir):
+        super().__init__(f"manifest_{os.path.basename(os.path.normpath(directory))}", index_dir)
+        # Protected instance attributes
+        self._directory = directory
+        self._kinds = kinds  # kind -> file suffix
+        self._stamp = None
+
+    # Also forgets the directory stamp; it is replayed from the log
+    def _empty(self):
+        self._stamp = None
+        return {kind: set() for kind in self._kinds}
+
+    def _size(self):
+        return sum(len(keys) for keys in self._entries.values())
+
+    def _apply(self, record):
+        if record['op'] == 'add':
+            self._entries[record['kind']].add(record['key'])
+        elif record['op'] == 'remove':
+            self._entries[record['kind']].discard(record['key'])
+        elif record['op'] == 'stamp':
+            self._stamp = record['mtime']
+
+    def _snapshot_records(self):
+        records = [{'op': 'add', 'kind': kind, 'key': key}
+                   for kind, keys in self._entries.items() for key in sorted(keys)]
+        records.append({'op': 'stamp', 'mtime': self._stamp})
+        return records
+
+    def _directory_mtime(self):
+        try:
+            return os.stat(self._directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    # Load the manifest, rebuilding it if the directory was changed by
+    # anything that did not also update the manifest. The temp files of this
+    # thread's open transaction move the mtime too; the check waits for the
+    # commit, which records them.
+    def _ensure(self):
+        if not self._refresh():
+            self.rebuild()
+        elif self._stamp != self._directory_mtime() and not has_staged_writes(self._directory):
+            self._external += 1
+            self.rebuild()
+
+    # The set of keys of one kind; treat as read-only
+    def keys(self, kind):
+        self._ensure()
+        return self._entries[kind]
+
+    # Changes whenever a record in the directory is written or removed
+    def version(self):
+        self._ensure()
+        return self._stamp
+
+    # Changes whenever a record in the directory is written or removed by
+    # anything but this manifest's own record() calls
+    def external_version(self):
+        self._ensure()
+        return self._external
+
+    # Record keys that were created or deleted, as (kind, key, present)
+    # with the last change to a key winning, then stamp the directory.
+    # Called after the file changes are on disk.
+    def record(self, changes):
+        with self._lock:
+            if not self._replay():
+                self.rebuild()
+                return
+
+            records = []
+            for (kind, key), present in {(kind, key): present for kind, key, present in changes}.items():
+                if present and key not in self._entries[kind]:
+                    records.append({'op': 'add', 'kind': kind, 'key': key})
+                elif not present and key in self._entries[kind]:
+                    records.append({'op': 'remove', 'kind': kind, 'key': key})
+
+            # Stamped even when the mtime looks unchanged, so every change
+            # reaches the log and shows in other writers' external_version()
+            if changes:
+                records.append({'op': 'stamp', 'mtime': self._directory_mtime()})
+                self._append(records)
+
+    # Keys the manifest and the directory disagree on:
+    # (kind, key, 'missing from manifest' | 'missing from directory').
+    # A manifest that was never built is built here instead.
+    def differences(self):
+        if not self._refresh():
+            self.rebuild()
+            return []
+        actual = self._scan()
+        recorded = self._entries
+        differences = []
+        for kind in self._kinds:
+            differences += [(kind, key, 'missing from manifest') for key in sorted(actual[kind] - recorded[kind])]
+            differences += [(kind, key, 'missing from directory') for key in sorted(recorded[kind] - actual[kind])]
+        return differences
+
+    def _scan(self):
+        found = {kind: set() for kind in self._kinds}
+        if os.path.exists(self._directory):
+            for filename in os.listdir(self._directory):
+                for kind, suffix in self._kinds.items():
+                    if filename.endswith(suffix):
+                        found[kind].add(filename[:-len(suffix)])
+        return found
+
+    # Rebuild the manifest from a directory listing
+    def rebuild(self):
+        with self._lock:
+            mtime = self._directory_mtime()
+            records = [{'op': 'add', 'kind': kind, 'key': key}
+                       for kind, keys in self._scan().items() for key in sorted(keys)]
+            records.append({'op': 'stamp', 'mtime': mtime})
+            self._rewrite(records)
+
+class CohortIndex(RecordIndex):
+    # Directory / Class attributes
+    SOURCES = ('student',)
+
+    # Student profile fields the index covers
+    FIELDS = ('major', 'year_level', 'semester', 'academic_year')
+
+    def __init__(self, repo):
+        super().__init__('cohorts', repo)
+        # Protected instance attributes
+        # field -> lowercased value -> user_ids
+        self._by_value = {}
+
+    # Values are kept lowercased, matching the case-insensitive filter
+    @staticmethod
+    def cohort_of(student_data):
+        return {field: str(student_data.get(field, '')).lower() for field in CohortIndex.FIELDS}
+
+    # user_id -> cohort; also resets the by-value maps
+    def _empty(self):
+        self._by_value = {field: {} for field in self.FIELDS}
+        return {}
+
+    def _apply(self, record):
+        user_id = record['user_id']
+        old = self._entries.pop(user_id, None)
+        if old:
+            for field, value in old.items():
+                ids = self._by_value[field].get(value)
+                if ids:
+                    ids.discard(user_id)
+                    if not ids:
+                        del self._by_value[field][value]
+
+        if record['op'] == 'put':
+            self._entries[user_id] = record['cohort']
+            for field, value in record['cohort'].items():
+                self._by_value[field].setdefault(value, set()).add(user_id)
+
+    def _snapshot_records(self):
+        return [{'op': 'put', 'user_id': user_id, 'cohort': cohort}
+                for user_id, cohort in self._entries.items()]
+
+    # user_ids whose cohort matches every criterion, ignoring case
+    def lookup(self, **criteria):
+        self._ensure()
+        if not criteria:
+            return set(self._entries)
+
+        matches = []
+        for field, value in criteria.items():
+            if field not in self.FIELDS:
+                raise ValueError(f"Unknown cohort field: {field}")
+            matches.append(self._by_value[field].get(str(value).lower(), set()))
+
+        # Intersect starting from the smallest set
+        matches.sort(key=len)
+        result = set(matches[0])
+        for ids in matches[1:]:
+            result &= ids
+        return result
+
+    # Keep the index in step with a student profile that was just saved
+    def record(self, student_data):
+        self._ensure()
+        cohort = CohortIndex.cohort_of(student_data)
+        if self._entries.get(student_data['user_id']) != cohort:
+            self._append([{'op': 'put', 'user_id': student_data['user_id'], 'cohort': cohort}])
+
+    # Drop a student whose profile was deleted
+    def forget(self, user_id):
+        self._ensure()
+        if user_id in self._entries:
+            self._append([{'op': 'del', 'user_id': user_id}])
+
+    def _records_of(self, kind, key, data):
+        return [{'op': 'put', 'user_id': data['user_id'], 'cohort': CohortIndex.cohort_of(data)}]
+
+class RosterIndex(RecordIndex):
+    # Directory / Class attributes
+    SOURCES = ('student',)
+
+    def __init__(self, repo):
+        super().__init__('rosters', repo)
+        # Protected instance attributes
+        # course_code -> student user_ids
+        self._by_course = {}
+
+    @staticmethod
+    def courses_of(student_data):
+        return sorted({course['course_code'] for course in student_data.get('courses', []) if 'course_code' in course})
+
+    # user_id -> course codes; also resets the by-course map
+    def _empty(self):
+        self._by_course = {}
+        return {}
+
+    def _apply(self, record):
+        user_id = record['user_id']
+        for course_code in self._entries.pop(user_id, []):
+            ids = self._by_course.get(course_code)
+            if ids:
+                ids.discard(user_id)
+                if not ids:
+                    del self._by_course[course_code]
+
+        if record['op'] == 'put' and record['courses']:
+            self._entries[user_id] = record['courses']
+            for course_code in record['courses']:
+                self._by_course.setdefault(course_code, set()).add(user_id)
+
+    def _snapshot_records(self):
+        return [{'op': 'put', 'user_id': user_id, 'courses': courses}
+                for user_id, courses in self._entries.items()]
+
+    # user_ids of the students whose profile lists the course
+    def lookup(self, course_code):
+        self._ensure()
+        return set(self._by_course.get(course_code, ()))
+
+    # Course code -> user_ids for every course with at least one student
+    def rosters(self):
+        self._ensure()
+        return {course_code: set(ids) for course_code, ids in self._by_course.items()}
+
+    # Keep the index in step with a student profile that was just saved
+    def record(self, student_data):
+        self._ensure()
+        courses = RosterIndex.courses_of(student_data)
+        if self._entries.get(student_data['user_id'], []) != courses:
+            self._append([{'op': 'put', 'user_id': student_data['user_id'], 'courses': courses}])
+
+    # Drop a student whose profile was deleted
+    def forget(self, user_id):
+        self._ensure()
+        if user_id in self._entries:
+            self._append([{'op': 'del', 'user_id': user_id}])
+
+    def _records_of(self, kind, key, data):
+        courses = RosterIndex.courses_of(data)
+        return [{'op': 'put', 'user_id': data['user_id'], 'courses': courses}] if courses else []
+
+class InboxIndex(RecordIndex):
+    # Directory / Class attributes
+    SOURCES = ('assigned',)
+
+    def __init__(self, repo):
+        super().__init__('inboxes', repo)
+        # Protected instance attributes
+        # student_id -> assignment codes, course_code -> assignment codes
+        self._by_student = {}
+        self._by_course = {}
+
+    # What a student's inbox shows for one assigned assignment
+    @staticmethod
+    def entry_of(assigned_data):
+        details = assigned_data.get('assignment_details', {})
+        entry = {
+            'assignment_code': assigned_data.get('assignment_code'),
+            'course_code': assigned_data.get('course_code', 'N/A'),
+        }
+        for field in ('assignment_name', 'details', 'points', 'deadline_date', 'deadline_time', 'deadline_epoch'):
+            if field in details:
+                entry[field] = details[field]
+        return entry
+
+    @staticmethod
+    def students_of(assigned_data):
+        return sorted({student['student_id'] for student in assigned_data.get('assigned_students', [])})
+
+    # assignment_code -> {'entry': inbox entry, 'students': [student_id]};
+    # also resets the by-student and by-course maps
+    def _empty(self):
+        self._by_student = {}
+        self._by_course = {}
+        return {}
+
+    def _apply(self, record):
+        assignment_code = record['assignment_code']
+        old = self._entries.pop(assignment_code, None)
+        if old:
+            for student_id in old['students']:
+                codes = self._by_student.get(student_id)
+                if codes:
+                    codes.discard(assignment_code)
+                    if not codes:
+                        del self._by_student[student_id]
+            codes = self._by_course.get(old['entry']['course_code'])
+            if codes:
+                codes.discard(assignment_code)
+                if not codes:
+                    del self._by_course[old['entry']['course_code']]
+
+        if record['op'] == 'put':
+            self._entries[assignment_code] = {'entry': record['entry'], 'students': record['students']}
+            for student_id in record['students']:
+                self._by_student.setdefault(student_id, set()).add(assignment_code)
+            self._by_course.setdefault(record['entry']['course_code'], set()).add(assignment_code)
+
+    def _snapshot_records(self):
+        return [{'op': 'put', 'assignment_code': code, 'entry': value['entry'], 'students': value['students']}
+                for code, value in self._entries.items()]
+
+    # Inbox entries of one student, ordered by assignment code
+    def lookup(self, student_id):
+        self._ensure()
+        return [dict(self._entries[code]['entry']) for code in sorted(self._by_student.get(student_id, ()))]
+
+    # Sorted codes of the assignments given out in a course
+    def assignments_of(self, course_code):
+        self._ensure()
+        return sorted(self._by_course.get(course_code, ()))
+
+    # Sorted student_ids an assignment was given to
+    def students_of_assignment(self, assignment_code):
+        self._ensure()
+        value = self._entries.get(assignment_code)
+        return list(value['students']) if value else []
+
+    # assignment_code -> inbox entry of every assignment given out; treat as
+    # read-only
+    def entries(self):
+        self._ensure()
+        return {code: value['entry'] for code, value in self._entries.items()}
+
+    # Keep the index in step with an assignment that was just assigned
+    def record(self, assigned_data):
+        self._ensure()
+        value = {'entry': InboxIndex.entry_of(assigned_data), 'students': InboxIndex.students_of(assigned_data)}
+        if self._entries.get(assigned_data['assignment_code']) != value:
+            self._append([{'op': 'put', 'assignment_code': assigned_data['assignment_code'], **value}])
+
+    # Drop an assignment whose tracking record was deleted
+    def forget(self, assignment_code):
+        self._ensure()
+        if assignment_code in self._entries:
+            self._append([{'op': 'del', 'assignment_code': assignment_code}])
+
+    def _records_of(self, kind, key, data):
+        return [{'op': 'put', 'assignment_code': data['assignment_code'],
+                 'entry': InboxIndex.entry_of(data), 'students': InboxIndex.students_of(data)}]
+
+class TeachingIndex(RecordIndex):
+    # Directory / Class attributes
+    SOURCES = ('instructor',)
+
+    def __init__(self, repo):
+        super().__init__('teaching', repo)
+        # Protected instance attributes
+        # day -> (start, end, user_id) sorted, and the longest slot of the day
+        self._by_day = {}
+        self._longest = {}
+        # course_code -> user_ids
+        self._by_course = {}
+
+    # [day, start minute, end minute, course_code] for every assigned course
+    # with a readable schedule. Profiles list course references, so the
+    # times come from course_of(course_code), which returns the course record
+    # or None; entries that still carry their own times are read directly.
+    @staticmethod
+    def slots_of(instructor_data, course_of=None):
+        slots = []
+        for entry in instructor_data.get('assigned_courses', []):
+            course = entry if 'start_time' in entry or course_of is None else course_of(entry.get('course_code'))
+            if course is None:
+                continue
+            try:
+                start_hours, start_minutes = map(int, course['start_time'].split(':'))
+                end_hours, end_minutes = map(int, course['end_time'].split(':'))
+            except (KeyError, ValueError, AttributeError):
+                continue
+            slots.append([course.get('day'), start_hours * 60 + start_minutes, end_hours * 60 + end_minutes,
+                          entry.get('course_code')])
+        return sorted(slots, key=lambda slot: (str(slot[0]), slot[1], slot[2]))
+
+    # user_id -> slots, for every instructor; also resets the by-day lists
+    # and the by-course map
+    def _empty(self):
+        self._by_day = {}
+        self._longest = {}
+        self._by_course = {}
+        return {}
+
+    def _apply(self, record):
+        user_id = record['user_id']
+        for day, start, end, course_code in self._entries.pop(user_id, []):
+            slots = self._by_day[day]
+            del slots[bisect_left(slots, (start, end, user_id))]
+            ids = self._by_course.get(course_code)
+            if ids:
+                ids.discard(user_id)
+                if not ids:
+                    del self._by_course[course_code]
+
+        if record['op'] == 'put':
+            self._entries[user_id] = record['slots']
+            for day, start, end, course_code in record['slots']:
+                insort(self._by_day.setdefault(day, []), (start, end, user_id))
+                self._longest[day] = max(self._longest.get(day, 0), end - start)
+                self._by_course.setdefault(course_code, set()).add(user_id)
+
+    def _snapshot_records(self):
+        return [{'op': 'put', 'user_id': user_id, 'slots': slots} for user_id, slots in self._entries.items()]
+
+    # user_ids of the instructors teaching at any time in [start, end) on the day
+    def busy(self, day, start, end):
+        self._ensure()
+        slots = self._by_day.get(day, [])
+        low = bisect_left(slots, (start - self._longest.get(day, 0) + 1,))
+        high = bisect_left(slots, (end,))
+        return {user_id for slot_start, slot_end, user_id in slots[low:high] if slot_end > start}
+
+    # Sorted user_ids of the instructors with nothing assigned in [start, end) on the day
+    def free(self, day, start, end):
+        self._ensure()
+        return sorted(self._entries.keys() - self.busy(day, start, end))
+
+    # Sorted user_ids of the instructors a course is assigned to
+    def instructors_of(self, course_code):
+        self._ensure()
+        return sorted(self._by_course.get(course_code, ()))
+
+    # Keep the index in step with an instructor profile that was just saved
+    def record(self, instructor_data, course_of=None):
+        self._ensure()
+        slots = TeachingIndex.slots_of(instructor_data, course_of)
+        if self._entries.get(instructor_data['user_id']) != slots:
+            self._append([{'op': 'put', 'user_id': instructor_data['user_id'], 'slots': slots}])
+
+    # Drop an instructor whose profile was deleted
+    def forget(self, user_id):
+        self._ensure()
+        if user_id in self._entries:
+            self._append([{'op': 'del', 'user_id': user_id}])
+
+    # Times come from the course records the profile refers to
+    def _records_of(self, kind, key, data):
+        return [{'op': 'put', 'user_id': data['user_id'], 'slots': TeachingIndex.slots_of(data, self._course_or_none)}]
+
+    def _course_or_none(self, course_code):
+        return self._repo.load('course', course_code) if self._repo.exists('course', course_code) else None
+
+class RoomUseIndex(RecordIndex):
+    # Directory / Class attributes
+    SOURCES = ('course',)
+
+    def __init__(self, repo):
+        super().__init__('room_use', repo)
+        # Protected instance attributes
+        # room key -> course codes
+        self._by_room = {}
+
+    # Key of the room record a course is scheduled in
+    @staticmethod
+    def room_of(course_data):
+        return f"{course_data.get('assigned_college_room')}_{course_data.get('room_number')}"
+
+    # course_code -> room key; also resets the by-room map
+    def _empty(self):
+        self._by_room = {}
+        return {}
+
+    def _apply(self, record):
+        course_code = record['course_code']
+        old = self._entries.pop(course_code, None)
+        if old is not None:
+            codes = self._by_room.get(old)
+            if codes:
+                codes.discard(course_code)
+                if not codes:
+                    del self._by_room[old]
+
+        if record['op'] == 'put':
+            self._entries[course_code] = record['room']
+            self._by_room.setdefault(record['room'], set()).add(course_code)
+
+    def _snapshot_records(self):
+        return [{'op': 'put', 'course_code': course_code, 'room': room} for course_code, room in self._entries.items()]
+
+    # Sorted codes of the courses scheduled in a room
+    def lookup(self, room_key):
+        self._ensure()
+        return sorted(self._by_room.get(room_key, ()))
+
+    # Keep the index in step with a course that was just saved
+    def record(self, course_data):
+        self._ensure()
+        room = RoomUseIndex.room_of(course_data)
+        if self._entries.get(course_data['course_code']) != room:
+            self._append([{'op': 'put', 'course_code': course_data['course_code'], 'room': room}])
+
+    # Drop a course that was deleted
+    def forget(self, course_code):
+        self._ensure()
+        if course_code in self._entries:
+            self._append([{'op': 'del', 'course_code': course_code}])
+
+    def _records_of(self, kind, key, data):
+        return [{'op': 'put', 'course_code': data['course_code'], 'room': RoomUseIndex.room_of(data)}]
+
+class SubmissionIndex(RecordIndex):
+    # Directory / Class attributes
+    SOURCES = ('submission',)
+
+    def __init__(self, repo):
+        super().__init__('submissions', repo)
+        # Protected instance attributes
+        # assignment_code -> {student_id: submission key}, student_id -> {assignment_code: submission key}
+        self._by_assignment = {}
+        self._by_student = {}
+        self._outdated = False  # the log holds records without status and graded
+
+    # What the index keeps of a submission
+    @staticmethod
+    def entry_of(submission_data):
+        return [submission_data.get('assignment_code'), submission_data.get('student_id'),
+                submission_data.get('status'), 'score' in submission_data]
+
+    # submission key -> [assignment_code, student_id, status, graded]; also
+    # resets the by-assignment and by-student maps
+    def _empty(self):
+        self._by_assignment = {}
+        self._by_student = {}
+        self._outdated = False
+        return {}
+
+    def _apply(self, record):
+        key = record['key']
+        old = self._entries.pop(key, None)
+        if old is not None:
+            assignment_code, student_id = old[:2]
+            for outer, inner, by in ((assignment_code, student_id, self._by_assignment),
+                                     (student_id, assignment_code, self._by_student)):
+                keys = by.get(outer)
+                if keys and keys.get(inner) == key:
+                    del keys[inner]
+                    if not keys:
+                        del by[outer]
+
+        if record['op'] == 'put':
+            assignment_code, student_id = record['assignment_code'], record['student_id']
+            if 'graded' not in record:
+                self._outdated = True
+            self._entries[key] = [assignment_code, student_id, record.get('status'), record.get('graded', False)]
+            self._by_assignment.setdefault(assignment_code, {})[student_id] = key
+            self._by_student.setdefault(student_id, {})[assignment_code] = key
+
+    def _snapshot_records(self):
+        return [SubmissionIndex._put(key, entry) for key, entry in self._entries.items()]
+
+    @staticmethod
+    def _put(key, entry):
+        return {'op': 'put', 'key': key, 'assignment_code': entry[0], 'student_id': entry[1],
+                'status': entry[2], 'graded': entry[3]}
+
+    # Load the index, building it from the submission records on first use
+    # or when it was written before it kept status and grading
+    def _ensure(self):
+        if not self._refresh() or self._outdated:
+            self.rebuild()
+
+    # student_id -> submission key for one assignment
+    def of_assignment(self, assignment_code):
+        self._ensure()
+        return dict(self._by_assignment.get(assignment_code, {}))
+
+    # assignment_code -> submission key for one student
+    def of_student(self, student_id):
+        self._ensure()
+        return dict(self._by_student.get(student_id, {}))
+
+    # student_id -> (status, graded) for everyone who submitted an assignment
+    def states_of(self, assignment_code):
+        self._ensure()
+        return {student_id: tuple(self._entries[key][2:])
+                for student_id, key in self._by_assignment.get(assignment_code, {}).items()}
+
+    # Keep the index in step with submissions that were just saved or
+    # deleted, given as (key, entry_of the submission or None if deleted)
+    def update(self, changes):
+        self._ensure()
+        records = []
+        for key, entry in changes:
+            if entry is None:
+                if key in self._entries:
+                    records.append({'op': 'del', 'key': key})
+                continue
+            if self._entries.get(key) != entry:
+                records.append(SubmissionIndex._put(key, entry))
+        if records:
+            self._append(records)
+
+    def _records_of(self, kind, key, data):
+        return [SubmissionIndex._put(key, SubmissionIndex.entry_of(data))]
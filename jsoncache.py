@@ -0,0 +1,108 @@
+import json
+import marshal
+import os
+import threading
+from collections import OrderedDict
+
+class JsonCache:
+    # Default memory budget for cached records
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    # Process-wide instance shared by every JSON repository
+    _shared = None
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        # Protected instance attributes
+        # path -> (signature, marshalled record), least recently used first
+        self._entries = OrderedDict()
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters for sizing the budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def configure(cls, max_bytes):
+        cls._shared = cls(max_bytes)
+        return cls._shared
+
+    # (mtime, size, inode) identifies one version of a file. Atomic writes
+    # rename a new inode into place, so those are always seen as changes.
+    @staticmethod
+    def _signature(stat):
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    # Parsed contents of a JSON file. Every call returns a fresh object, so
+    # callers may modify what they get back.
+    def load(self, path):
+        stat = os.stat(path)
+        signature = JsonCache._signature(stat)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return marshal.loads(entry[1])
+            self.misses += 1
+
+        with open(path, 'r') as f:
+            data = json.load(f)
+        self._store(path, signature, data)
+        return data
+
+    def _store(self, path, signature, data):
+        try:
+            blob = marshal.dumps(data)
+        except ValueError:
+            return
+
+        with self._lock:
+            self._discard(path)
+            if len(blob) > self._max_bytes:
+                return
+
+            # Evict least recently used records until the new one fits
+            while self._bytes + len(blob) > self._max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+            self._entries[path] = (signature, blob)
+            self._bytes += len(blob)
+
+    def _discard(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def invalidate(self, path):
+        with self._lock:
+            self._discard(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self._max_bytes,
+            }
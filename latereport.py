@@ -0,0 +1,78 @@
+import numpy as np
+from deadlines import Deadlines
+
+# Late and on-time classification in bulk.
+#
+# The submissions of one assignment or a whole course are laid out as
+# parallel arrays of submission epochs, deadline epochs and assignment rows,
+# and every submission is classified by one array comparison. The report's
+# figures are then counts over those arrays per assignment row.
+
+class LateReport:
+
+    def __init__(self, assignments, submissions, rows, submitted, deadlines, known):
+        # Protected instance attributes
+        self._assignments = assignments  # assignment codes, one per row
+        self._submissions = submissions  # submission records, one per array entry
+        self._rows = rows                # int assignment row per submission
+        self._submitted = submitted      # int64 submission epochs
+        self._deadlines = deadlines      # int64 deadline epochs
+        self._known = known              # bool, both epochs present
+
+    # Lay out the submissions of the given assignments
+    @classmethod
+    def build(cls, repo, assignment_codes):
+        assignments = list(assignment_codes)
+        submissions, rows, submitted, deadlines, known = [], [], [], [], []
+        for row, assignment_code in enumerate(assignments):
+            for submission_data in repo.assignment_submissions(assignment_code):
+                try:
+                    submission_epoch = Deadlines.submitted_of(submission_data)
+                    deadline_epoch = Deadlines.deadline_of(submission_data)
+                except ValueError as e:
+                    print(f"Error processing submission of {submission_data.get('student_id')} "
+                          f"for {assignment_code}: {e}")
+                    submission_epoch = deadline_epoch = None
+                submissions.append(submission_data)
+                rows.append(row)
+                submitted.append(submission_epoch or 0)
+                deadlines.append(deadline_epoch or 0)
+                known.append(submission_epoch is not None and deadline_epoch is not None)
+
+        return cls(assignments, submissions, np.array(rows, dtype=np.int64), np.array(submitted, dtype=np.int64),
+                   np.array(deadlines, dtype=np.int64), np.array(known, dtype=bool))
+
+    @classmethod
+    def of_assignment(cls, repo, assignment_code):
+        return cls.build(repo, [assignment_code])
+
+    @classmethod
+    def of_course(cls, repo, course_code):
+        return cls.build(repo, repo.course_assignment_codes(course_code))
+
+    def submission_count(self):
+        return len(self._submissions)
+
+    # Bool per submission: submitted in a minute after its deadline minute
+    def late(self):
+        return self._known & (self._submitted > self._deadlines)
+
+    # Bool per submission: the stored status differs from its classification
+    def disagreeing(self):
+        stored = np.array([submission_data.get('status') or '' for submission_data in self._submissions], dtype=str)
+        classified = np.where(self.late(), "Late", "On Time")
+        return self._known & (stored != classified)
+
+    # (assignment_code, submissions, on time, late, unknown, stored status
+    # disagreeing) per assignment
+    def by_assignment(self):
+        late = self.late()
+        masks = (np.ones(len(self._submissions), dtype=bool), self._known & ~late, late, ~self._known,
+                 self.disagreeing())
+        counts = [np.bincount(self._rows[mask], minlength=len(self._assignments)) for mask in masks]
+        return [(assignment_code, *(int(column[row]) for column in counts))
+                for row, assignment_code in enumerate(self._assignments)]
+
+    # Submission records whose stored status differs from their classification
+    def disagreements(self):
+        return [self._submissions[i] for i in np.flatnonzero(self.disagreeing())]
@@ -2,7 +2,10 @@ import uuid
 from tabulate import tabulate
 from abc import ABC, abstractmethod
 import os
-import json
+from storage import RecordNotFound, Storage
+from snapshot import Snapshot
+from references import References
+from roomschedule import to_minutes
 
 class Person(ABC):
     
@@ -234,19 +237,15 @@ class PlatformAdmin(Person):
 
     @staticmethod
     def get_total_students():
-        student_files = [f for f in os.listdir(PlatformAdmin.USERS_DIR) if f.endswith('_student_profile.json')]
-        return len(student_files)
+        return Storage.repo().count('student')
 
     @staticmethod
     def get_total_instructors():
-        instructor_files = [f for f in os.listdir(PlatformAdmin.USERS_DIR) if f.endswith('_instructor_profile.json')]
-        return len(instructor_files)
+        return Storage.repo().count('instructor')
     
     @staticmethod
     def get_total_admins():
-        # Count admin files with the pattern 'admin_id_admin_profile.json'
-        admin_files = [f for f in os.listdir(PlatformAdmin.USERS_DIR) if f.endswith('_admin_profile.json')]
-        return len(admin_files)
+        return Storage.repo().count('admin')
 
     def show_students(self):
         while True:
@@ -264,35 +263,22 @@ class PlatformAdmin(Person):
                 semester = input("Enter Semester: ").strip()
                 academic_year = input("Enter Academic Year: ").strip()
                 
-                # Collect students based on filter
+                # Collect students based on filter (case-insensitive)
                 students_data = []
                 
-                student_files = [f for f in os.listdir('data/users') if f.endswith('_student_profile.json')]
+                matching_students = Storage.repo().find_students(
+                    ignore_case=True, major=major, year_level=year_level,
+                    semester=semester, academic_year=academic_year)
                 
-                for student_file in student_files:
-                    try:
-                        with open(os.path.join('data/users', student_file), 'r') as f:
-                            student_profile = json.load(f)
-                        
-                        # Case-insensitive comparison directly from root of student_profile
-                        if (student_profile['major'].lower() == major.lower() and
-                            student_profile['year_level'].lower() == year_level.lower() and
-                            student_profile['semester'].lower() == semester.lower() and
-                            student_profile['academic_year'].lower() == academic_year.lower()):
-                            
-                            
-                            students_data.append([
-                                student_profile['user_id'],
-                                student_profile['username'],
-                                student_profile['major'],
-                                student_profile['year_level'],
-                                student_profile['semester'],
-                                student_profile['academic_year']
-                            ])
-                    
-                    except Exception as e:
-                        print(f"Error processing {student_file}: {e}")
-                        continue
+                for student_profile in matching_students:
+                    students_data.append([
+                        student_profile['user_id'],
+                        student_profile['username'],
+                        student_profile['major'],
+                        student_profile['year_level'],
+                        student_profile['semester'],
+                        student_profile['academic_year']
+                    ])
                 
                 # Display students using tabulate
                 if students_data:
@@ -307,13 +293,8 @@ class PlatformAdmin(Person):
                 # Show all students
                 students_data = []
                 
-                student_files = [f for f in os.listdir('data/users') if f.endswith('_student_profile.json')]
-                
-                for student_file in student_files:
+                for student_id, student_profile in Snapshot.reader().load_all('student'):
                     try:
-                        with open(os.path.join('data/users', student_file), 'r') as f:
-                            student_profile = json.load(f)
-                        
                         students_data.append([
                             student_profile['user_id'],
                             student_profile['username'],
@@ -324,7 +305,7 @@ class PlatformAdmin(Person):
                         ])
                     
                     except Exception as e:
-                        print(f"Error processing {student_file}: {e}")
+                        print(f"Error processing student {student_id}: {e}")
                         continue
                 
                 # Display students using tabulate
@@ -347,18 +328,14 @@ class PlatformAdmin(Person):
     def show_instructors(self):
         while True:
             instructors_data = []
-            instructor_files = [f for f in os.listdir('data/users') if f.endswith('_instructor_profile.json')]
             
-            for instructor_file in instructor_files:
+            for instructor_id, instructor_profile in Snapshot.reader().load_all('instructor'):
                 try:
-                    with open(os.path.join('data/users', instructor_file), 'r') as f:
-                        instructor_profile = json.load(f)
-                    
                     # Extract assigned courses information
-                    assigned_courses = instructor_profile.get('assigned_courses', [])
+                    assigned_courses = References.courses(instructor_profile.get('assigned_courses', []))
                     if assigned_courses:
                         # Create a formatted string with course codes and names
-                        course_list = ', '.join(f"{course['course_code']} ({course['course_name']})" for course in assigned_courses)
+                        course_list = ', '.join(f"{course['course_code']} ({course.get('course_name', 'N/A')})" for course in assigned_courses)
                     else:
                         course_list = 'No assigned courses'
 
@@ -371,7 +348,7 @@ class PlatformAdmin(Person):
                     ])
                 
                 except Exception as e:
-                    print(f"Error processing {instructor_file}: {e}")
+                    print(f"Error processing instructor {instructor_id}: {e}")
                     continue
             
             # Display instructors using tabulate
@@ -388,6 +365,44 @@ class PlatformAdmin(Person):
                 print("No instructors found.")
             
         
+    # Instructors with no assigned course during a given day and time
+    def show_free_instructors(self):
+        day = input("Enter Day (e.g., Monday): ").strip().capitalize()
+        start_time = input("Enter Start Time (HH:MM): ").strip()
+        end_time = input("Enter End Time (HH:MM): ").strip()
+
+        try:
+            start, end = to_minutes(start_time), to_minutes(end_time)
+        except ValueError:
+            print("Invalid time format! Please use HH:MM.")
+            return
+        if end <= start:
+            print("End time must be after start time.")
+            return
+
+        repo = Storage.repo()
+        instructors_data = []
+        for instructor_id in repo.free_instructor_ids(day, start, end):
+            try:
+                instructor_profile = repo.load('instructor', instructor_id)
+                instructors_data.append([
+                    instructor_id,
+                    instructor_profile.get('name', 'N/A'),
+                    instructor_profile.get('department', 'N/A'),
+                    len(instructor_profile.get('assigned_courses', []))
+                ])
+            except Exception as e:
+                print(f"Error processing instructor {instructor_id}: {e}")
+                continue
+
+        if instructors_data:
+            print(f"\nInstructors free on {day} {start_time}-{end_time}:")
+            print(tabulate(instructors_data,
+                           headers=["Instructor ID", "Name", "Department", "Assigned Courses"],
+                           tablefmt="grid"))
+        else:
+            print(f"No instructors are free on {day} {start_time}-{end_time}.")
+
     # Ensure the users directory exists.
     @classmethod
     def ensure_users_directory(cls):
@@ -395,73 +410,36 @@ class PlatformAdmin(Person):
     
     @classmethod
     def username_exists(cls, username):
-        for filename in os.listdir(cls.USERS_DIR):
-            if filename.endswith('_profile.json'):
-                with open(os.path.join(cls.USERS_DIR, filename), 'r') as f:
-                    user_data = json.load(f)
-                    if user_data.get('username') == username:
-                        return True
-        return False
+        return Storage.repo().lookup_username(username) is not None
     
     @classmethod
     def authenticate_user(cls, username, password, user_type):
-        for filename in os.listdir(cls.USERS_DIR):
-            if filename.endswith(f'_{user_type}_profile.json'):
-                with open(os.path.join(cls.USERS_DIR, filename), 'r') as f:
-                    user_data = json.load(f)
-                    if (user_data.get('username') == username and 
-                        user_data.get('password') == password):
-                        return user_data
-        return None
+        return Storage.repo().authenticate(username, password, user_type)
     
     @staticmethod
     def user_exists(username, user_type):
-        # List all files in the 'data/users' directory for the given user type
-        user_files = [f for f in os.listdir(PlatformAdmin.USERS_DIR) if f.endswith(f'_{user_type}_profile.json')]
-        
-        # Iterate over the user files
-        for user_file in user_files:
-            try:
-                # Open the user file and load data
-                with open(os.path.join(PlatformAdmin.USERS_DIR, user_file), 'r') as f:
-                    user_data = json.load(f)
-                    # Check if the username matches
-                    if user_data.get('username') == username:
-                        return True
-            except Exception as e:
-                print(f"Error processing {user_file}: {e}")
-                continue
-        return False
+        return Storage.repo().lookup_username(username) == user_type
+
+    # Rebuild the username index from the stored profiles
+    @classmethod
+    def rebuild_user_index(cls):
+        Storage.repo().rebuild_user_index()
 
     @staticmethod
     def save_user(user_data, user_type):
-
-        # Construct the file name
-        file_name = f"{user_data['user_id']}_{user_type}_profile.json"
-        file_path = os.path.join(PlatformAdmin.USERS_DIR, file_name)
-
-        # Save the user data into the file
-        with open(file_path, "w") as file:
-            json.dump(user_data, file, indent=4)
+        Storage.repo().save(user_type, user_data['user_id'], user_data)
 
     @staticmethod
     def view_student_courses():
         
         student_id = input("Enter the Student ID: ").strip()
-        student_file = os.path.join(PlatformAdmin.USERS_DIR, f"{student_id}_student_profile.json")
-
-        # Check if the student file exists
-        if not os.path.exists(student_file):
-            print(f"No profile found for Student ID: {student_id}")
-            return
 
         try:
-            # Read the student profile JSON file
-            with open(student_file, "r") as file:
-                student_data = json.load(file)
+            # Read the student profile
+            student_data = Storage.repo().load('student', student_id)
             
             # Check if the 'courses' field exists in the profile
-            courses = student_data.get("courses", [])
+            courses = References.courses(student_data.get("courses", []))
             if not courses:
                 print(f"Student {student_id} is not enrolled in any courses.")
                 return
@@ -492,5 +470,7 @@ class PlatformAdmin(Person):
             print(tabulate(table_data, headers=headers, tablefmt="grid"))
             print()
 
+        except RecordNotFound:
+            print(f"No profile found for Student ID: {student_id}")
         except Exception as e:
             print(f"Error reading student profile: {e}")
@@ -0,0 +1,174 @@
+from storage import RecordNotFound, Storage
+
+# Course and roster references.
+#
+# Profiles and courses point at each other by key only:
+#   student['courses']              [{'course_code': ...}]
+#   instructor['assigned_courses']  [{'course_code': ...}]
+#   course['enrolled_students']     [{'student_id': ...}]
+# so an enrollment adds one small entry to each side and editing a course is
+# a single write. The rows the views show are joined from the referenced
+# record when read. Joined rows are cached per record for the current
+# repository; any write to a record drops its row, and a write from another
+# process drops every row once the version stamp of the records moves.
+
+class References:
+    # Which list holds references in each kind of record, and the key they carry
+    FIELDS = {
+        'student': ('courses', 'course_code'),
+        'instructor': ('assigned_courses', 'course_code'),
+        'course': ('enrolled_students', 'student_id'),
+    }
+
+    # Kinds of record the rows are joined from
+    SOURCES = ('course', 'student')
+
+    # Class attributes
+    _repository = None
+    _version = None
+    _courses = {}   # course_code -> course row, None if the course does not exist
+    _students = {}  # student_id -> roster row, None if the student does not exist
+
+    @classmethod
+    def _attach(cls):
+        repo = Storage.repo()
+        if repo is not cls._repository:
+            cls._repository = repo
+            cls._courses = {}
+            cls._students = {}
+            cls._version = None
+            repo.subscribe(cls._changed)
+
+        version = repo.external_version(*cls.SOURCES)
+        if version != cls._version:
+            cls._courses = {}
+            cls._students = {}
+            cls._version = version
+        return repo
+
+    @classmethod
+    def _changed(cls, kind, key):
+        if kind == 'course':
+            cls._courses.pop(key, None)
+        elif kind == 'student':
+            cls._students.pop(key, None)
+
+    @staticmethod
+    def course_ref(course_code):
+        return {'course_code': course_code}
+
+    @staticmethod
+    def student_ref(student_id):
+        return {'student_id': student_id}
+
+    # A course as listed in a timetable. The room is given under both the
+    # students' (college_room) and the instructors' (assigned_college_room) name.
+    @staticmethod
+    def course_row(course_data):
+        return {
+            'course_code': course_data['course_code'],
+            'course_name': course_data['course_name'],
+            'credited_units': course_data['credited_units'],
+            'college_room': course_data['assigned_college_room'],
+            'assigned_college_room': course_data['assigned_college_room'],
+            'room_number': course_data['room_number'],
+            'day': course_data['day'],
+            'start_time': course_data['start_time'],
+            'end_time': course_data['end_time'],
+            'instructor_id': course_data.get('instructor_id')
+        }
+
+    # A student as listed on a course roster
+    @staticmethod
+    def roster_row(student_data):
+        return {
+            'student_id': student_data['user_id'],
+            'username': student_data['name'],
+            'student_email': student_data['email'],
+            'student_major': student_data['major'],
+            'student_year_level': student_data['year_level'],
+            'student_semester': student_data['semester'],
+            'academic_year': student_data['academic_year']
+        }
+
+    # Row of one course, or None if it does not exist
+    @classmethod
+    def course(cls, course_code):
+        return cls._course(cls._attach(), course_code)
+
+    @classmethod
+    def _course(cls, repo, course_code):
+        if course_code not in cls._courses:
+            try:
+                cls._courses[course_code] = cls.course_row(repo.load('course', course_code))
+            except RecordNotFound:
+                cls._courses[course_code] = None
+        return cls._courses[course_code]
+
+    # Row of one student, or None if they do not exist
+    @classmethod
+    def student(cls, student_id):
+        return cls._student(cls._attach(), student_id)
+
+    @classmethod
+    def _student(cls, repo, student_id):
+        if student_id not in cls._students:
+            try:
+                cls._students[student_id] = cls.roster_row(repo.load('student', student_id))
+            except RecordNotFound:
+                cls._students[student_id] = None
+        return cls._students[student_id]
+
+    # Rows for a list of course references, in order. A course that no
+    # longer exists is left as its bare reference. Rows are shared; copy one
+    # before changing it.
+    @classmethod
+    def courses(cls, entries):
+        repo = cls._attach()
+        return [cls._course(repo, entry.get('course_code')) or dict(entry) for entry in entries]
+
+    # Rows for a list of student references, in order
+    @classmethod
+    def roster(cls, entries):
+        repo = cls._attach()
+        return [cls._student(repo, entry.get('student_id')) or dict(entry) for entry in entries]
+
+    # Cut a record's list down to references, in place. Entries without a
+    # key are dropped and repeated keys kept once.
+    # Returns True if the record changed.
+    @classmethod
+    def normalize(cls, kind, data):
+        field, key = cls.FIELDS[kind]
+        entries = data.get(field)
+        if entries is None:
+            return False
+
+        refs, seen = [], set()
+        for entry in entries:
+            value = entry.get(key) if isinstance(entry, dict) else None
+            if value is not None and value not in seen:
+                seen.add(value)
+                refs.append({key: value})
+        if refs == entries:
+            return False
+        data[field] = refs
+        return True
+
+    # Rewrite every student, instructor and course record whose lists still
+    # hold copied rows, in one transaction.
+    # Returns {kind: (records seen, records rewritten)}.
+    @classmethod
+    def migrate(cls, repo):
+        counts, changed = {}, []
+        for kind in cls.FIELDS:
+            seen = 0
+            for key, data in repo.load_all(kind):
+                seen += 1
+                if cls.normalize(kind, data):
+                    changed.append((kind, key, data))
+            counts[kind] = (seen, sum(1 for record in changed if record[0] == kind))
+
+        with repo.transaction():
+            for kind, key, data in changed:
+                repo.save(kind, key, data)
+        return counts
@@ -0,0 +1,181 @@
+from bisect import bisect_left
+from references import References
+from storage import Storage
+
+# In-memory weekly schedules of rooms and students.
+#
+# Each room's scheduled_times, or each student's courses, are held per day
+# as slots sorted by start minute, with times converted from "HH:MM" once
+# when the record is loaded.
+# A slot [start, end) can only overlap [s, e) if it starts before e and
+# after s minus the longest slot of that day, so a conflict query is two
+# binary searches plus the slots it reports.
+
+def to_minutes(time_str):
+    hours, minutes = map(int, time_str.split(':'))
+    return hours * 60 + minutes
+
+# Minutes back to the "H:MM" form the data files use
+def to_time(minutes):
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+class DaySchedule:
+
+    def __init__(self):
+        # Protected instance attributes
+        self._slots = []   # (start, end, slot), sorted
+        self._starts = []  # start of each slot, for bisect
+        self._longest = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        return iter(self._slots)
+
+    # Every (start, end, slot) overlapping [start, end)
+    def overlapping(self, start, end):
+        low = bisect_left(self._starts, start - self._longest + 1)
+        high = bisect_left(self._starts, end)
+        return [entry for entry in self._slots[low:high] if entry[1] > start]
+
+    def add(self, start, end, slot):
+        index = bisect_left(self._slots, (start, end))
+        self._slots.insert(index, (start, end, slot))
+        self._starts.insert(index, start)
+        self._longest = max(self._longest, end - start)
+
+    # Remove one slot with these times. Returns it, or None if there was none.
+    # _longest is left as is; an overestimate only widens the search window.
+    def remove(self, start, end):
+        index = bisect_left(self._slots, (start, end))
+        if index < len(self._slots) and self._slots[index][:2] == (start, end):
+            del self._starts[index]
+            return self._slots.pop(index)[2]
+        return None
+
+class RoomSchedule:
+
+    def __init__(self, scheduled_times=()):
+        # Protected instance attributes
+        self._days = {}
+        for slot in scheduled_times:
+            try:
+                self.add(slot['day'], to_minutes(slot['start_time']), to_minutes(slot['end_time']), slot)
+            except (KeyError, ValueError, AttributeError):
+                # Unreadable slots cannot conflict with anything
+                continue
+
+    def days(self):
+        return {day: schedule for day, schedule in self._days.items() if len(schedule)}
+
+    # Every slot on the day that overlaps [start, end), in start order
+    def conflicts(self, day, start, end):
+        schedule = self._days.get(day)
+        if schedule is None:
+            return []
+        return [slot for _, _, slot in schedule.overlapping(start, end)]
+
+    def add(self, day, start, end, slot):
+        self._days.setdefault(day, DaySchedule()).add(start, end, slot)
+
+    def remove(self, day, start, end):
+        schedule = self._days.get(day)
+        return schedule.remove(start, end) if schedule is not None else None
+
+class ScheduleCache:
+    # Process-wide key -> RoomSchedule for one kind of record, built from the
+    # list of slots in FIELD, for the current repository
+    KIND = None
+    FIELD = None
+
+    # Kinds of record the schedules are read from
+    SOURCES = ()
+
+    # Any write to a record drops its schedule; it is rebuilt on next use.
+    # Writes through other repositories are not announced, so every
+    # schedule is also dropped when external_version() of the SOURCES
+    # kinds moves.
+    @classmethod
+    def _attach(cls):
+        repo = Storage.repo()
+        if repo is not cls._repository:
+            cls._repository = repo
+            cls._schedules = {}
+            cls._version = None
+            repo.subscribe(cls._changed)
+
+        version = repo.external_version(*cls.SOURCES)
+        if version != cls._version:
+            cls._schedules = {}
+            cls._version = version
+        return repo
+
+    # A write to another of the SOURCES kinds may touch any schedule
+    @classmethod
+    def _changed(cls, kind, key):
+        if kind == cls.KIND:
+            cls._schedules.pop(key, None)
+        elif kind in cls.SOURCES:
+            cls._schedules = {}
+
+    # The schedule of one record, or None if the record does not exist.
+    # A caller that has just loaded the record can pass it in as data.
+    @classmethod
+    def get(cls, key, data=None):
+        repo = cls._attach()
+        schedule = cls._schedules.get(key)
+        if schedule is None:
+            if data is None:
+                if not repo.exists(cls.KIND, key):
+                    return None
+                data = repo.load(cls.KIND, key)
+            schedule = RoomSchedule(cls.slots(data))
+            cls._schedules[key] = schedule
+        return schedule
+
+    # The slots a record's schedule is built from
+    @classmethod
+    def slots(cls, data):
+        return data.get(cls.FIELD, [])
+
+    # Keep an up-to-date schedule after saving the record it was built from
+    @classmethod
+    def put(cls, key, schedule):
+        cls._attach()
+        cls._schedules[key] = schedule
+
+class RoomSchedules(ScheduleCache):
+    KIND = 'room'
+    FIELD = 'scheduled_times'
+    SOURCES = ('room',)
+    _schedules = {}
+    _repository = None
+    _version = None
+
+# Weekly timetable of each student, from the courses in their profile
+class StudentSchedules(ScheduleCache):
+    KIND = 'student'
+    FIELD = 'courses'
+    SOURCES = ('student', 'course')
+    _schedules = {}
+    _repository = None
+    _version = None
+
+    # Profiles list course references; the times come from the courses
+    @classmethod
+    def slots(cls, data):
+        return References.courses(data.get(cls.FIELD, []))
+
+# Weekly timetable of each instructor, from their assigned courses
+class InstructorSchedules(ScheduleCache):
+    KIND = 'instructor'
+    FIELD = 'assigned_courses'
+    SOURCES = ('instructor', 'course')
+    _schedules = {}
+    _repository = None
+    _version = None
+
+    @classmethod
+    def slots(cls, data):
+        return References.courses(data.get(cls.FIELD, []))
@@ -0,0 +1,136 @@
+import numpy as np
+from freeslots import FreeSlotFinder
+from roomschedule import to_minutes
+
+# Room utilization analytics.
+#
+# Every room's week is laid out as a rooms x days x 5-minute-slots boolean
+# matrix, filled from all scheduled_times at once by marking each slot's
+# start and end in a difference array and taking a running sum along the
+# day. Every figure in the report is then a mean over some axes of that
+# matrix, restricted to the teaching window.
+
+class RoomUsage:
+    DAYS = FreeSlotFinder.DAYS
+    GRANULARITY = FreeSlotFinder.GRANULARITY
+    SLOTS_PER_DAY = FreeSlotFinder.SLOTS_PER_DAY
+    SLOTS_PER_HOUR = 60 // GRANULARITY
+
+    # Utilization is measured over the hours rooms can be booked
+    OPEN = FreeSlotFinder.OPEN
+    CLOSE = FreeSlotFinder.CLOSE
+
+    def __init__(self, rooms, colleges, occupied):
+        # Protected instance attributes
+        self._rooms = rooms          # room keys, one per matrix row
+        self._colleges = colleges    # assigned_college_room per row
+        self._occupied = occupied    # bool [room, day, slot] over the teaching window
+        self._first_hour = to_minutes(RoomUsage.OPEN) // 60
+
+    # Build the occupancy matrix from every room record
+    @classmethod
+    def build(cls, repo):
+        rooms, colleges = [], []
+        rows, days, starts, ends = [], [], [], []
+        day_index = {day: index for index, day in enumerate(cls.DAYS)}
+
+        # The same few times recur in every room; parse each one once
+        minutes = {}
+        def parse(time_str):
+            if time_str not in minutes:
+                minutes[time_str] = to_minutes(time_str)
+            return minutes[time_str]
+
+        for room_key, room_data in repo.load_all('room'):
+            row = len(rooms)
+            rooms.append(room_key)
+            colleges.append(room_data.get('assigned_college_room') or 'N/A')
+            for slot in room_data.get('scheduled_times', []):
+                try:
+                    day = day_index[slot['day']]
+                    start, end = parse(slot['start_time']), parse(slot['end_time'])
+                except (KeyError, ValueError, AttributeError):
+                    # Weekend or unreadable slots are outside the matrix
+                    continue
+                rows.append(row)
+                days.append(day)
+                starts.append(start)
+                ends.append(end)
+
+        # Slots touched by a booking count as occupied, as in FreeSlotFinder
+        starts = np.clip(np.array(starts, dtype=np.int64) // cls.GRANULARITY, 0, cls.SLOTS_PER_DAY)
+        ends = np.clip(-(-np.array(ends, dtype=np.int64) // cls.GRANULARITY), 0, cls.SLOTS_PER_DAY)
+        rows, days = np.array(rows, dtype=np.int64), np.array(days, dtype=np.int64)
+        valid = ends > starts
+
+        shape = (len(rooms), len(cls.DAYS), cls.SLOTS_PER_DAY + 1)
+        base = (rows[valid] * shape[1] + days[valid]) * shape[2]
+        size = shape[0] * shape[1] * shape[2]
+        changes = (np.bincount(base + starts[valid], minlength=size)
+                   - np.bincount(base + ends[valid], minlength=size)).reshape(shape)
+        occupied = np.cumsum(changes, axis=2)[:, :, :cls.SLOTS_PER_DAY] > 0
+
+        first = to_minutes(cls.OPEN) // 60 * cls.SLOTS_PER_HOUR
+        last = to_minutes(cls.CLOSE) // 60 * cls.SLOTS_PER_HOUR
+        return cls(rooms, np.array(colleges), occupied[:, :, first:last])
+
+    def room_count(self):
+        return len(self._rooms)
+
+    # Hour labels for the columns of by_hour() and heatmap()
+    def hours(self):
+        hour_count = self._occupied.shape[2] // self.SLOTS_PER_HOUR
+        return [f"{hour}:00" for hour in range(self._first_hour, self._first_hour + hour_count)]
+
+    # [room, day, hour] share of each hour that is booked
+    def _hourly(self, rows=slice(None)):
+        occupied = self._occupied[rows]
+        return occupied.reshape(occupied.shape[0], occupied.shape[1], -1, self.SLOTS_PER_HOUR).mean(axis=3)
+
+    def _rows(self, college):
+        return slice(None) if college is None else self._colleges == college
+
+    # (room_key, college, booked hours per week, utilization), busiest first
+    def by_room(self, college=None):
+        rows = np.arange(len(self._rooms))[self._rows(college)]
+        booked = self._occupied[rows].sum(axis=(1, 2))
+        utilization = booked / (self._occupied.shape[1] * self._occupied.shape[2])
+        order = np.argsort(-utilization, kind='stable')
+        return [(self._rooms[rows[i]], self._colleges[rows[i]], booked[i] * self.GRANULARITY / 60, utilization[i])
+                for i in order]
+
+    # (college, rooms, utilization), busiest first
+    def by_college(self):
+        names, rows = np.unique(self._colleges, return_inverse=True)
+        if not len(names):
+            return []
+        per_room = self._occupied.mean(axis=(1, 2))
+        utilization = np.bincount(rows, weights=per_room) / np.bincount(rows)
+        counts = np.bincount(rows)
+        order = np.argsort(-utilization, kind='stable')
+        return [(names[i], counts[i], utilization[i]) for i in order]
+
+    # Utilization of every day, Monday to Friday
+    def by_day(self, college=None):
+        occupied = self._occupied[self._rows(college)]
+        if not occupied.size:
+            return [0.0] * len(self.DAYS)
+        return list(occupied.mean(axis=(0, 2)))
+
+    # Utilization of every hour of the teaching window, over all days
+    def by_hour(self, college=None):
+        hourly = self._hourly(self._rows(college))
+        if not hourly.size:
+            return [0.0] * len(self.hours())
+        return list(hourly.mean(axis=(0, 1)))
+
+    # [day, hour] share of rooms booked
+    def heatmap(self, college=None):
+        hourly = self._hourly(self._rows(college))
+        if not hourly.size:
+            return np.zeros((len(self.DAYS), len(self.hours())))
+        return hourly.mean(axis=0)
+
+    # Rooms whose utilization is below the threshold, idlest first
+    def idle_rooms(self, threshold, college=None):
+        return [room for room in reversed(self.by_room(college)) if room[3] < threshold]
@@ -0,0 +1,124 @@
+import marshal
+import os
+from fileio import atomic_write_bytes
+from storage import JsonRepository, RecordNotFound, Repository, Storage
+
+# Whole-dataset snapshot.
+#
+# Every record of the JSON data tree is packed into one marshal file, so a
+# report over the whole platform costs one read instead of one open and
+# parse per file. The snapshot carries the manifests' version stamp from
+# when it was built; any save or delete through the repository changes that
+# stamp, and a stale snapshot is simply not used.
+
+class SnapshotRepository(Repository):
+
+    def __init__(self, records, version):
+        super().__init__()
+
+        # Protected instance attributes
+        self._records = records  # kind -> {key: data}
+        self._version = version
+        self._keys = {kind: sorted(keys) for kind, keys in records.items()}
+
+    # Version stamp of the data tree the snapshot was built from
+    def version(self):
+        return self._version
+
+    # Records are shared with every reader of the snapshot; treat as read-only
+    def load(self, kind, key):
+        try:
+            return self._records[kind][key]
+        except KeyError:
+            raise RecordNotFound(f"No {kind} record '{key}'") from None
+
+    def save(self, kind, key, data):
+        raise PermissionError("The data snapshot is read-only")
+
+    def delete(self, kind, key):
+        raise PermissionError("The data snapshot is read-only")
+
+    def exists(self, kind, key):
+        return key in self._records.get(kind, {})
+
+    def keys(self, kind):
+        return self._keys.get(kind, [])
+
+    def load_all(self, kind):
+        records = self._records.get(kind, {})
+        for key in self._keys.get(kind, []):
+            yield key, records[key]
+
+    def count(self, kind):
+        return len(self._records.get(kind, {}))
+
+class Snapshot:
+    # Directory / Class attributes
+    PATH = 'data/snapshot.bin'
+
+    # Bumped when the layout of the snapshot file changes
+    FORMAT = 1
+
+    # Last snapshot read from disk: (path, file signature, repository)
+    _loaded = None
+
+    # Write a snapshot of every record in the repository.
+    # Returns the number of records per kind.
+    @staticmethod
+    def build(repo, path=PATH):
+        version = repo.version()
+        records = {kind: dict(repo.load_all(kind)) for kind in Repository.KINDS}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atomic_write_bytes(path, marshal.dumps({
+            'format': Snapshot.FORMAT,
+            'marshal_version': marshal.version,
+            'version': version,
+            'records': records,
+        }))
+        Snapshot._loaded = None
+        return {kind: len(kind_records) for kind, kind_records in records.items()}
+
+    # The snapshot on disk in one read, or None if there is no usable one
+    @classmethod
+    def load(cls, path=PATH):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if cls._loaded is not None and cls._loaded[:2] == (path, signature):
+            return cls._loaded[2]
+
+        try:
+            with open(path, 'rb') as f:
+                contents = marshal.loads(f.read())
+        except (EOFError, ValueError, TypeError) as e:
+            print(f"Error reading snapshot {path}: {e}")
+            return None
+        if contents.get('format') != cls.FORMAT or contents.get('marshal_version') != marshal.version:
+            return None
+
+        repository = SnapshotRepository(contents['records'], contents['version'])
+        cls._loaded = (path, signature, repository)
+        return repository
+
+    # The snapshot if it matches the live data, otherwise None
+    @classmethod
+    def fresh(cls, repo, path=PATH):
+        if not isinstance(repo, JsonRepository):
+            return None
+        snapshot = cls.load(path)
+        if snapshot is None or snapshot.version() != repo.version():
+            return None
+        return snapshot
+
+    # Repository for read-only views: the snapshot while it is up to date,
+    # the live repository otherwise
+    @classmethod
+    def reader(cls):
+        repo = Storage.repo()
+        return cls.fresh(repo) or repo
@@ -0,0 +1,1226 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from deadlines import Deadlines
+from fileio import (atomic_write_json, group_commit, on_commit, on_commit_batch, recover, remove_file, staged,
+                    staged_exists, staged_in)
+from entrylog import EntryLog
+from indexes import (CohortIndex, CredentialIndex, DirectoryManifest, InboxIndex, RosterIndex, RoomUseIndex,
+                     SubmissionIndex, TeachingIndex)
+from jsoncache import JsonCache
+
+# Raised when a record does not exist. It subclasses FileNotFoundError so
+# the existing "not found" handlers work the same for every backend.
+class RecordNotFound(FileNotFoundError):
+    pass
+
+class Repository:
+    # Entity kinds and where the JSON backend keeps them: (directory, file suffix)
+    KINDS = {
+        'student': ('data/users', '_student_profile.json'),
+        'instructor': ('data/users', '_instructor_profile.json'),
+        'admin': ('data/users', '_admin_profile.json'),
+        'course': ('data/courses', '_course.json'),
+        'room': ('data/rooms', '_room.json'),
+        'request': ('data/requests', '_course_requests.json'),
+        'assignment': ('data/assignments', '_assignment.json'),
+        'assigned': ('data/assignments', '_assigned.json'),
+        'submission': ('data/assignments', '_assignment_submission.json'),
+        'missing': ('data/assignments', '_missing.json'),
+        'grade': ('data/grades', '_grade.json'),
+        'feedback': ('data/feedback', '_feedback.log'),
+    }
+    USER_KINDS = ('student', 'instructor', 'admin')
+
+    # Kinds whose records are lists that grow one entry at a time
+    LOG_KINDS = ('feedback',)
+
+    # Cohort fields students can be filtered on
+    COHORT_FIELDS = ('major', 'year_level', 'semester', 'academic_year')
+
+    def __init__(self):
+        # Protected instance attributes
+        self._listeners = []
+
+    # Register callback(kind, key), run whenever a record is saved or deleted
+    # through this repository. Used to drop in-memory structures built from it.
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _changed(self, kind, key):
+        for callback in self._listeners:
+            callback(kind, key)
+
+    def load(self, kind, key):
+        raise NotImplementedError
+
+    def save(self, kind, key, data):
+        raise NotImplementedError
+
+    def delete(self, kind, key):
+        raise NotImplementedError
+
+    def exists(self, kind, key):
+        raise NotImplementedError
+
+    def keys(self, kind):
+        raise NotImplementedError
+
+    # Stamp of the records of the given kinds that moves whenever one of
+    # them is written or deleted through another repository over the same
+    # data: another process, or a worker's reopen(). Writes through this
+    # one are announced to subscribers instead, so a structure that
+    # subscribes only has to reload everything when the stamp moves.
+    def external_version(self, *kinds):
+        raise NotImplementedError
+
+    # Group several writes so they succeed or fail together, a crash
+    # included: a backend that cannot apply them at once must finish or undo
+    # an interrupted group when it next starts
+    @contextmanager
+    def transaction(self):
+        yield
+
+    # Yields (key, data) for every record of a kind
+    def load_all(self, kind):
+        for key in self.keys(kind):
+            try:
+                yield key, self.load(kind, key)
+            except RecordNotFound:
+                continue
+
+    def count(self, kind):
+        return len(self.keys(kind))
+
+    # Add one entry to a list-valued record, creating the record if needed
+    def append(self, kind, key, entry):
+        entries = self.load(kind, key) if self.exists(kind, key) else []
+        entries.append(entry)
+        self.save(kind, key, entries)
+
+    # Number of entries in a list-valued record
+    def entry_count(self, kind, key):
+        try:
+            return len(self.load(kind, key))
+        except RecordNotFound:
+            return 0
+
+    # One page of a list-valued record's entries
+    def load_entries(self, kind, key, start=0, limit=None):
+        try:
+            entries = self.load(kind, key)
+        except RecordNotFound:
+            return []
+        return entries[start:] if limit is None else entries[start:start + limit]
+
+    # Returns the user type a username is registered under, or None
+    def lookup_username(self, username):
+        for user_type in self.USER_KINDS:
+            for _, user_data in self.load_all(user_type):
+                if user_data.get('username') == username:
+                    return user_type
+        return None
+
+    # Returns the matching profile, or None
+    def authenticate(self, username, password, user_type):
+        for _, user_data in self.load_all(user_type):
+            if user_data.get('username') == username and user_data.get('password') == password:
+                return user_data
+        return None
+
+    @staticmethod
+    def _field_matches(actual, expected, ignore_case):
+        if ignore_case:
+            return str(actual).lower() == str(expected).lower()
+        return actual == expected
+
+    # Students whose cohort fields match every given criterion
+    def find_students(self, ignore_case=False, **criteria):
+        return [
+            student for _, student in self.load_all('student')
+            if all(Repository._field_matches(student.get(field), value, ignore_case)
+                   for field, value in criteria.items())
+        ]
+
+    # Sorted user_ids of the students whose cohort fields match every criterion
+    def cohort_ids(self, ignore_case=False, **criteria):
+        return sorted(student['user_id'] for student in self.find_students(ignore_case, **criteria))
+
+    # Students whose profile lists the given course
+    def students_in_course(self, course_code):
+        return [
+            student for _, student in self.load_all('student')
+            if any(course.get('course_code') == course_code for course in student.get('courses', []))
+        ]
+
+    # Assignments given to a student, with course code and deadline,
+    # ordered by assignment code
+    def student_inbox(self, student_id):
+        return [
+            InboxIndex.entry_of(assigned_data) for _, assigned_data in self.load_all('assigned')
+            if student_id in InboxIndex.students_of(assigned_data)
+        ]
+
+    # Sorted user_ids of the instructors with no assigned course meeting
+    # in [start, end) minutes on the day
+    def free_instructor_ids(self, day, start, end):
+        return sorted(
+            instructor_id for instructor_id, instructor_data in self.load_all('instructor')
+            if not any(slot_day == day and slot_start < end and slot_end > start
+                       for slot_day, slot_start, slot_end, _ in TeachingIndex.slots_of(instructor_data, self._course_or_none))
+        )
+
+    # Course record referred to from a profile, or None if it does not exist
+    def _course_or_none(self, course_code):
+        try:
+            return self.load('course', course_code)
+        except RecordNotFound:
+            return None
+
+    # Sorted user_ids of the students on a course's roster
+    def roster_ids(self, course_code):
+        return sorted(student['user_id'] for student in self.students_in_course(course_code))
+
+    # Sorted user_ids of the instructors whose assigned courses list the course
+    def course_instructor_ids(self, course_code):
+        return sorted(
+            instructor_id for instructor_id, instructor_data in self.load_all('instructor')
+            if any(course.get('course_code') == course_code for course in instructor_data.get('assigned_courses', []))
+        )
+
+    # Sorted codes of the courses scheduled in a room
+    def room_course_codes(self, room_key):
+        return sorted(
+            course_code for course_code, course_data in self.load_all('course')
+            if RoomUseIndex.room_of(course_data) == room_key
+        )
+
+    # Sorted codes of the assignments given out in a course
+    def course_assignment_codes(self, course_code):
+        return sorted(
+            assignment_code for assignment_code, assigned_data in self.load_all('assigned')
+            if assigned_data.get('course_code') == course_code
+        )
+
+    # Sorted student_ids an assignment was given to
+    def assigned_ids(self, assignment_code):
+        try:
+            return InboxIndex.students_of(self.load('assigned', assignment_code))
+        except RecordNotFound:
+            return []
+
+    # assignment_code -> deadline epoch of every assignment given out, None
+    # for one without a deadline
+    def assignment_deadlines(self):
+        return {assignment_code: Deadlines.deadline_of(assigned_data.get('assignment_details', {}))
+                for assignment_code, assigned_data in self.load_all('assigned')}
+
+    # Key of the submission record for one student's work on one assignment
+    @staticmethod
+    def submission_key(assignment_code, student_id):
+        return f"{assignment_code}__{student_id}"
+
+    # Submissions for one assignment, ordered by student_id
+    def assignment_submissions(self, assignment_code):
+        return sorted(
+            (data for _, data in self.load_all('submission') if data.get('assignment_code') == assignment_code),
+            key=lambda data: str(data.get('student_id')))
+
+    # Sorted student_ids of everyone who has submitted an assignment
+    def submitted_ids(self, assignment_code):
+        return [data.get('student_id') for data in self.assignment_submissions(assignment_code)]
+
+    # student_id -> (status, graded) for everyone who submitted an assignment
+    def submission_states(self, assignment_code):
+        return {data.get('student_id'): (data.get('status'), 'score' in data)
+                for data in self.assignment_submissions(assignment_code)}
+
+    # Who has not submitted an assignment, who submitted late and whose
+    # submission is not graded yet, as sorted student_ids under
+    # 'not_submitted', 'late' and 'ungraded', with the 'assigned' and
+    # 'submitted' counts. Works from the assigned and submitted id sets,
+    # so it costs time in proportion to the roster.
+    def submission_report(self, assignment_code):
+        assigned = set(self.assigned_ids(assignment_code))
+        states = self.submission_states(assignment_code)
+        return {
+            'assigned': len(assigned),
+            'submitted': len(states),
+            'not_submitted': sorted(assigned - states.keys()),
+            'late': sorted(student_id for student_id, (status, _) in states.items() if status == "Late"),
+            'ungraded': sorted(student_id for student_id, (_, graded) in states.items() if not graded),
+        }
+
+    # assignment_code -> submission_report for every assignment given out
+    # in a course
+    def course_submission_report(self, course_code):
+        return {assignment_code: self.submission_report(assignment_code)
+                for assignment_code in self.course_assignment_codes(course_code)}
+
+    # Submissions of one student, ordered by assignment code
+    def student_submissions(self, student_id):
+        return sorted(
+            (data for _, data in self.load_all('submission') if data.get('student_id') == student_id),
+            key=lambda data: str(data.get('assignment_code')))
+
+    # Move submission records saved under the student_id alone to their
+    # (assignment, student) key, in one transaction. A record whose new key
+    # is already taken is left where it is.
+    # Returns (moved, skipped) lists of old keys.
+    def migrate_submissions(self):
+        moved, skipped, renames = [], [], []
+        for key, data in self.load_all('submission'):
+            if not data.get('assignment_code') or not data.get('student_id'):
+                skipped.append(key)
+                continue
+            new_key = self.submission_key(data['assignment_code'], data['student_id'])
+            if new_key == key:
+                continue
+            if self.exists('submission', new_key):
+                skipped.append(key)
+            else:
+                renames.append((key, new_key, data))
+
+        with self.transaction():
+            for key, new_key, data in renames:
+                self.save('submission', new_key, data)
+                self.delete('submission', key)
+                moved.append(key)
+        return moved, skipped
+
+    # Compare every roster three ways: the roster lookup, the course file's
+    # enrolled_students and the student profiles' courses lists.
+    # Returns (course_code, student_id, problem) tuples.
+    def check_rosters(self):
+        from_profiles = {}
+        for student_id, student in self.load_all('student'):
+            for course in student.get('courses', []):
+                from_profiles.setdefault(course.get('course_code'), set()).add(student_id)
+
+        from_courses = {}
+        for course_code, course_data in self.load_all('course'):
+            from_courses[course_code] = {entry.get('student_id') for entry in course_data.get('enrolled_students', [])}
+
+        problems = []
+        for course_code in sorted(from_profiles.keys() | from_courses.keys(), key=str):
+            profiles = from_profiles.get(course_code, set())
+            indexed = set(self.roster_ids(course_code))
+            checks = [
+                (indexed - profiles, "in roster index, course not in student profile"),
+                (profiles - indexed, "in student profile, missing from roster index"),
+                (profiles - from_courses.get(course_code, set()), "in student profile, missing from course enrolled_students"),
+            ]
+            if course_code in from_courses:
+                checks.append((from_courses[course_code] - profiles, "in course enrolled_students, course not in student profile"))
+            else:
+                checks.append((profiles, "course file does not exist"))
+            for student_ids, problem in checks:
+                problems += [(course_code, student_id, problem) for student_id in sorted(student_ids, key=str)]
+        return problems
+
+    # Rebuild any derived lookup structures from the stored records
+    def rebuild_indexes(self):
+        pass
+
+    # Rebuild only the username index
+    def rebuild_user_index(self):
+        pass
+
+    # Backend counters for the storage statistics view
+    def stats(self):
+        return {}
+
+    # A second repository over the same data, for a worker thread
+    def reopen(self):
+        raise NotImplementedError
+
+class JsonRepository(Repository):
+    # Directory / Class attributes
+    INDEX_DIR = 'data/indexes/'
+    JOURNAL_DIR = 'data/journal/'
+
+    # Journal directories already recovered by this process
+    _recovered = set()
+
+    def __init__(self, cache=None):
+        super().__init__()
+
+        # Finish any transaction a crashed process left half applied
+        recovered = self._recover()
+
+        # Username -> (user_id, user_type, credential) index
+        self._credentials = CredentialIndex(self)
+
+        # Cohort field -> value -> student user_ids
+        self._cohorts = CohortIndex(self)
+
+        # Course code -> enrolled student user_ids
+        self._rosters = RosterIndex(self)
+
+        # Student -> assignments given to them
+        self._inboxes = InboxIndex(self)
+
+        # Instructor -> weekly teaching slots
+        self._teaching = TeachingIndex(self)
+
+        # Room -> courses scheduled in it
+        self._room_use = RoomUseIndex(self)
+
+        # Assignment -> submitting students, student -> submitted assignments
+        self._submissions = SubmissionIndex(self)
+
+        # Parsed-record cache, validated against each file's mtime and size
+        self._cache = cache or JsonCache.shared()
+
+        # One manifest of record keys per data directory
+        kinds_by_directory = {}
+        for kind, (directory, suffix) in self.KINDS.items():
+            kinds_by_directory.setdefault(directory, {})[kind] = suffix
+        self._manifests = {directory: DirectoryManifest(directory, kinds, self.INDEX_DIR)
+                           for directory, kinds in kinds_by_directory.items()}
+
+        # The finished transactions' index updates were lost with the process
+        if recovered:
+            for index in (self._credentials, self._cohorts, self._rosters, self._inboxes,
+                          self._teaching, self._room_use, self._submissions):
+                index.rebuild()
+
+    # Returns the number of transactions finished, once per process and
+    # journal directory
+    def _recover(self):
+        journal_dir = os.path.abspath(self.JOURNAL_DIR)
+        if journal_dir in JsonRepository._recovered:
+            return 0
+        JsonRepository._recovered.add(journal_dir)
+        directories = {directory for directory, _ in self.KINDS.values()} | {self.INDEX_DIR}
+        return recover(self.JOURNAL_DIR, directories)
+
+    def _manifest(self, kind):
+        return self._manifests[self.KINDS[kind][0]]
+
+    # Log kinds are kept as append-only entry logs. They write through
+    # rather than joining transactions.
+    def _log(self, kind, key):
+        directory, suffix = self.KINDS[kind]
+        return EntryLog(os.path.join(directory, f"{key}{suffix}"),
+                        os.path.join(directory, f"{key}{self._legacy_suffix(kind)}"))
+
+    # Log kinds used to be stored as one JSON array per record
+    def _legacy_suffix(self, kind):
+        return self.KINDS[kind][1][:-len('.log')] + '.json'
+
+    # Convert every remaining JSON array file of a log kind into an entry
+    # log. Returns the number of records converted.
+    def migrate_logs(self):
+        migrated = 0
+        for kind in self.LOG_KINDS:
+            directory = self.KINDS[kind][0]
+            legacy_suffix = self._legacy_suffix(kind)
+            if not os.path.exists(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(legacy_suffix):
+                    continue
+                key = filename[:-len(legacy_suffix)]
+                if self._log(kind, key).migrate_legacy():
+                    self._record_key(kind, key, True)
+                    migrated += 1
+        return migrated
+
+    def _path(self, kind, key):
+        directory, suffix = self.KINDS[kind]
+        return os.path.join(directory, f"{key}{suffix}")
+
+    # Writes inside a transaction are staged and flushed together on exit
+    @contextmanager
+    def transaction(self):
+        with group_commit(self.JOURNAL_DIR):
+            yield
+
+    def load(self, kind, key):
+        if kind in self.LOG_KINDS:
+            log = self._log(kind, key)
+            if not log.exists():
+                raise RecordNotFound(f"No {kind} record '{key}'")
+            return log.read()
+
+        path = self._path(kind, key)
+
+        # Writes staged by an open transaction are visible to its own reads
+        is_staged, text = staged(path)
+        if is_staged:
+            if text is None:
+                raise RecordNotFound(f"No {kind} record '{key}'")
+            return json.loads(text)
+
+        try:
+            return self._cache.load(path)
+        except FileNotFoundError:
+            raise RecordNotFound(f"No {kind} record '{key}'") from None
+
+    def save(self, kind, key, data):
+        os.makedirs(self.KINDS[kind][0], exist_ok=True)
+        if kind in self.LOG_KINDS:
+            self._log(kind, key).rewrite(data)
+            self._record_key(kind, key, True)
+            self._changed(kind, key)
+            return
+
+        path = self._path(kind, key)
+        atomic_write_json(path, data)
+        self._cache.invalidate(path)
+        self._record_key(kind, key, True)
+        self._changed(kind, key)
+
+        if kind in self.USER_KINDS:
+            user = {field: data.get(field) for field in ('user_id', 'username', 'password')}
+            on_commit(lambda: self._credentials.record(user, kind))
+        if kind == 'student':
+            student = dict(data, courses=list(data.get('courses', [])))
+            on_commit(lambda: self._cohorts.record(student))
+            on_commit(lambda: self._rosters.record(student))
+        elif kind == 'instructor':
+            instructor = dict(data, assigned_courses=list(data.get('assigned_courses', [])))
+            on_commit(lambda: self._teaching.record(instructor, self._course_or_none))
+        elif kind == 'course':
+            course = {'course_code': key, 'assigned_college_room': data.get('assigned_college_room'),
+                      'room_number': data.get('room_number')}
+            on_commit(lambda: self._room_use.record(course))
+            on_commit(lambda: self._refresh_teaching(key), ('teaching', key))
+        elif kind == 'assigned':
+            assigned = dict(data, assigned_students=list(data.get('assigned_students', [])))
+            on_commit(lambda: self._inboxes.record(assigned))
+        elif kind == 'submission':
+            on_commit_batch(('submissions', id(self)), (key, SubmissionIndex.entry_of(data)), self._submissions.update)
+
+    def delete(self, kind, key):
+        if kind in self.LOG_KINDS:
+            try:
+                self._log(kind, key).delete()
+            except FileNotFoundError:
+                raise RecordNotFound(f"No {kind} record '{key}'") from None
+            self._record_key(kind, key, False)
+            self._changed(kind, key)
+            return
+
+        username = self.load(kind, key).get('username') if kind in self.USER_KINDS else None
+        path = self._path(kind, key)
+        try:
+            remove_file(path)
+        except FileNotFoundError:
+            raise RecordNotFound(f"No {kind} record '{key}'") from None
+        self._cache.invalidate(path)
+        self._record_key(kind, key, False)
+        self._changed(kind, key)
+        if kind in self.USER_KINDS:
+            on_commit(lambda: self._credentials.forget(username))
+        if kind == 'student':
+            on_commit(lambda: self._cohorts.forget(key))
+            on_commit(lambda: self._rosters.forget(key))
+        elif kind == 'instructor':
+            on_commit(lambda: self._teaching.forget(key))
+        elif kind == 'course':
+            on_commit(lambda: self._room_use.forget(key))
+            on_commit(lambda: self._refresh_teaching(key), ('teaching', key))
+        elif kind == 'assigned':
+            on_commit(lambda: self._inboxes.forget(key))
+        elif kind == 'submission':
+            on_commit_batch(('submissions', id(self)), (key, None), self._submissions.update)
+
+    # Instructors' teaching slots carry the times of their courses; recompute
+    # them for the instructors of a course that was saved or deleted
+    def _refresh_teaching(self, course_code):
+        for instructor_id in self._teaching.instructors_of(course_code):
+            try:
+                self._teaching.record(self.load('instructor', instructor_id), self._course_or_none)
+            except RecordNotFound:
+                continue
+
+    # Update the manifests once the file changes have reached the
+    # directory, all of a transaction's changes at once
+    def _record_key(self, kind, key, present):
+        on_commit_batch(('manifest', id(self)), (kind, key, present), self._record_keys)
+
+    def _record_keys(self, changes):
+        by_directory = {}
+        for kind, key, present in changes:
+            by_directory.setdefault(self.KINDS[kind][0], []).append((kind, key, present))
+        for directory, directory_changes in by_directory.items():
+            self._manifests[directory].record(directory_changes)
+
+    def exists(self, kind, key):
+        if kind in self.LOG_KINDS:
+            return self._log(kind, key).exists()
+        return staged_exists(self._path(kind, key))
+
+    # Appending costs the same however many entries the record has
+    def append(self, kind, key, entry):
+        if kind not in self.LOG_KINDS:
+            return super().append(kind, key, entry)
+        os.makedirs(self.KINDS[kind][0], exist_ok=True)
+        self._log(kind, key).append(entry)
+        self._record_key(kind, key, True)
+        self._changed(kind, key)
+
+    def entry_count(self, kind, key):
+        if kind not in self.LOG_KINDS:
+            return super().entry_count(kind, key)
+        return self._log(kind, key).count()
+
+    def load_entries(self, kind, key, start=0, limit=None):
+        if kind not in self.LOG_KINDS:
+            return super().load_entries(kind, key, start, limit)
+        return self._log(kind, key).read(start, limit)
+
+    def keys(self, kind):
+        directory, suffix = self.KINDS[kind]
+        keys = self._manifest(kind).keys(kind)
+
+        # Apply writes and deletes staged by an open transaction
+        changes = staged_in(directory)
+        if changes:
+            keys = set(keys)
+            for filename, present in changes.items():
+                if not filename.endswith(suffix):
+                    continue
+                if present:
+                    keys.add(filename[:-len(suffix)])
+                else:
+                    keys.discard(filename[:-len(suffix)])
+
+        return sorted(keys)
+
+    def count(self, kind):
+        if staged_in(self.KINDS[kind][0]):
+            return len(self.keys(kind))
+        return len(self._manifest(kind).keys(kind))
+
+    def load_all(self, kind):
+        for key in self.keys(kind):
+            try:
+                yield key, self.load(kind, key)
+            except RecordNotFound:
+                continue
+            except Exception as e:
+                print(f"Error processing {os.path.basename(self._path(kind, key))}: {e}")
+                continue
+
+    def lookup_username(self, username):
+        entry = self._credentials.lookup(username)
+        return entry['user_type'] if entry else None
+
+    def authenticate(self, username, password, user_type):
+        entry = self._credentials.lookup(username)
+        if not entry or entry['user_type'] != user_type:
+            return None
+        if not CredentialIndex.verify(entry, password):
+            return None
+
+        # Load only the matching profile
+        try:
+            user_data = self.load(user_type, entry['user_id'])
+        except RecordNotFound:
+            # Profile was removed behind the index's back
+            self._credentials.rebuild()
+            return None
+
+        if user_data.get('username') == username and user_data.get('password') == password:
+            return user_data
+        return None
+
+    # Version stamp of the whole data tree, taken from the manifests
+    def version(self):
+        return sorted((directory, manifest.version()) for directory, manifest in self._manifests.items())
+
+    # Taken from the manifests of the kinds' directories
+    def external_version(self, *kinds):
+        directories = {self.KINDS[kind][0] for kind in kinds} or self._manifests.keys()
+        return sorted((directory, self._manifests[directory].external_version()) for directory in directories)
+
+    def cohort_ids(self, ignore_case=False, **criteria):
+        if not ignore_case or not set(criteria) <= set(self.COHORT_FIELDS):
+            return super().cohort_ids(ignore_case, **criteria)
+        return sorted(self._cohorts.lookup(**criteria))
+
+    # Reads only the profiles the cohort index points at
+    def find_students(self, ignore_case=False, **criteria):
+        if not set(criteria) <= set(self.COHORT_FIELDS):
+            return super().find_students(ignore_case, **criteria)
+
+        students = []
+        for user_id in sorted(self._cohorts.lookup(**criteria)):
+            try:
+                student = self.load('student', user_id)
+            except RecordNotFound:
+                continue
+            except Exception as e:
+                print(f"Error processing {os.path.basename(self._path('student', user_id))}: {e}")
+                continue
+
+            # The index is case-insensitive; check the profile itself too
+            if all(Repository._field_matches(student.get(field), value, ignore_case)
+                   for field, value in criteria.items()):
+                students.append(student)
+        return students
+
+    def roster_ids(self, course_code):
+        return sorted(self._rosters.lookup(course_code))
+
+    # Reads only the profiles on the roster
+    def students_in_course(self, course_code):
+        students = []
+        for user_id in self.roster_ids(course_code):
+            try:
+                student = self.load('student', user_id)
+            except RecordNotFound:
+                continue
+            except Exception as e:
+                print(f"Error processing {os.path.basename(self._path('student', user_id))}: {e}")
+                continue
+            if any(course.get('course_code') == course_code for course in student.get('courses', [])):
+                students.append(student)
+        return students
+
+    # Also rebuilds the roster index if it disagrees with the profiles
+    def check_rosters(self):
+        problems = super().check_rosters()
+        if any('roster index' in problem for _, _, problem in problems):
+            self._rosters.rebuild()
+        return problems
+
+    def student_inbox(self, student_id):
+        return self._inboxes.lookup(student_id)
+
+    def free_instructor_ids(self, day, start, end):
+        return self._teaching.free(day, start, end)
+
+    def course_instructor_ids(self, course_code):
+        return self._teaching.instructors_of(course_code)
+
+    def room_course_codes(self, room_key):
+        return self._room_use.lookup(room_key)
+
+    def course_assignment_codes(self, course_code):
+        return self._inboxes.assignments_of(course_code)
+
+    def assigned_ids(self, assignment_code):
+        return self._inboxes.students_of_assignment(assignment_code)
+
+    # Read from the inbox index, which carries each assignment's deadline
+    def assignment_deadlines(self):
+        return {assignment_code: Deadlines.deadline_of(entry) for assignment_code, entry in self._inboxes.entries().items()}
+
+    # Reads only the indexed submissions
+    def _load_submissions(self, keys):
+        submissions = []
+        for key in keys:
+            try:
+                submissions.append(self.load('submission', key))
+            except RecordNotFound:
+                continue
+            except Exception as e:
+                print(f"Error processing {os.path.basename(self._path('submission', key))}: {e}")
+                continue
+        return submissions
+
+    def assignment_submissions(self, assignment_code):
+        keys = self._submissions.of_assignment(assignment_code)
+        return self._load_submissions(keys[student_id] for student_id in sorted(keys, key=str))
+
+    def submitted_ids(self, assignment_code):
+        return sorted(self._submissions.of_assignment(assignment_code), key=str)
+
+    def submission_states(self, assignment_code):
+        return self._submissions.states_of(assignment_code)
+
+    def student_submissions(self, student_id):
+        keys = self._submissions.of_student(student_id)
+        return self._load_submissions(keys[assignment_code] for assignment_code in sorted(keys, key=str))
+
+    def rebuild_user_index(self):
+        self._credentials.rebuild()
+
+    def rebuild_indexes(self):
+        self._credentials.rebuild()
+        self._cohorts.rebuild()
+        self._rosters.rebuild()
+        self._inboxes.rebuild()
+        self._teaching.rebuild()
+        self._room_use.rebuild()
+        self._submissions.rebuild()
+        for manifest in self._manifests.values():
+            manifest.rebuild()
+
+    # Compare every manifest with its directory and rebuild the ones that
+    # disagree. Returns the differences found.
+    def check_manifests(self):
+        differences = []
+        for manifest in self._manifests.values():
+            found = manifest.differences()
+            if found:
+                manifest.rebuild()
+                differences += found
+        return differences
+
+    # Shares the record cache, which is thread-safe; indexes and manifests
+    # are logs on disk that every instance replays
+    def reopen(self):
+        return JsonRepository(self._cache)
+
+    def stats(self):
+        cache = self._cache.stats()
+        return {
+            'Cache Hits': cache['hits'],
+            'Cache Misses': cache['misses'],
+            'Cache Hit Rate': f"{cache['hit_rate']:.1%}",
+            'Cache Evictions': cache['evictions'],
+            'Cached Records': cache['entries'],
+            'Cache Size': f"{cache['bytes'] / 1024:.1f} KiB of {cache['max_bytes'] / 1024 / 1024:.0f} MiB",
+        }
+
+class SqliteRepository(Repository):
+    DEFAULT_PATH = 'data/elearning.db'
+
+    # kind -> (table, key column, {indexed column: value taken from the record})
+    TABLES = {
+        'student': ('users', 'user_id', {
+            'user_type': lambda d: 'student',
+            'username': lambda d: d.get('username'),
+            'password': lambda d: d.get('password'),
+            'major': lambda d: str(d.get('major', '')).lower(),
+            'year_level': lambda d: str(d.get('year_level', '')).lower(),
+            'semester': lambda d: str(d.get('semester', '')).lower(),
+            'academic_year': lambda d: str(d.get('academic_year', '')).lower(),
+        }),
+        'instructor': ('users', 'user_id', {
+            'user_type': lambda d: 'instructor',
+            'username': lambda d: d.get('username'),
+            'password': lambda d: d.get('password'),
+        }),
+        'admin': ('users', 'user_id', {
+            'user_type': lambda d: 'admin',
+            'username': lambda d: d.get('username'),
+            'password': lambda d: d.get('password'),
+        }),
+        'course': ('courses', 'course_code', {
+            'instructor_id': lambda d: d.get('instructor_id'),
+            'assigned_college_room': lambda d: d.get('assigned_college_room'),
+            'room_number': lambda d: d.get('room_number'),
+            'day': lambda d: d.get('day'),
+        }),
+        'room': ('rooms', 'room_key', {
+            'assigned_college_room': lambda d: d.get('assigned_college_room'),
+            'room_number': lambda d: d.get('room_number'),
+        }),
+        'request': ('requests', 'student_id', {}),
+        'assignment': ('assignments', 'assignment_code', {}),
+        'assigned': ('assigned', 'assignment_code', {
+            'course_code': lambda d: d.get('course_code'),
+        }),
+        'submission': ('submissions', 'submission_key', {
+            'assignment_code': lambda d: d.get('assignment_code'),
+            'student_id': lambda d: d.get('student_id'),
+        }),
+        'missing': ('missing', 'assignment_code', {}),
+        'grade': ('grades', 'student_id', {}),
+    }
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY, user_type TEXT NOT NULL, username TEXT UNIQUE, password TEXT,
+            major TEXT, year_level TEXT, semester TEXT, academic_year TEXT, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS users_by_type ON users(user_type);
+        CREATE INDEX IF NOT EXISTS users_by_cohort ON users(major, year_level, semester, academic_year);
+
+        CREATE TABLE IF NOT EXISTS courses (
+            course_code TEXT PRIMARY KEY, instructor_id TEXT, assigned_college_room TEXT,
+            room_number TEXT, day TEXT, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS courses_by_instructor ON courses(instructor_id);
+        CREATE INDEX IF NOT EXISTS courses_by_room ON courses(assigned_college_room, room_number);
+
+        CREATE TABLE IF NOT EXISTS rooms (
+            room_key TEXT PRIMARY KEY, assigned_college_room TEXT, room_number TEXT, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS rooms_by_college ON rooms(assigned_college_room);
+
+        CREATE TABLE IF NOT EXISTS enrollments (
+            course_code TEXT NOT NULL, student_id TEXT NOT NULL, PRIMARY KEY (course_code, student_id));
+        CREATE INDEX IF NOT EXISTS enrollments_by_student ON enrollments(student_id);
+
+        CREATE TABLE IF NOT EXISTS assignments (assignment_code TEXT PRIMARY KEY, data TEXT NOT NULL);
+
+        CREATE TABLE IF NOT EXISTS assigned (
+            assignment_code TEXT PRIMARY KEY, course_code TEXT, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS assigned_by_course ON assigned(course_code);
+
+        CREATE TABLE IF NOT EXISTS inbox (
+            student_id TEXT NOT NULL, assignment_code TEXT NOT NULL, PRIMARY KEY (student_id, assignment_code));
+        CREATE INDEX IF NOT EXISTS inbox_by_assignment ON inbox(assignment_code);
+
+        CREATE TABLE IF NOT EXISTS teaching (
+            instructor_id TEXT NOT NULL, day TEXT, start_minute INTEGER, end_minute INTEGER, course_code TEXT);
+        CREATE INDEX IF NOT EXISTS teaching_by_instructor ON teaching(instructor_id);
+        CREATE INDEX IF NOT EXISTS teaching_by_day ON teaching(day, start_minute);
+        CREATE INDEX IF NOT EXISTS teaching_by_course ON teaching(course_code);
+
+        CREATE TABLE IF NOT EXISTS submissions (
+            submission_key TEXT PRIMARY KEY, assignment_code TEXT, student_id TEXT, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS submissions_by_assignment ON submissions(assignment_code);
+        CREATE INDEX IF NOT EXISTS submissions_by_student ON submissions(student_id);
+
+        CREATE TABLE IF NOT EXISTS missing (assignment_code TEXT PRIMARY KEY, data TEXT NOT NULL);
+
+        CREATE TABLE IF NOT EXISTS grades (student_id TEXT PRIMARY KEY, data TEXT NOT NULL);
+
+        CREATE TABLE IF NOT EXISTS feedback (
+            feedback_id INTEGER PRIMARY KEY AUTOINCREMENT, instructor_id TEXT NOT NULL, data TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS feedback_by_instructor ON feedback(instructor_id);
+
+        CREATE TABLE IF NOT EXISTS requests (student_id TEXT PRIMARY KEY, data TEXT NOT NULL);
+    """
+
+    def __init__(self, db_path=DEFAULT_PATH):
+        super().__init__()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db_path = db_path
+
+        # Autocommit; transaction() opens explicit transactions
+        self._conn = sqlite3.connect(db_path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        existing = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self._conn.executescript(self.SCHEMA)
+        self._depth = 0
+
+        # Fill derived tables added after the database was created
+        if existing and 'inbox' not in existing:
+            with self.transaction():
+                for key, data in self.load_all('assigned'):
+                    self._save_inbox(key, data)
+        if existing and 'teaching' not in existing:
+            with self.transaction():
+                for key, data in self.load_all('instructor'):
+                    self._save_teaching(key, data)
+
+    # A connection belongs to the thread that opened it, so a worker gets
+    # its own; WAL lets it write while this one reads
+    def reopen(self):
+        return SqliteRepository(self._db_path)
+
+    # PRAGMA data_version moves exactly when another connection commits;
+    # the whole database shares one stamp
+    def external_version(self, *kinds):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    # WHERE clause that limits the shared users table to one kind
+    def _scope(self, kind):
+        if kind in self.USER_KINDS:
+            return " AND user_type = ?", (kind,)
+        return "", ()
+
+    # Takes the write lock up front, so a writer on another connection waits
+    # for it rather than failing to upgrade a read
+    @contextmanager
+    def transaction(self):
+        if self._depth == 0:
+            self._conn.execute("BEGIN IMMEDIATE")
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("COMMIT")
+
+    def load(self, kind, key):
+        if kind == 'feedback':
+            rows = self._conn.execute(
+                "SELECT data FROM feedback WHERE instructor_id = ? ORDER BY feedback_id", (key,)).fetchall()
+            if not rows:
+                raise RecordNotFound(f"No {kind} record '{key}'")
+            return [json.loads(row[0]) for row in rows]
+
+        table, key_column, _ = self.TABLES[kind]
+        scope, params = self._scope(kind)
+        row = self._conn.execute(
+            f"SELECT data FROM {table} WHERE {key_column} = ?{scope}", (key,) + params).fetchone()
+        if row is None:
+            raise RecordNotFound(f"No {kind} record '{key}'")
+        return json.loads(row[0])
+
+    def save(self, kind, key, data):
+        self._write(kind, key, data)
+        self._changed(kind, key)
+
+    def _write(self, kind, key, data):
+        with self.transaction():
+            if kind == 'feedback':
+                self._conn.execute("DELETE FROM feedback WHERE instructor_id = ?", (key,))
+                self._conn.executemany(
+                    "INSERT INTO feedback (instructor_id, data) VALUES (?, ?)",
+                    [(key, json.dumps(entry)) for entry in data])
+                return
+
+            table, key_column, columns = self.TABLES[kind]
+            names = [key_column] + list(columns) + ['data']
+            values = [key] + [extract(data) for extract in columns.values()] + [json.dumps(data)]
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                values)
+
+            # Keep the enrollment table in step with the student's course list
+            if kind == 'student':
+                self._conn.execute("DELETE FROM enrollments WHERE student_id = ?", (key,))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO enrollments (course_code, student_id) VALUES (?, ?)",
+                    [(course['course_code'], key) for course in data.get('courses', [])])
+            elif kind == 'instructor':
+                self._save_teaching(key, data)
+            elif kind == 'course':
+                self._refresh_teaching(key)
+            elif kind == 'assigned':
+                self._save_inbox(key, data)
+
+    # Keep the inbox table in step with an assignment's assigned students
+    def _save_inbox(self, assignment_code, assigned_data):
+        self._conn.execute("DELETE FROM inbox WHERE assignment_code = ?", (assignment_code,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO inbox (student_id, assignment_code) VALUES (?, ?)",
+            [(student_id, assignment_code) for student_id in InboxIndex.students_of(assigned_data)])
+
+    # Keep the teaching table in step with an instructor's assigned courses
+    def _save_teaching(self, instructor_id, instructor_data):
+        self._conn.execute("DELETE FROM teaching WHERE instructor_id = ?", (instructor_id,))
+        self._conn.executemany(
+            "INSERT INTO teaching (instructor_id, day, start_minute, end_minute, course_code) VALUES (?, ?, ?, ?, ?)",
+            [(instructor_id, *slot) for slot in TeachingIndex.slots_of(instructor_data, self._course_or_none)])
+
+    # Teaching rows carry the times of their courses; recompute them for the
+    # instructors of a course that was saved or deleted
+    def _refresh_teaching(self, course_code):
+        for instructor_id in self.course_instructor_ids(course_code):
+            try:
+                self._save_teaching(instructor_id, self.load('instructor', instructor_id))
+            except RecordNotFound:
+                continue
+
+    def delete(self, kind, key):
+        if not self.exists(kind, key):
+            raise RecordNotFound(f"No {kind} record '{key}'")
+        self._remove(kind, key)
+        self._changed(kind, key)
+
+    def _remove(self, kind, key):
+        with self.transaction():
+            if kind == 'feedback':
+                self._conn.execute("DELETE FROM feedback WHERE instructor_id = ?", (key,))
+                return
+
+            table, key_column, _ = self.TABLES[kind]
+            self._conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+            if kind == 'student':
+                self._conn.execute("DELETE FROM enrollments WHERE student_id = ?", (key,))
+            elif kind == 'instructor':
+                self._conn.execute("DELETE FROM teaching WHERE instructor_id = ?", (key,))
+            elif kind == 'course':
+                self._refresh_teaching(key)
+            elif kind == 'assigned':
+                self._conn.execute("DELETE FROM inbox WHERE assignment_code = ?", (key,))
+
+    def exists(self, kind, key):
+        if kind == 'feedback':
+            row = self._conn.execute("SELECT 1 FROM feedback WHERE instructor_id = ? LIMIT 1", (key,)).fetchone()
+            return row is not None
+
+        table, key_column, _ = self.TABLES[kind]
+        scope, params = self._scope(kind)
+        row = self._conn.execute(
+            f"SELECT 1 FROM {table} WHERE {key_column} = ?{scope}", (key,) + params).fetchone()
+        return row is not None
+
+    def keys(self, kind):
+        if kind == 'feedback':
+            rows = self._conn.execute("SELECT DISTINCT instructor_id FROM feedback ORDER BY instructor_id")
+            return [row[0] for row in rows]
+
+        table, key_column, _ = self.TABLES[kind]
+        scope, params = self._scope(kind)
+        rows = self._conn.execute(f"SELECT {key_column} FROM {table} WHERE 1 = 1{scope} ORDER BY {key_column}", params)
+        return [row[0] for row in rows]
+
+    def load_all(self, kind):
+        if kind == 'feedback':
+            for key in self.keys(kind):
+                yield key, self.load(kind, key)
+            return
+
+        table, key_column, _ = self.TABLES[kind]
+        scope, params = self._scope(kind)
+        rows = self._conn.execute(
+            f"SELECT {key_column}, data FROM {table} WHERE 1 = 1{scope} ORDER BY {key_column}", params).fetchall()
+        for key, data in rows:
+            yield key, json.loads(data)
+
+    def count(self, kind):
+        if kind == 'feedback':
+            return len(self.keys(kind))
+
+        table, _, _ = self.TABLES[kind]
+        scope, params = self._scope(kind)
+        return self._conn.execute(f"SELECT COUNT(*) FROM {table} WHERE 1 = 1{scope}", params).fetchone()[0]
+
+    def append(self, kind, key, entry):
+        if kind != 'feedback':
+            return super().append(kind, key, entry)
+        self._conn.execute("INSERT INTO feedback (instructor_id, data) VALUES (?, ?)", (key, json.dumps(entry)))
+        self._changed(kind, key)
+
+    def entry_count(self, kind, key):
+        if kind != 'feedback':
+            return super().entry_count(kind, key)
+        return self._conn.execute("SELECT COUNT(*) FROM feedback WHERE instructor_id = ?", (key,)).fetchone()[0]
+
+    def load_entries(self, kind, key, start=0, limit=None):
+        if kind != 'feedback':
+            return super().load_entries(kind, key, start, limit)
+        rows = self._conn.execute(
+            "SELECT data FROM feedback WHERE instructor_id = ? ORDER BY feedback_id LIMIT ? OFFSET ?",
+            (key, -1 if limit is None else limit, start))
+        return [json.loads(row[0]) for row in rows]
+
+    def lookup_username(self, username):
+        row = self._conn.execute("SELECT user_type FROM users WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def authenticate(self, username, password, user_type):
+        row = self._conn.execute(
+            "SELECT data FROM users WHERE username = ? AND password = ? AND user_type = ?",
+            (username, password, user_type)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_students(self, ignore_case=False, **criteria):
+        # The cohort columns hold lowercased values; exact matches are re-checked below
+        clauses = ["user_type = 'student'"]
+        params = []
+        for field, value in criteria.items():
+            if field not in self.COHORT_FIELDS:
+                raise ValueError(f"Unknown cohort field: {field}")
+            clauses.append(f"{field} = ?")
+            params.append(str(value).lower())
+
+        rows = self._conn.execute(
+            f"SELECT data FROM users WHERE {' AND '.join(clauses)} ORDER BY user_id", params)
+        students = [json.loads(row[0]) for row in rows]
+        if ignore_case:
+            return students
+        return [s for s in students if all(s.get(field) == value for field, value in criteria.items())]
+
+    def student_inbox(self, student_id):
+        rows = self._conn.execute(
+            "SELECT a.data FROM inbox i JOIN assigned a ON a.assignment_code = i.assignment_code "
+            "WHERE i.student_id = ? ORDER BY i.assignment_code", (student_id,))
+        return [InboxIndex.entry_of(json.loads(row[0])) for row in rows]
+
+    def free_instructor_ids(self, day, start, end):
+        rows = self._conn.execute(
+            "SELECT user_id FROM users WHERE user_type = 'instructor' AND user_id NOT IN ("
+            "SELECT instructor_id FROM teaching WHERE day = ? AND start_minute < ? AND end_minute > ?) "
+            "ORDER BY user_id", (day, end, start))
+        return [row[0] for row in rows]
+
+    def course_instructor_ids(self, course_code):
+        rows = self._conn.execute(
+            "SELECT DISTINCT instructor_id FROM teaching WHERE course_code = ? ORDER BY instructor_id", (course_code,))
+        return [row[0] for row in rows]
+
+    def room_course_codes(self, room_key):
+        row = self._conn.execute(
+            "SELECT assigned_college_room, room_number FROM rooms WHERE room_key = ?", (room_key,)).fetchone()
+        if row is None:
+            return []
+        rows = self._conn.execute(
+            "SELECT course_code FROM courses WHERE assigned_college_room = ? AND room_number = ? ORDER BY course_code", row)
+        return [row[0] for row in rows]
+
+    def course_assignment_codes(self, course_code):
+        rows = self._conn.execute(
+            "SELECT assignment_code FROM assigned WHERE course_code = ? ORDER BY assignment_code", (course_code,))
+        return [row[0] for row in rows]
+
+    def assigned_ids(self, assignment_code):
+        rows = self._conn.execute(
+            "SELECT student_id FROM inbox WHERE assignment_code = ? ORDER BY student_id", (assignment_code,))
+        return [row[0] for row in rows]
+
+    def assignment_submissions(self, assignment_code):
+        rows = self._conn.execute(
+            "SELECT data FROM submissions WHERE assignment_code = ? ORDER BY student_id", (assignment_code,))
+        return [json.loads(row[0]) for row in rows]
+
+    def submitted_ids(self, assignment_code):
+        rows = self._conn.execute(
+            "SELECT student_id FROM submissions WHERE assignment_code = ? ORDER BY student_id", (assignment_code,))
+        return [row[0] for row in rows]
+
+    def submission_states(self, assignment_code):
+        rows = self._conn.execute(
+            "SELECT student_id, json_extract(data, '$.status'), json_type(data, '$.score') IS NOT NULL "
+            "FROM submissions WHERE assignment_code = ?", (assignment_code,))
+        return {row[0]: (row[1], bool(row[2])) for row in rows}
+
+    def student_submissions(self, student_id):
+        rows = self._conn.execute(
+            "SELECT data FROM submissions WHERE student_id = ? ORDER BY assignment_code", (student_id,))
+        return [json.loads(row[0]) for row in rows]
+
+    def roster_ids(self, course_code):
+        rows = self._conn.execute(
+            "SELECT student_id FROM enrollments WHERE course_code = ? ORDER BY student_id", (course_code,))
+        return [row[0] for row in rows]
+
+    def students_in_course(self, course_code):
+        rows = self._conn.execute(
+            "SELECT u.data FROM enrollments e JOIN users u ON u.user_id = e.student_id "
+            "WHERE e.course_code = ? ORDER BY u.user_id", (course_code,))
+        return [json.loads(row[0]) for row in rows]
+
+class Storage:
+    # Process-wide repository, chosen once at startup
+    _repository = None
+
+    BACKENDS = ('json', 'sqlite')
+
+    @classmethod
+    def configure(cls, backend='json', db_path=SqliteRepository.DEFAULT_PATH, cache_bytes=None):
+        if backend == 'json':
+            cache = JsonCache.configure(cache_bytes) if cache_bytes else None
+            cls._repository = JsonRepository(cache)
+        elif backend == 'sqlite':
+            cls._repository = SqliteRepository(db_path)
+        else:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        return cls._repository
+
+    @classmethod
+    def repo(cls):
+        if cls._repository is None:
+            cls.configure()
+        return cls._repository
+
+# Copy every record from one repository into another in a single transaction
+def import_repository(source, target):
+    counts = {}
+    with target.transaction():
+        for kind in Repository.KINDS:
+            counts[kind] = 0
+            for key, data in source.load_all(kind):
+                target.save(kind, key, data)
+                counts[kind] += 1
+    return counts
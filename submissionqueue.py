@@ -0,0 +1,160 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from deadlines import Deadlines
+from deadlinescheduler import DeadlineScheduler
+from storage import Storage
+
+# Submission intake.
+#
+# Most submissions for an assignment arrive in the last minutes before its
+# deadline. Each one is stamped and classified as late or on time the moment
+# it is accepted, so a backlog in front of the disk can never turn an on-time
+# submission late. One writer thread drains the queue and saves whatever is
+# waiting in a single repository transaction, so a burst costs one group
+# flush per batch instead of one per submission; the next batch gathers
+# while the current one is being written. Submissions to an assignment that
+# has already closed come off its missing-submissions record in the same
+# transaction.
+
+class SubmissionTicket:
+
+    def __init__(self, key, data):
+        # Public, read by the caller once the ticket is done
+        self.key = key
+        self.data = data
+        self.accepted = time.perf_counter()
+        self.saved = None
+        self.error = None
+        # Protected instance attributes
+        self._done = threading.Event()
+
+    def _finish(self, error=None):
+        self.error = error
+        self.saved = time.perf_counter()
+        self._done.set()
+
+    # Block until the submission is on disk. Returns False if it is still
+    # queued after timeout seconds; raises the writer's error if it failed.
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+class SubmissionQueue:
+    # Most submissions saved in one transaction
+    MAX_BATCH = 500
+
+    # Seconds a submitter waits for its batch before giving up on it
+    WAIT_TIMEOUT = 30
+
+    # Class attributes
+    _shared = None
+
+    # clock returns the current time as a datetime; tests can pass their own
+    def __init__(self, repo, clock=datetime.now):
+        # Protected instance attributes
+        self._repo = repo
+        self._clock = clock
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}  # submission key -> ticket, accepted but not yet saved
+        self._thread = None
+        self._batches = 0
+        self._saved = 0
+        atexit.register(self.close)
+
+    # The queue for the current repository
+    @classmethod
+    def shared(cls):
+        repo = Storage.repo()
+        if cls._shared is None or cls._shared._repo is not repo:
+            if cls._shared is not None:
+                cls._shared.close()
+            cls._shared = cls(repo)
+        return cls._shared
+
+    # Whether a submission is accepted but not yet saved
+    def is_pending(self, key):
+        with self._lock:
+            return key in self._pending
+
+    # Accept a submission: stamp it, classify it against the deadline epoch
+    # and queue it for the writer. Returns the ticket to wait on, or None if
+    # the same submission is already queued.
+    def put(self, key, submission_data, deadline_epoch):
+        arrival = self._clock()
+        submission_data['submission_timestamp'] = arrival.strftime("%Y-%m-%d %H:%M")
+        submission_data['submission_epoch'] = Deadlines.minute_epoch(arrival)
+        submission_data['status'] = Deadlines.status(submission_data['submission_epoch'], deadline_epoch)
+
+        with self._lock:
+            if key in self._pending:
+                return None
+            ticket = SubmissionTicket(key, submission_data)
+            self._pending[key] = ticket
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='submission-writer', daemon=True)
+                self._thread.start()
+        self._queue.put(ticket)
+        return ticket
+
+    # Writer thread. It works on its own repository, since a SQLite
+    # connection may only be used by the thread that opened it.
+    def _run(self):
+        repo = self._repo.reopen()
+        while True:
+            ticket = self._queue.get()
+            if ticket is None:
+                return
+
+            batch, stopping = [ticket], False
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    ticket = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if ticket is None:
+                    stopping = True
+                    break
+                batch.append(ticket)
+
+            self._write(repo, batch)
+            if stopping:
+                return
+
+    def _write(self, repo, batch):
+        error = None
+        try:
+            with DeadlineScheduler.RECORD_LOCK, repo.transaction():
+                for ticket in batch:
+                    repo.save('submission', ticket.key, ticket.data)
+                DeadlineScheduler.record_submissions(repo, [ticket.data for ticket in batch])
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            for ticket in batch:
+                self._pending.pop(ticket.key, None)
+            if error is None:
+                self._batches += 1
+                self._saved += len(batch)
+        for ticket in batch:
+            ticket._finish(error)
+
+    # Let the writer save everything queued so far, then stop it
+    def close(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    # Batches written, submissions saved and submissions still queued
+    def stats(self):
+        with self._lock:
+            return {'batches': self._batches, 'saved': self._saved, 'queued': len(self._pending)}
@@ -0,0 +1,240 @@
+import csv
+import json
+import time
+from course import Course
+from references import References
+from freeslots import FreeSlotFinder
+from roomschedule import to_minutes, to_time
+
+# Batch timetable solver.
+#
+# Sections are placed greedily, most constrained first: those with the
+# fewest candidate rooms, then the longest, then those whose instructor
+# teaches the most sections. Each section goes on the least loaded day that
+# still has room for it, at the earliest free start in the first free room,
+# found with the same packed per-day room bitmaps FreeSlotFinder uses. The
+# instructor's own bookings for the day are copied over every room before
+# the search, so a placement can never double-book them.
+
+class Timetable:
+    DAYS = FreeSlotFinder.DAYS
+    GRANULARITY = FreeSlotFinder.GRANULARITY
+
+    # Length of a meeting when the input gives none
+    MINUTES_PER_UNIT = 60
+
+    # Columns of a CSV input; preferred_colleges is separated by ';'
+    FIELDS = ['course_code', 'course_name', 'credited_units', 'duration_minutes', 'preferred_colleges', 'instructor_id']
+
+    def __init__(self, repo, earliest=FreeSlotFinder.OPEN, latest=FreeSlotFinder.CLOSE):
+        # Protected instance attributes
+        self._repo = repo
+        self._earliest = to_minutes(earliest)
+        self._latest = to_minutes(latest)
+
+        rooms = {room_key: room_data for room_key, room_data in repo.load_all('room')}
+        self._order = sorted(rooms)
+        self._rooms = rooms
+        occupancy = [FreeSlotFinder.occupancy(rooms[room_key].get('scheduled_times', [])) for room_key in self._order]
+        self._packed = {day: FreeSlotFinder.pack([days.get(day, 0) for days in occupancy]) for day in self.DAYS}
+        self._everything = (1 << (len(self._order) * FreeSlotFinder._WIDTH)) - 1
+
+        # Per college, the bits of its rooms
+        full_room = (1 << FreeSlotFinder._WIDTH) - 1
+        self._colleges = {}
+        for i, room_key in enumerate(self._order):
+            college = rooms[room_key].get('assigned_college_room')
+            self._colleges[college] = self._colleges.get(college, 0) | (full_room << (i * FreeSlotFinder._WIDTH))
+
+        # Booked slots per instructor and day, from the courses already scheduled
+        self._instructors = {}
+        for _, course_data in repo.load_all('course'):
+            if course_data.get('instructor_id'):
+                self._book_instructor(course_data['instructor_id'], course_data)
+
+        # Booked slots per day, to spread new sections over the week
+        self._load = {day: bin(bitmap).count('1') for day, bitmap in self._packed.items()}
+
+    def _book_instructor(self, instructor_id, slot):
+        busy = FreeSlotFinder.occupancy([slot])
+        days = self._instructors.setdefault(instructor_id, {})
+        for day, bitmap in busy.items():
+            days[day] = days.get(day, 0) | bitmap
+
+    # Sections from a .json list or a .csv file with FIELDS as its header
+    @staticmethod
+    def read_sections(path):
+        if path.lower().endswith('.json'):
+            with open(path, 'r') as f:
+                sections = json.load(f)
+            if not isinstance(sections, list):
+                raise ValueError(f"{path} must hold a list of sections")
+        else:
+            with open(path, 'r', newline='') as f:
+                sections = list(csv.DictReader(f))
+
+        for section in sections:
+            colleges = section.get('preferred_colleges') or []
+            if isinstance(colleges, str):
+                colleges = colleges.split(';')
+            section['preferred_colleges'] = [college.strip().upper() for college in colleges if college.strip()]
+        return sections
+
+    # Why a section cannot be scheduled at all, or None if it can be tried
+    def _problem(self, section, seen):
+        course_code = str(section.get('course_code') or '').strip()
+        if not course_code:
+            return "no course code"
+        if course_code in seen:
+            return "listed more than once"
+        if self._repo.exists('course', course_code):
+            return "course already exists"
+        try:
+            units = int(section.get('credited_units'))
+        except (TypeError, ValueError):
+            return "credited units is not a number"
+        if units < Course._min_credits or units > Course._max_credits:
+            return f"credited units must be between {Course._min_credits} and {Course._max_credits}"
+        try:
+            duration = int(section.get('duration_minutes') or units * self.MINUTES_PER_UNIT)
+        except (TypeError, ValueError):
+            return "duration is not a number"
+        if duration <= 0 or duration > self._latest - self._earliest:
+            return "duration does not fit in a day"
+        instructor_id = section.get('instructor_id')
+        if instructor_id and not self._repo.exists('instructor', instructor_id):
+            return f"no profile for instructor {instructor_id}"
+        if not self._candidate_rooms(section):
+            return "no rooms in the preferred colleges"
+        return None
+
+    # Bits of the rooms a section may use
+    def _candidate_rooms(self, section):
+        if not section['preferred_colleges']:
+            return self._everything
+        rooms = 0
+        for college in section['preferred_colleges']:
+            rooms |= self._colleges.get(college, 0)
+        return rooms
+
+    # (room_key, day, start, end) in minutes for the section, booked in the
+    # solver's state, or None if nowhere is free
+    def _place(self, section, duration):
+        length = -(-duration // self.GRANULARITY)
+        first = -(-self._earliest // self.GRANULARITY)
+        last = (self._latest - duration) // self.GRANULARITY
+        if last < first:
+            return None
+        starts = FreeSlotFinder.repeat(((1 << (last - first + 1)) - 1) << first, len(self._order))
+        starts &= self._candidate_rooms(section)
+
+        instructor = self._instructors.get(section.get('instructor_id'), {})
+        for day in sorted(self.DAYS, key=lambda day: self._load[day]):
+            busy = self._packed[day] | FreeSlotFinder.repeat(instructor.get(day, 0), len(self._order))
+            run = FreeSlotFinder.runs(~busy & self._everything, length) & starts
+            if not run:
+                continue
+
+            position = (run & -run).bit_length() - 1
+            room, slot = divmod(position, FreeSlotFinder._WIDTH)
+            self._packed[day] |= ((1 << length) - 1) << position
+            self._load[day] += length
+            start = slot * self.GRANULARITY
+            return self._order[room], day, start, start + duration
+        return None
+
+    # Place every section. Returns (placed, unplaced): course records ready
+    # to save, and (section, reason) for the rest.
+    def solve(self, sections):
+        placed, unplaced, seen, ready = [], [], set(), []
+        for section in sections:
+            problem = self._problem(section, seen)
+            if problem:
+                unplaced.append((section, problem))
+                continue
+            seen.add(str(section['course_code']).strip())
+            ready.append(section)
+
+        teaching = {}
+        for section in ready:
+            if section.get('instructor_id'):
+                teaching[section['instructor_id']] = teaching.get(section['instructor_id'], 0) + 1
+
+        def duration_of(section):
+            return int(section.get('duration_minutes') or int(section['credited_units']) * self.MINUTES_PER_UNIT)
+
+        ready.sort(key=lambda section: (bin(self._candidate_rooms(section)).count('1'),
+                                        -duration_of(section),
+                                        -teaching.get(section.get('instructor_id'), 0)))
+
+        for section in ready:
+            slot = self._place(section, duration_of(section))
+            if slot is None:
+                unplaced.append((section, "no free room and time"))
+                continue
+
+            room_key, day, start, end = slot
+            room_data = self._rooms[room_key]
+            course_details = {
+                'course_code': str(section['course_code']).strip(),
+                'course_name': str(section.get('course_name') or '').strip(),
+                'credited_units': int(section['credited_units']),
+                'assigned_college_room': room_data.get('assigned_college_room'),
+                'room_number': room_data.get('room_number'),
+                'day': day,
+                'start_time': to_time(start),
+                'end_time': to_time(end),
+                'instructor_id': section.get('instructor_id') or None,
+                'name': None,
+                'enrolled_students': []
+            }
+            if course_details['instructor_id']:
+                self._book_instructor(course_details['instructor_id'], course_details)
+            placed.append(course_details)
+        return placed, unplaced
+
+    # Save the placed courses, the rooms they use and their instructors'
+    # assigned courses in one transaction. The courses go first so the
+    # instructors' references resolve.
+    def write(self, placed):
+        rooms, instructors = {}, {}
+        for course_details in placed:
+            room_key = f"{course_details['assigned_college_room']}_{course_details['room_number']}"
+            rooms.setdefault(room_key, []).append({
+                'day': course_details['day'],
+                'start_time': course_details['start_time'],
+                'end_time': course_details['end_time']
+            })
+            if course_details['instructor_id']:
+                instructors.setdefault(course_details['instructor_id'], []).append(course_details)
+
+        with self._repo.transaction():
+            profiles = {}
+            for instructor_id, courses in instructors.items():
+                profiles[instructor_id] = self._repo.load('instructor', instructor_id)
+                for course_details in courses:
+                    course_details['name'] = profiles[instructor_id].get('name', 'N/A')
+
+            for course_details in placed:
+                self._repo.save('course', course_details['course_code'], course_details)
+
+            for instructor_id, courses in instructors.items():
+                instructor_profile = profiles[instructor_id]
+                instructor_profile.setdefault('assigned_courses', []).extend(
+                    References.course_ref(course_details['course_code']) for course_details in courses)
+                self._repo.save('instructor', instructor_id, instructor_profile)
+
+            for room_key, slots in rooms.items():
+                room_data = self._repo.load('room', room_key)
+                room_data.setdefault('scheduled_times', []).extend(slots)
+                self._repo.save('room', room_key, room_data)
+
+    # Solve and, unless dry_run, write. Returns {placed, unplaced, seconds}.
+    @classmethod
+    def schedule(cls, repo, sections, dry_run=False):
+        start = time.perf_counter()
+        timetable = cls(repo)
+        placed, unplaced = timetable.solve(sections)
+        if placed and not dry_run:
+            timetable.write(placed)
+        return {'placed': placed, 'unplaced': unplaced, 'seconds': time.perf_counter() - start}